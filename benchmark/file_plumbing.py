@@ -0,0 +1,56 @@
+"""
+Benchmark of memory and time when a large file is piped through ``cat`` by common_run.
+
+Usage:
+    python benchmark/file_plumbing.py [--size 512] [--no-direct-io]
+
+Each mode should be measured in its own process, because the peak rss (``ru_maxrss``) never decreases.
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import common_run  # noqa: E402
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(size: int, direct_io: bool):
+    with tempfile.TemporaryDirectory() as workdir:
+        _input_file, _output_file = os.path.join(workdir, 'input'), os.path.join(workdir, 'output')
+        with open(_input_file, 'wb') as f:
+            _block = b'0123456789abcde\n' * 65536
+            for _ in range(size):
+                f.write(_block)
+
+        _initial_rss = _peak_rss_mb()
+        _start = time.time()
+        with open(_input_file, 'rb', 0) as stdin, open(_output_file, 'wb', 0) as stdout:
+            result = common_run(args=['cat'], stdin=stdin, stdout=stdout, direct_io=direct_io)
+        _end = time.time()
+
+        assert result.ok
+        assert os.path.getsize(_output_file) == size << 20
+
+    print('direct io:          {value}'.format(value=direct_io))
+    print('data size:          {value}MiB'.format(value=size))
+    print('peak rss (initial): {value:.1f}MiB'.format(value=_initial_rss))
+    print('peak rss (final):   {value:.1f}MiB'.format(value=_peak_rss_mb()))
+    print('time:               {value:.3f}s'.format(value=_end - _start))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-s', '--size', type=int, default=512, help='Size of data (unit: MiB).')
+    parser.add_argument('--no-direct-io', dest='direct_io', action='store_false',
+                        help='Pass the data through judge process.')
+    _args = parser.parse_args()
+
+    run(_args.size, _args.direct_io)
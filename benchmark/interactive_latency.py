@@ -0,0 +1,76 @@
+"""
+Benchmark of round-trip latency of interactive process with a ping-pong child.
+
+Usage:
+    python benchmark/interactive_latency.py [-n 10000]
+
+The child echoes each line back immediately, so the round-trip time is the cost of one exchange
+(write stdin, read by io supervisor, deliver to the consumer). A raw pipe to the same child
+by ``subprocess`` is measured as the lower bound.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import interactive_process  # noqa: E402
+
+_PONG_SCRIPT = 'import sys\nfor line in sys.stdin:\n    sys.stdout.write(line)\n    sys.stdout.flush()\n'
+
+
+def _summary(name: str, latencies):
+    _sorted = sorted(latencies)
+    print('{name:<12}  mean: {mean:.1f}us, p50: {p50:.1f}us, p99: {p99:.1f}us, wall: {wall:.3f}s'.format(
+        name=name, mean=statistics.mean(_sorted) * 1e6, p50=_sorted[len(_sorted) // 2] * 1e6,
+        p99=_sorted[int(len(_sorted) * 0.99)] * 1e6, wall=sum(_sorted)))
+
+
+def _measure_raw(count: int):
+    _process = subprocess.Popen([sys.executable, '-c', _PONG_SCRIPT],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+    _stdout = _process.stdout
+    _latencies = []
+    for i in range(count):
+        _start = time.perf_counter()
+        _process.stdin.write(b'ping\n')
+        _line = _stdout.readline()
+        _latencies.append(time.perf_counter() - _start)
+        assert _line == b'ping\n'
+
+    _process.stdin.close()
+    _process.wait()
+    return _latencies
+
+
+def _measure_interactive(count: int):
+    _latencies = []
+    with interactive_process(args=[sys.executable, '-c', _PONG_SCRIPT]) as ip:
+        _output = ip.output_yield
+        for i in range(count):
+            _start = time.perf_counter()
+            ip.print_stdin(b'ping', end=b'\n')
+            _, _tag, _line = next(_output)
+            _latencies.append(time.perf_counter() - _start)
+            assert (_tag, _line) == ('stdout', b'ping')
+
+    assert ip.ok
+    return _latencies
+
+
+def run(count: int):
+    _measure_interactive(100)  # warm up
+    print('round trips: {count}'.format(count=count))
+    _summary('raw pipe', _measure_raw(count))
+    _summary('interactive', _measure_interactive(count))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=10000, help='Count of round trips.')
+    _args = parser.parse_args()
+
+    run(_args.count)
@@ -0,0 +1,51 @@
+"""
+Benchmark of spawn latency and reported memory against the size of the judge process.
+
+Usage:
+    python benchmark/launcher_overhead.py [-n 100] [--ballast 1024]
+
+A ballast of the given size (unit: MiB) is allocated and touched in the judge process,
+then ``true`` is spawned with both ``fork`` and ``forkserver`` launchers.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import common_process  # noqa: E402
+
+
+def _measure(launcher: str, count: int):
+    _latencies, _memories = [], []
+    for _ in range(count):
+        _start = time.time()
+        with common_process(args=['true'], launcher=launcher) as cp:
+            _latencies.append(time.time() - _start)
+        _memories.append(cp.result.result.max_memory)
+
+    return statistics.mean(_latencies), max(_memories)
+
+
+def run(count: int, ballast: int):
+    _ballast = bytearray(ballast * 1024 * 1024)
+    for i in range(0, len(_ballast), 4096):  # touch all the pages
+        _ballast[i] = 1
+
+    _measure('forkserver', 1)  # start fork server before timing
+    print('ballast:    {size} MiB'.format(size=ballast))
+    for _launcher in ['fork', 'forkserver']:
+        _latency, _memory = _measure(_launcher, count)
+        print('{launcher:<10}  spawn latency mean: {latency:.3f}ms, max reported memory: {memory:.1f}MiB'.format(
+            launcher=_launcher, latency=_latency * 1000, memory=_memory / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=100, help='Count of spawns for each launcher.')
+    parser.add_argument('--ballast', type=int, default=1024, help='Size of ballast in judge (unit: MiB).')
+    _args = parser.parse_args()
+
+    run(_args.count, _args.ballast)
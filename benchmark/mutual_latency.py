@@ -0,0 +1,48 @@
+"""
+Benchmark of mutual run with relayed, directly wired and teed pipes.
+
+Usage:
+    python benchmark/mutual_latency.py [-n 10000]
+
+The interaction sends a number and waits for it to be echoed back by ``cat``, so the real time of
+process is mostly the cost of the exchanges.
+"""
+import argparse
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control.run import mutual_run  # noqa: E402
+
+_COUNT = 10000
+
+
+def _ping_pong():
+    for i in range(_COUNT):
+        print(i, flush=True)
+        assert input() == str(i)
+
+
+def run(count: int):
+    global _COUNT
+    _COUNT = count
+    print('round trips: {count}'.format(count=count))
+    for _name, _kwargs in [
+        ('relay', dict(direct=False)),
+        ('direct', dict(direct=True)),
+        ('direct+tee', dict(direct=True, transcript=io.BytesIO())),
+    ]:
+        _result = mutual_run(args='cat', stdin=_ping_pong, **_kwargs)
+        assert _result.ok
+        print('{name:<12}  real time: {real:.3f}s, per round trip: {rt:.1f}us'.format(
+            name=_name, real=_result.result.real_time, rt=_result.result.real_time / count * 1e6))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=10000, help='Count of round trips.')
+    _args = parser.parse_args()
+
+    run(_args.count)
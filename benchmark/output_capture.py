@@ -0,0 +1,52 @@
+"""
+Benchmark of memory and time when a child prints a large output captured by common_process.
+
+Usage:
+    python benchmark/output_capture.py [--size 256] [--spill-threshold 16MiB]
+
+Each configuration should be measured in its own process, because the peak rss (``ru_maxrss``) never decreases.
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import common_process  # noqa: E402
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(size: int, spill_threshold: str):
+    _initial_rss = _peak_rss_mb()
+    _start = time.time()
+    with common_process(
+            args=['head', '-c', str(size << 20), '/dev/zero'],
+            spill_threshold=spill_threshold,
+    ) as cp:
+        cp.communicate(wait=False)
+        cp.join()
+    _end = time.time()
+
+    _capture = cp.stdout_capture
+    assert _capture.size == size << 20
+
+    print('output size:        {value}MiB'.format(value=size))
+    print('spill threshold:    {value}'.format(value=spill_threshold))
+    print('spilled:            {value}'.format(value=_capture.spilled))
+    print('peak rss (initial): {value:.1f}MiB'.format(value=_initial_rss))
+    print('peak rss (final):   {value:.1f}MiB'.format(value=_peak_rss_mb()))
+    print('time:               {value:.3f}s'.format(value=_end - _start))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-s', '--size', type=int, default=256, help='Size of output (unit: MiB).')
+    parser.add_argument('-t', '--spill-threshold', type=str, default='16MiB', help='Spill threshold of capture.')
+    _args = parser.parse_args()
+
+    run(_args.size, _args.spill_threshold)
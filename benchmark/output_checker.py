@@ -0,0 +1,69 @@
+"""
+Benchmark of a wrong answer with large output, checked after the run or online with OutputChecker.
+
+Usage:
+    python benchmark/output_checker.py [-n 5000000] [-w 10]
+
+The child prints the numbers from 1 to n, but the w-th number is wrong. Without checker the whole output is
+produced and compared afterwards, while with checker the child is killed as soon as the wrong number arrives.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control.process import OutputChecker  # noqa: E402
+from pji.control.run import common_run  # noqa: E402
+
+_WRONG_SCRIPT = 'import sys\nfor i in range(1, {count} + 1):\n    print(-i if i == {wrong} else i)\n'
+
+
+def _measure(args, answer: str, online: bool):
+    with tempfile.TemporaryFile() as stdout:
+        _start = time.time()
+        _result = common_run(args=args, stdout=stdout, checker=answer if online else None)
+        if not online:  # compared after the run
+            _checker = OutputChecker(answer)
+            stdout.seek(0)
+            for _chunk in iter(lambda: stdout.read(1 << 16), b''):
+                _checker.feed(_chunk)
+            _checker.close()
+            _mismatch = _checker.mismatch
+        else:
+            _mismatch = _result.mismatch
+        _duration = time.time() - _start
+
+        stdout.seek(0, os.SEEK_END)
+        return _duration, stdout.tell(), _result.result.cpu_time, _mismatch
+
+
+def run(count: int, wrong: int):
+    print('numbers: {count}, wrong at: {wrong}'.format(count=count, wrong=wrong))
+    _args = [sys.executable, '-c', _WRONG_SCRIPT.format(count=count, wrong=wrong)]
+    with tempfile.TemporaryDirectory() as workdir:
+        _answer = os.path.join(workdir, 'answer.txt')
+        with open(_answer, 'wb') as f:
+            for i in range(1, count + 1, 10000):
+                f.write(b''.join(b'%d\n' % j for j in range(i, min(i + 10000, count + 1))))
+
+        _offsets = set()
+        for _name, _online in [('after run', False), ('online', True)]:
+            _duration, _size, _cpu_time, _mismatch = _measure(_args, _answer, _online)
+            _offsets.add(_mismatch.offset)
+            print('{name:<10}  wall: {wall:.3f}s, cpu: {cpu:.3f}s, output: {size:.1f}MiB, '
+                  'mismatch at: {offset}'.format(name=_name, wall=_duration, cpu=_cpu_time,
+                                                 size=_size / (1 << 20), offset=_mismatch.offset))
+
+    assert len(_offsets) == 1, 'Mismatch offsets are different.'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=5000000, help='Count of numbers.')
+    parser.add_argument('-w', '--wrong', type=int, default=10, help='Index of the wrong number.')
+    _args = parser.parse_args()
+
+    run(_args.count, _args.wrong)
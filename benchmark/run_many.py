@@ -0,0 +1,72 @@
+"""
+Benchmark of batch runs with run_many, compared with common_run in a thread pool.
+
+Usage:
+    python benchmark/run_many.py [-n 200] [-c 64] [--command "sleep 0.1"]
+
+Both modes keep at most ``concurrency`` runs in flight, the thread pool one occupies a thread for the whole
+life of each run, while run_many drives all the runs in one event loop and only uses workers for launching.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control.run import common_run, run_many  # noqa: E402
+
+
+def _thread_pool(command: str, count: int, concurrency: int):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        _results = list(pool.map(lambda _: common_run(args=command, shell=True), range(count)))
+    return _results
+
+
+def _run_many(command: str, count: int, concurrency: int):
+    return [_result for _, _result in run_many([dict(args=command, shell=True)] * count, concurrency=concurrency)]
+
+
+def _measure(func, command: str, count: int, concurrency: int):
+    _max_threads = [threading.active_count()]
+    _stopped = threading.Event()
+
+    def _watch():
+        while not _stopped.wait(0.01):
+            _max_threads[0] = max(_max_threads[0], threading.active_count())
+
+    _watcher = threading.Thread(target=_watch, daemon=True)
+    _watcher.start()
+    try:
+        _start = time.time()
+        _results = func(command, count, concurrency)
+        _duration = time.time() - _start
+    finally:
+        _stopped.set()
+        _watcher.join()
+
+    assert all(_result.ok for _result in _results)
+    return _duration, _max_threads[0]
+
+
+def run(command: str, count: int, concurrency: int):
+    _measure(_run_many, 'true', 5, 1)  # warm up
+    print('command: {command}, runs: {count}, concurrency: {concurrency}'.format(
+        command=command, count=count, concurrency=concurrency))
+
+    for _name, _func in [('thread pool', _thread_pool), ('run_many', _run_many)]:
+        _duration, _threads = _measure(_func, command, count, concurrency)
+        print('{name:<12}  total: {total:.3f}s, runs per second: {rps:.1f}, max threads: {threads}'.format(
+            name=_name, total=_duration, rps=count / _duration, threads=_threads))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=200, help='Count of runs.')
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help='Max count of runs in flight.')
+    parser.add_argument('--command', type=str, default='sleep 0.1', help='Command line to run.')
+    _args = parser.parse_args()
+
+    run(_args.command, _args.count, _args.concurrency)
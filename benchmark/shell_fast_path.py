@@ -0,0 +1,60 @@
+"""
+Benchmark of spawn latency and reported usage of shell mode commands with and without the shell-free fast path.
+
+Usage:
+    python benchmark/shell_fast_path.py [-n 200] [--command "cat /dev/null"]
+
+The command should be a simple command line (no pipes, redirects, globbing, etc.), which is executed
+directly when the fast path is enabled, and by ``sh -c`` when ``PJI_SHELL_FAST_PATH`` is ``0``.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import common_process  # noqa: E402
+from pji.control.process.shell import ENV_PJI_SHELL_FAST_PATH  # noqa: E402
+
+
+def _measure(command: str, fast_path: bool, count: int):
+    os.environ[ENV_PJI_SHELL_FAST_PATH] = '1' if fast_path else '0'
+    _latencies, _cpu_times, _memories = [], [], []
+    for _ in range(count):
+        _start = time.time()
+        with common_process(args=command, shell=True, environ={'PATH': os.environ.get('PATH', os.defpath)}) as cp:
+            cp.communicate()
+        _latencies.append(time.time() - _start)
+
+        _result = cp.result.result
+        assert _result.ok
+        _cpu_times.append(_result.cpu_time + _result.system_time)
+        _memories.append(_result.max_memory)
+
+    return statistics.mean(_latencies), statistics.mean(_cpu_times), max(_memories)
+
+
+def run(command: str, count: int):
+    _measure(command, True, 5)  # warm up
+    print('command:  {command}'.format(command=command))
+
+    _results = {}
+    for _fast_path in [False, True]:
+        _latency, _cpu_time, _memory = _results[_fast_path] = _measure(command, _fast_path, count)
+        print('{mode:<8}  latency mean: {latency:.3f}ms, cpu time mean: {cpu:.3f}ms, '
+              'max reported memory: {memory:.1f}MiB'.format(
+            mode='direct' if _fast_path else 'sh -c', latency=_latency * 1000,
+            cpu=_cpu_time * 1000, memory=_memory / 1024 / 1024))
+
+    print('saved latency per command: {value:.3f}ms'.format(value=(_results[False][0] - _results[True][0]) * 1000))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=200, help='Count of spawns for each mode.')
+    parser.add_argument('--command', type=str, default='cat /dev/null', help='Simple command line to run.')
+    _args = parser.parse_args()
+
+    run(_args.command, _args.count)
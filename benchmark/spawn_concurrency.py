@@ -0,0 +1,69 @@
+"""
+Benchmark of thread count and spawn latency with many concurrent children.
+
+Usage:
+    python benchmark/spawn_concurrency.py [-n 200] [--interactive]
+
+All the children are kept alive (``sleep``) until the last one is spawned, so the peak
+thread count of the judge process shows the per-child thread overhead.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import common_process, interactive_process  # noqa: E402
+
+
+def _os_thread_count() -> int:
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return -1  # pragma: no cover
+
+
+def run(count: int, interactive: bool, sleep: float):
+    _factory = interactive_process if interactive else common_process
+    _processes, _latencies = [], []
+    _initial_threads = _os_thread_count()
+
+    _begin = time.time()
+    for _ in range(count):
+        _start = time.time()
+        _processes.append(_factory(args=['sleep', str(sleep)]))
+        _latencies.append(time.time() - _start)
+    _peak_threads = _os_thread_count()
+
+    for p in _processes:
+        if interactive:
+            p.close_stdin()
+            _ = list(p.output_yield)
+        else:
+            p.communicate()
+        p.join()
+    _end = time.time()
+
+    _latencies.sort()
+    print('mode:               {mode}'.format(mode='interactive' if interactive else 'common'))
+    print('children:           {count}'.format(count=count))
+    print('threads (initial):  {count}'.format(count=_initial_threads))
+    print('threads (peak):     {count}'.format(count=_peak_threads))
+    print('threads per child:  {value:.2f}'.format(value=(_peak_threads - _initial_threads) / count))
+    print('spawn latency mean: {value:.3f}ms'.format(value=statistics.mean(_latencies) * 1000))
+    print('spawn latency p50:  {value:.3f}ms'.format(value=_latencies[len(_latencies) // 2] * 1000))
+    print('spawn latency p99:  {value:.3f}ms'.format(value=_latencies[int(len(_latencies) * 0.99) - 1] * 1000))
+    print('total time:         {value:.3f}s'.format(value=_end - _begin))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=200, help='Count of concurrent children.')
+    parser.add_argument('-s', '--sleep', type=float, default=5.0, help='Lifetime of each child (unit: s).')
+    parser.add_argument('--interactive', action='store_true', help='Use interactive process instead.')
+    _args = parser.parse_args()
+
+    run(_args.count, _args.interactive, _args.sleep)
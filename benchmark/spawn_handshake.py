@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of spawn throughput and the kernel objects allocated per spawn.
+
+Usage:
+    python benchmark/spawn_handshake.py [-n 500]
+
+``true`` is spawned and joined sequentially. POSIX semaphores (``multiprocessing`` locks and events),
+shared memory values and pipes created in the judge process are counted during the spawns.
+"""
+import argparse
+import multiprocessing.heap
+import multiprocessing.synchronize
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control import common_process  # noqa: E402
+
+_COUNTS = {'semaphores': 0, 'shared values': 0, 'pipes': 0}
+
+
+def _counted(cls_or_module, name: str, key: str):
+    _origin = getattr(cls_or_module, name)
+
+    def _func(*args, **kwargs):
+        _COUNTS[key] += 1
+        return _origin(*args, **kwargs)
+
+    setattr(cls_or_module, name, _func)
+
+
+def run(count: int):
+    _counted(multiprocessing.synchronize.SemLock, '__init__', 'semaphores')
+    _counted(multiprocessing.heap.BufferWrapper, '__init__', 'shared values')
+    _counted(os, 'pipe', 'pipes')
+
+    with common_process(args=['true']):  # warm up
+        pass
+    for key in _COUNTS.keys():
+        _COUNTS[key] = 0
+
+    _start = time.time()
+    for _ in range(count):
+        with common_process(args=['true']):
+            pass
+    _duration = time.time() - _start
+
+    print('spawns:               {count}'.format(count=count))
+    print('spawns per second:    {value:.1f}'.format(value=count / _duration))
+    for key, value in _COUNTS.items():
+        print('{key:<21} {value:.2f} per spawn'.format(key=key + ':', value=value / count))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=500, help='Count of spawns.')
+    run(parser.parse_args().count)
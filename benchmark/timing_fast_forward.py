@@ -0,0 +1,56 @@
+"""
+Benchmark of timing run with long gaps between stdin lines, in real time and in fast-forward mode.
+
+Usage:
+    python benchmark/timing_fast_forward.py [-n 5] [-g 2.0] [-q 0.01s]
+
+The child doubles each line of stdin, so it is blocked on reading stdin during the gaps, which are skipped
+in fast-forward mode. The virtual time of output lines should be the same as the real one.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control.run import timing_run, TimingStdout  # noqa: E402
+
+_DOUBLE_SCRIPT = 'import sys\nfor line in sys.stdin:\n    print(int(line) * 2, flush=True)\n'
+
+
+def _measure(script: bytes, fast_forward):
+    with io.BytesIO(script) as stdin, io.BytesIO() as stdout:
+        _start = time.time()
+        _result = timing_run(args=[sys.executable, '-c', _DOUBLE_SCRIPT], stdin=stdin, stdout=stdout,
+                             fast_forward=fast_forward)
+        _duration = time.time() - _start
+        assert _result.ok
+        return _duration, _result.delivery, TimingStdout.loads(stdout.getvalue())
+
+
+def run(count: int, gap: float, quiet: str):
+    _script = ''.join('[{time}]{index}\n'.format(time=i * gap, index=i) for i in range(count)).encode()
+    print('lines: {count}, gap: {gap}s, script duration: {duration}s'.format(
+        count=count, gap=gap, duration=(count - 1) * gap))
+
+    _outputs = []
+    for _name, _fast_forward in [('real time', None), ('fast-forward', quiet)]:
+        _duration, _delivery, _stdout = _measure(_script, _fast_forward)
+        _outputs.append(_stdout)
+        print('{name:<12}  wall: {wall:.3f}s, skipped: {skipped:.3f}s, max skew: {skew:.6f}s, '
+              'last output: {last:.3f}s'.format(name=_name, wall=_duration, skipped=_delivery.skipped,
+                                                skew=_delivery.max_skew, last=_stdout.lines[-1][0]))
+
+    assert [_line for _, _line in _outputs[0].lines] == [_line for _, _line in _outputs[1].lines]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=5, help='Count of stdin lines.')
+    parser.add_argument('-g', '--gap', type=float, default=2.0, help='Gap between stdin lines (unit: s).')
+    parser.add_argument('-q', '--quiet', type=str, default='0.01s', help='Quiet time of fast-forward mode.')
+    _args = parser.parse_args()
+
+    run(_args.count, _args.gap, _args.quiet)
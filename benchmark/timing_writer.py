@@ -0,0 +1,75 @@
+"""
+Benchmark of peak memory when recording timing content, with lists and TimingContent, or with TimingWriter.
+
+Usage:
+    python benchmark/timing_writer.py [-n 200000]
+
+The lines are recorded and dumped into a temporary file, and the peak of traced python memory is measured.
+The dumped contents of both ways are checked to be the same.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pji.control.model import TimingContent  # noqa: E402
+from pji.control.run.encoding import _try_write  # noqa: E402
+from pji.control.run.writer import TimingWriter  # noqa: E402
+
+
+def _lines(count: int):
+    for i in range(count):
+        yield i * 1e-5, 'output line {index}'.format(index=i).encode()
+
+
+def _with_list(stream, count: int):
+    _list = []
+    for _time, _line in _lines(count):
+        _list.append((_time, _line))
+    _try_write(stream, TimingContent(_list).dumps())
+
+
+def _with_writer(stream, count: int):
+    with TimingWriter(stream) as _writer:
+        for _time, _line in _lines(count):
+            _writer.write(_time, _line)
+
+
+def _measure(func, count: int):
+    with tempfile.TemporaryFile() as stream:
+        tracemalloc.start()
+        _start = time.time()
+        func(stream, count)
+        _duration = time.time() - _start
+        _, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stream.seek(0)
+        _digest = hashlib.sha256(stream.read()).hexdigest()
+
+    return _duration, _peak, _digest
+
+
+def run(count: int):
+    print('lines: {count}'.format(count=count))
+    _digests = set()
+    for _name, _func in [('list', _with_list), ('writer', _with_writer)]:
+        _duration, _peak, _digest = _measure(_func, count)
+        _digests.add(_digest)
+        print('{name:<8}  time: {time:.3f}s, peak memory: {peak:.1f}MiB'.format(
+            name=_name, time=_duration, peak=_peak / (1 << 20)))
+
+    assert len(_digests) == 1, 'Dumped contents are different.'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=200000, help='Count of lines.')
+    _args = parser.parse_args()
+
+    run(_args.count)
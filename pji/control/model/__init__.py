@@ -1,5 +1,7 @@
+from .check import OutputMismatch
 from .identification import Identification
-from .process import ProcessResult
+from .placement import Placement
+from .process import ProcessResult, CgroupUsage, ResourceSample, DescendantUsage
 from .resource import ResourceLimit
 from .run import RunResult, RunResultStatus
-from .timing import TimingContent
+from .timing import TimingContent, TimingDelivery
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from hbutils.model import get_repr_info
+
+from ...utils import auto_decode_support
+
+_auto_decode = auto_decode_support(lambda x: x)
+
+
+class OutputMismatch:
+    def __init__(self, offset: int, expected: Optional[bytes], actual: Optional[bytes]):
+        """
+        :param offset: byte offset of the mismatched token or line in output
+        :param expected: expected token or line (none means no more output is expected)
+        :param actual: actual token or line (none means output ended too early)
+        """
+        self.__offset = offset
+        self.__expected = expected
+        self.__actual = actual
+
+    @property
+    def offset(self) -> int:
+        return self.__offset
+
+    @property
+    def expected(self) -> Optional[bytes]:
+        return self.__expected
+
+    @property
+    def actual(self) -> Optional[bytes]:
+        return self.__actual
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('offset', lambda: self.__offset),
+                ('expected', lambda: repr(self.__expected)),
+                ('actual', lambda: repr(self.__actual)),
+            ]
+        )
+
+    @property
+    def json(self):
+        """
+        get mismatch information
+        :return: mismatch information json
+        """
+        return {
+            'offset': self.offset,
+            'expected': _auto_decode(self.expected) if self.expected is not None else None,
+            'actual': _auto_decode(self.actual) if self.actual is not None else None,
+        }
@@ -0,0 +1,238 @@
+import ctypes
+import os
+import platform
+from typing import Optional, Union, Iterable, FrozenSet, Tuple
+
+from hbutils.model import get_repr_info
+
+_IOPRIO_CLASSES = {'none': 0, 'realtime': 1, 'best-effort': 2, 'idle': 3}
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_WHO_PROCESS = 1
+_SYS_IOPRIO_SET = {
+    'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'armv7l': 314,
+    'ppc64le': 273, 's390x': 282, 'riscv64': 30,
+}
+
+
+def ioprio_set(class_: int, level: int, pid: int = 0):
+    """
+    set io priority of process, python has no binding of ``ioprio_set``, so it is called by syscall number
+    :param class_: io scheduling class (0 for none, 1 for realtime, 2 for best-effort and 3 for idle)
+    :param level: priority level in class (0 - 7, lower is higher priority)
+    :param pid: pid of process (0 means current process)
+    """
+    _number = _SYS_IOPRIO_SET.get(platform.machine(), None)
+    if _number is None:
+        raise EnvironmentError('Ioprio_set is not supported on {machine}.'.format(machine=platform.machine()))
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+    if _libc.syscall(_number, _IOPRIO_WHO_PROCESS, pid, (class_ << _IOPRIO_CLASS_SHIFT) | level) < 0:
+        _errno = ctypes.get_errno()
+        raise OSError(_errno, os.strerror(_errno))
+
+
+def _cpus_process(cpus) -> Optional[FrozenSet[int]]:
+    if cpus is None:
+        return None
+    elif isinstance(cpus, int):
+        _cpus = {cpus}
+    elif isinstance(cpus, str):  # cpuset format, such as 0-3,6
+        _cpus = set()
+        for _part in cpus.replace(' ', '').split(','):
+            if '-' in _part:
+                _begin, _end = _part.split('-', 1)
+                _cpus |= set(range(int(_begin), int(_end) + 1))
+            elif _part:
+                _cpus.add(int(_part))
+    else:
+        _cpus = set(int(_cpu) for _cpu in cpus)
+
+    if not _cpus or any(_cpu < 0 for _cpu in _cpus):
+        raise ValueError('Cpus should be a non-empty set of non-negative ids, but {actual} found.'.format(
+            actual=repr(cpus)))
+    return frozenset(_cpus)
+
+
+def _nice_process(nice) -> Optional[int]:
+    if nice is not None and not -20 <= int(nice) <= 19:
+        raise ValueError('Nice should be within [-20, 19], but {actual} found.'.format(actual=repr(nice)))
+    return int(nice) if nice is not None else None
+
+
+def _ionice_process(ionice) -> Optional[Tuple[str, Optional[int]]]:
+    if ionice is None:
+        return None
+    elif isinstance(ionice, str):
+        _class, _, _level = ionice.partition(':')
+        _class, _level = _class.strip(), int(_level) if _level.strip() else None
+    else:
+        _class, _level = ionice
+
+    if _class not in _IOPRIO_CLASSES:
+        raise ValueError('Ionice class should be one of {classes}, but {actual} found.'.format(
+            classes=repr(list(_IOPRIO_CLASSES.keys())), actual=repr(_class)))
+    if _level is not None and not 0 <= _level <= 7:
+        raise ValueError('Ionice level should be within [0, 7], but {actual} found.'.format(actual=repr(_level)))
+    return _class, _level
+
+
+def _cpus_str(cpus: Iterable[int]) -> str:
+    return ','.join(map(str, sorted(cpus)))
+
+
+def _ionice_str(ionice: Tuple[str, Optional[int]]) -> str:
+    _class, _level = ionice
+    return '{cls}:{level}'.format(cls=_class, level=_level) if _level is not None else _class
+
+
+class Placement:
+    __PLACEMENTS = {"cpus", "nice", "ionice", "exclusive", "cores", }
+
+    def __init__(self, cpus=None, nice=None, ionice=None, exclusive: bool = False, cores: int = 1):
+        """
+        :param cpus: cpu ids to run on, list or cpuset format like ``0-3,6`` (none means not restricted)
+        :param nice: nice value of process (-20 - 19, none means inherited)
+        :param ionice: io priority, ``class`` or ``class:level`` \
+            (class is none, realtime, best-effort or idle, none means inherited)
+        :param exclusive: allocate cores for this run exclusively from the host-level core allocator, \
+            the cores will be chosen from ``cpus`` when given
+        :param cores: count of exclusive cores
+        """
+        self.__cpus = _cpus_process(cpus)
+        self.__nice = _nice_process(nice)
+        self.__ionice = _ionice_process(ionice)
+        self.__exclusive = bool(exclusive)
+        if int(cores) < 1:
+            raise ValueError('Cores should be positive, but {actual} found.'.format(actual=repr(cores)))
+        self.__cores = int(cores)
+
+    @property
+    def cpus(self) -> Optional[FrozenSet[int]]:
+        """
+        :return: cpu ids to run on (none means not restricted)
+        """
+        return self.__cpus
+
+    @property
+    def nice(self) -> Optional[int]:
+        return self.__nice
+
+    @property
+    def ionice(self) -> Optional[Tuple[str, Optional[int]]]:
+        """
+        :return: io scheduling class and level
+        """
+        return self.__ionice
+
+    @property
+    def exclusive(self) -> bool:
+        return self.__exclusive
+
+    @property
+    def cores(self) -> int:
+        return self.__cores
+
+    @property
+    def empty(self) -> bool:
+        """
+        :return: nothing will be applied
+        """
+        return self.__cpus is None and self.__nice is None and self.__ionice is None and not self.__exclusive
+
+    @property
+    def ioprio(self) -> Optional[Tuple[int, int]]:
+        """
+        :return: io scheduling class and level for ``ioprio_set``
+        """
+        if self.__ionice is not None:
+            _class, _level = self.__ionice
+            if _level is None:  # level is ignored by class none and idle, and 4 is the default of others
+                _level = 4 if _class in ('realtime', 'best-effort') else 0
+            return _IOPRIO_CLASSES[_class], _level
+        else:
+            return None
+
+    def with_cpus(self, cpus) -> 'Placement':
+        """
+        :param cpus: new cpu ids
+        :return: a new placement with the given cpus
+        """
+        return Placement(cpus, self.__nice, self.__ionice, self.__exclusive, self.__cores)
+
+    def apply(self):
+        """
+        apply the placement on current process
+        """
+        if self.__cpus is not None:
+            os.sched_setaffinity(0, self.__cpus)
+        if self.__nice is not None:
+            os.setpriority(os.PRIO_PROCESS, 0, self.__nice)
+        if self.__ionice is not None:
+            ioprio_set(*self.ioprio)
+
+    @property
+    def json(self):
+        """
+        get json format data
+        :return: json format data
+        """
+        return {
+            "cpus": sorted(self.__cpus) if self.__cpus is not None else None,
+            "nice": self.__nice,
+            "ionice": _ionice_str(self.__ionice) if self.__ionice is not None else None,
+            "exclusive": self.__exclusive,
+            "cores": self.__cores,
+        }
+
+    @classmethod
+    def load_from_json(cls, json_data: dict) -> 'Placement':
+        """
+        load object from json data
+        :param json_data: json data
+        :return: placement object
+        """
+        return cls(**{key: value for key, value in json_data.items() if key in cls.__PLACEMENTS})
+
+    @classmethod
+    def loads(cls, data: Optional[Union[dict, 'Placement']]) -> 'Placement':
+        """
+        load object from json data or placement object
+        :param data: json data or object
+        :return: placement object
+        """
+        data = data or {}
+        if isinstance(data, Placement):
+            return data
+        elif isinstance(data, dict):
+            return cls.load_from_json(data)
+        else:
+            raise TypeError('{pl} or {dict} expected, but {actual} found.'.format(
+                pl=Placement.__name__,
+                dict=dict.__name__,
+                actual=type(data).__name__,
+            ))
+
+    def __tuple(self):
+        return self.__cpus, self.__nice, self.__ionice, self.__exclusive, self.__cores
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        elif isinstance(other, self.__class__):
+            return self.__tuple() == other.__tuple()
+        else:
+            return False
+
+    def __hash__(self):
+        return hash(self.__tuple())
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('cpus', (lambda: _cpus_str(self.cpus), lambda: self.cpus is not None)),
+                ('nice', (lambda: self.nice, lambda: self.nice is not None)),
+                ('ionice', (lambda: _ionice_str(self.ionice), lambda: self.ionice is not None)),
+                ('exclusive', (lambda: self.cores, lambda: self.exclusive)),
+            ]
+        )
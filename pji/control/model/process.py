@@ -1,7 +1,7 @@
 import os
 import signal
 from resource import struct_rusage
-from typing import Optional
+from typing import Optional, List
 
 from hbutils.model import get_repr_info
 from hbutils.scale import size_to_bytes_str
@@ -115,17 +115,267 @@ class _IResource:
         return self.__resource_usage.ru_maxrss * 1024.0
 
 
+class CgroupUsage:
+    def __init__(self, memory_peak: Optional[int], cpu_time: float, system_time: float, oom_kill: int):
+        """
+        :param memory_peak: peak memory usage of the whole cgroup (unit: B, none means not supported)
+        :param cpu_time: user cpu time of the whole cgroup (unit: s)
+        :param system_time: system cpu time of the whole cgroup (unit: s)
+        :param oom_kill: count of processes killed by oom killer
+        """
+        self.__memory_peak = memory_peak
+        self.__cpu_time = cpu_time
+        self.__system_time = system_time
+        self.__oom_kill = oom_kill
+
+    @property
+    def memory_peak(self) -> Optional[int]:
+        return self.__memory_peak
+
+    @property
+    def cpu_time(self) -> float:
+        return self.__cpu_time
+
+    @property
+    def system_time(self) -> float:
+        return self.__system_time
+
+    @property
+    def oom_kill(self) -> int:
+        return self.__oom_kill
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('memory peak', (lambda: size_to_bytes_str(self.memory_peak), lambda: self.memory_peak is not None)),
+                ('cpu time', lambda: '%.3fs' % self.cpu_time),
+                ('oom kill', (lambda: self.oom_kill, lambda: self.oom_kill)),
+            ]
+        )
+
+    @property
+    def json(self):
+        """
+        get cgroup usage information
+        :return: cgroup usage information json
+        """
+        return {
+            'memory_peak': self.memory_peak,
+            'cpu_time': self.cpu_time,
+            'system_time': self.system_time,
+            'oom_kill': self.oom_kill,
+        }
+
+
+class DescendantUsage:
+    def __init__(self, count: int, cpu_time: float, system_time: float, max_memory: float):
+        """
+        :param count: count of descendants which outlived the child, killed and reaped by subreaper
+        :param cpu_time: user cpu time of these descendants (unit: s)
+        :param system_time: system cpu time of these descendants (unit: s)
+        :param max_memory: max rss memory of these descendants (unit: B)
+        """
+        self.__count = count
+        self.__cpu_time = cpu_time
+        self.__system_time = system_time
+        self.__max_memory = max_memory
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def cpu_time(self) -> float:
+        return self.__cpu_time
+
+    @property
+    def system_time(self) -> float:
+        return self.__system_time
+
+    @property
+    def max_memory(self) -> float:
+        return self.__max_memory
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('count', lambda: self.count),
+                ('cpu time', lambda: '%.3fs' % self.cpu_time),
+                ('max memory', lambda: size_to_bytes_str(self.max_memory)),
+            ]
+        )
+
+    @property
+    def json(self):
+        """
+        get descendant usage information
+        :return: descendant usage information json
+        """
+        return {
+            'count': self.count,
+            'cpu_time': self.cpu_time,
+            'system_time': self.system_time,
+            'max_memory': self.max_memory,
+        }
+
+
+class ResourceSample:
+    def __init__(self, time: float, rss: int, pss: Optional[int], cpu_time: float, processes: int):
+        """
+        :param time: time of sample, relative to start time of process (unit: s)
+        :param rss: total rss memory of the process group (unit: B)
+        :param pss: total pss memory of the process group (unit: B, none means not supported)
+        :param cpu_time: total cpu time (user and system) of the process group (unit: s)
+        :param processes: count of alive processes
+        """
+        self.__time = time
+        self.__rss = rss
+        self.__pss = pss
+        self.__cpu_time = cpu_time
+        self.__processes = processes
+
+    @property
+    def time(self) -> float:
+        return self.__time
+
+    @property
+    def rss(self) -> int:
+        return self.__rss
+
+    @property
+    def pss(self) -> Optional[int]:
+        return self.__pss
+
+    @property
+    def cpu_time(self) -> float:
+        return self.__cpu_time
+
+    @property
+    def processes(self) -> int:
+        return self.__processes
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('time', lambda: '%.3fs' % self.time),
+                ('rss', lambda: size_to_bytes_str(self.rss)),
+                ('pss', (lambda: size_to_bytes_str(self.pss), lambda: self.pss is not None)),
+                ('cpu time', lambda: '%.3fs' % self.cpu_time),
+                ('processes', lambda: self.processes),
+            ]
+        )
+
+    @property
+    def json(self):
+        """
+        get sample information, in compact format
+        :return: list of time, rss, pss, cpu time and processes
+        """
+        return [self.time, self.rss, self.pss, self.cpu_time, self.processes]
+
+
 class ProcessResult(_IStatus, _IDuration, _IResource):
-    def __init__(self, status, start_time, end_time, resource_usage):
+    def __init__(self, status, start_time, end_time, resource_usage, cgroup_usage: Optional[CgroupUsage] = None,
+                 samples: Optional[List[ResourceSample]] = None, cpu_time_exceeded: bool = False,
+                 descendants: Optional[DescendantUsage] = None):
         """
         :param status: result status
         :param start_time: start time of process
         :param end_time: end time of process
         :param resource_usage: resource usage
+        :param cgroup_usage: resource usage of the whole process tree measured by cgroup (none means not used)
+        :param samples: resource samples of the process group in time order (none means not sampled)
+        :param cpu_time_exceeded: whether the process group is killed by cpu time watchdog
+        :param descendants: usage of the descendants which outlived the child (none means not collected)
         """
         _IStatus.__init__(self, status)
         _IDuration.__init__(self, start_time, end_time)
         _IResource.__init__(self, resource_usage)
+        self.__cgroup_usage = cgroup_usage
+        self.__samples = list(samples) if samples is not None else None
+        self.__cpu_time_exceeded = cpu_time_exceeded
+        self.__descendants = descendants
+
+    @property
+    def cgroup_usage(self) -> Optional[CgroupUsage]:
+        """
+        :return: resource usage measured by cgroup
+        """
+        return self.__cgroup_usage
+
+    @property
+    def samples(self) -> Optional[List[ResourceSample]]:
+        """
+        :return: resource samples of the process group
+        """
+        return list(self.__samples) if self.__samples is not None else None
+
+    @property
+    def descendants(self) -> Optional[DescendantUsage]:
+        """
+        :return: usage of the descendants which outlived the child
+        """
+        return self.__descendants
+
+    @property
+    def cpu_time(self):
+        """
+        :return: cpu time usage, measured by cgroup when used, \
+            otherwise including the descendants which outlived the child (unit: s)
+        """
+        if self.__cgroup_usage is not None:
+            return self.__cgroup_usage.cpu_time
+        elif self.__descendants is not None:
+            return _IResource.cpu_time.fget(self) + self.__descendants.cpu_time
+        else:
+            return _IResource.cpu_time.fget(self)
+
+    @property
+    def system_time(self):
+        """
+        :return: system time usage, measured by cgroup when used, \
+            otherwise including the descendants which outlived the child (unit: s)
+        """
+        if self.__cgroup_usage is not None:
+            return self.__cgroup_usage.system_time
+        elif self.__descendants is not None:
+            return _IResource.system_time.fget(self) + self.__descendants.system_time
+        else:
+            return _IResource.system_time.fget(self)
+
+    @property
+    def max_memory(self):
+        """
+        :return: max memory usage, measured by cgroup when supported, \
+            otherwise the largest one of max rss, sampled rss of process group \
+            and max rss of the descendants which outlived the child (unit: B)
+        """
+        if self.__cgroup_usage is not None and self.__cgroup_usage.memory_peak is not None:
+            return float(self.__cgroup_usage.memory_peak)
+
+        _max_memory = _IResource.max_memory.fget(self)
+        if self.__samples:
+            _max_memory = max(_max_memory, float(max(_sample.rss for _sample in self.__samples)))
+        if self.__descendants is not None:
+            _max_memory = max(_max_memory, float(self.__descendants.max_memory))
+        return _max_memory
+
+    @property
+    def oom_killed(self) -> bool:
+        """
+        :return: whether any process is killed by oom killer (only available when cgroup is used)
+        """
+        return self.__cgroup_usage is not None and self.__cgroup_usage.oom_kill > 0
+
+    @property
+    def cpu_time_exceeded(self) -> bool:
+        """
+        :return: whether the process group is killed by cpu time watchdog
+        """
+        return self.__cpu_time_exceeded
 
     def __repr__(self):
         """
@@ -154,4 +404,7 @@ class ProcessResult(_IStatus, _IDuration, _IResource):
             'real_time': self.real_time,
             'cpu_time': self.cpu_time,
             'max_memory': self.max_memory,
+            'cgroup': self.cgroup_usage.json if self.cgroup_usage is not None else None,
+            'samples': [_sample.json for _sample in self.__samples] if self.__samples is not None else None,
+            'descendants': self.descendants.json if self.descendants is not None else None,
         }
@@ -1,5 +1,5 @@
 import resource
-from typing import Optional, Union
+from typing import Optional, Union, List, Tuple, Iterable
 
 from bitmath import MiB
 from hbutils.model import get_repr_info
@@ -64,6 +64,7 @@ class ResourceLimit:
         self.__max_real_time = _duration_process(max_real_time)
         self.__max_process_number = _number_process(max_process_number)
         self.__max_output_size = _memory_process(max_output_size)
+        self.__rlimits = None
 
     @property
     def max_stack(self):
@@ -117,55 +118,71 @@ class ResourceLimit:
         _limit_value = _rprocess(resource.getrlimit(limit_type), value)
         resource.setrlimit(limit_type, _limit_value)
 
-    def __apply_max_stack(self):
+    def __rlimit_max_stack(self):
         """
-        apply max stack limit
+        rlimit of max stack
         """
         if self.max_stack:
             real = self.max_stack
         else:
             real = _UNLIMITED
-        self.__apply_limit(resource.RLIMIT_STACK, real)
+        return resource.RLIMIT_STACK, real
 
-    def __apply_max_memory(self):
+    def __rlimit_max_memory(self):
         """
-        apply max rss memory limit
+        rlimit of max rss memory
         """
         if self.max_memory:
             real = round(self.max_memory + MiB(256).bytes)
         else:
             real = _UNLIMITED
-        self.__apply_limit(resource.RLIMIT_AS, real)
+        return resource.RLIMIT_AS, real
 
-    def __apply_max_cpu_time(self):
+    def __rlimit_max_cpu_time(self):
         """
-        apply max cpu time limit
+        rlimit of max cpu time, only a backstop in whole seconds, the precise limit is enforced by watchdog
         """
         if self.max_cpu_time:
             real = round(self.max_cpu_time) + 1
         else:
             real = _UNLIMITED
-        self.__apply_limit(resource.RLIMIT_CPU, real)
+        return resource.RLIMIT_CPU, real
 
-    def __apply_max_process_number(self):
+    def __rlimit_max_process_number(self):
         """
-        apply max process number limit
+        rlimit of max process number
         """
         if self.max_process_number:
             real = self.max_process_number
         else:
             real = _UNLIMITED
-        self.__apply_limit(resource.RLIMIT_NPROC, real)
+        return resource.RLIMIT_NPROC, real
 
-    def __apply_max_output_size(self):
+    def __rlimit_max_output_size(self):
         """
-        apply max output size limit
+        rlimit of max output size
         """
         if self.max_output_size:
             real = self.max_output_size
         else:
             real = _UNLIMITED
-        self.__apply_limit(resource.RLIMIT_FSIZE, real)
+        return resource.RLIMIT_FSIZE, real
+
+    @property
+    def rlimits(self) -> List[Tuple[int, int]]:
+        """
+        get the rlimits in the order of application, calculated only once
+        :return: list of (limit type, limit value)
+        """
+        if self.__rlimits is None:
+            self.__rlimits = (
+                self.__rlimit_max_process_number(),
+                self.__rlimit_max_stack(),
+                self.__rlimit_max_memory(),
+                self.__rlimit_max_output_size(),
+                self.__rlimit_max_cpu_time(),
+            )
+        return list(self.__rlimits)
 
     @property
     def json(self):
@@ -210,15 +227,15 @@ class ResourceLimit:
                 actual=type(data).__name__,
             ))
 
-    def apply(self):
+    def apply(self, excludes: Iterable[int] = ()):
         """
         apply the resource limits
+        :param excludes: types of rlimits to be skipped (e.g. the ones enforced by cgroup)
         """
-        self.__apply_max_process_number()
-        self.__apply_max_stack()
-        self.__apply_max_memory()
-        self.__apply_max_output_size()
-        self.__apply_max_cpu_time()
+        excludes = set(excludes)
+        for limit_type, value in self.rlimits:
+            if limit_type not in excludes:
+                self.__apply_limit(limit_type, value)
 
     @classmethod
     def __filter_by_properties(cls, **kwargs):
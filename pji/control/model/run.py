@@ -1,11 +1,14 @@
+import signal
 from enum import unique, IntEnum
-from multiprocessing import Lock
-from typing import Optional
+from threading import Lock
+from typing import Optional, Mapping
 
 from hbutils.model import get_repr_info
 
+from .check import OutputMismatch
 from .process import ProcessResult
 from .resource import ResourceLimit
+from .timing import TimingDelivery
 
 
 @unique
@@ -17,6 +20,8 @@ class RunResultStatus(IntEnum):
     MEMORY_LIMIT_EXCEED = 3
     RUNTIME_ERROR = 4
     SYSTEM_ERROR = 5
+    OUTPUT_LIMIT_EXCEED = 6
+    WRONG_OUTPUT = 7
 
     @property
     def ok(self):
@@ -34,15 +39,35 @@ class RunResultStatus(IntEnum):
 
 
 class RunResult:
-    def __init__(self, limit: ResourceLimit, result: Optional[ProcessResult]):
+    def __init__(self, limit: ResourceLimit, result: Optional[ProcessResult],
+                 output_size: Optional[Mapping[str, Optional[int]]] = None,
+                 delivery: Optional[TimingDelivery] = None, interaction: Optional['RunResult'] = None,
+                 mismatch: Optional[OutputMismatch] = None):
         """
         :param limit: resource limit
         :param result: process running result
+        :param output_size: bytes captured from each output stream (none means not counted)
+        :param delivery: delivery of scheduled stdin lines (none means not scheduled)
+        :param interaction: run result of external interactor in mutual run (none means not used)
+        :param mismatch: first mismatch found by output checker (none means not checked or no mismatch)
         """
         self.__limit = limit
         self.__result = result
+        self.__output_size = dict(output_size) if output_size is not None else None
+        self.__delivery = delivery
+        self.__interaction = interaction
+        self.__mismatch = mismatch
         self.__lock = Lock()
 
+    def __output_limit_exceeded(self) -> bool:
+        if self.__result.signal == signal.SIGXFSZ:  # RLIMIT_FSIZE exceeded when writing to file
+            return True
+        elif self.__limit.max_output_size is not None and self.__output_size is not None:
+            _total = sum(_size for _size in self.__output_size.values() if _size is not None)
+            return _total > self.__limit.max_output_size
+        else:
+            return False
+
     def __get_status(self) -> RunResultStatus:
         """
         Get status information
@@ -50,12 +75,18 @@ class RunResult:
         """
         if self.__result is None:
             return RunResultStatus.NOT_COMPLETED
-        elif self.__limit.max_cpu_time is not None and self.__result.cpu_time > self.__limit.max_cpu_time:
+        elif self.__result.cpu_time_exceeded or \
+                (self.__limit.max_cpu_time is not None and self.__result.cpu_time > self.__limit.max_cpu_time):
             return RunResultStatus.CPU_TIME_LIMIT_EXCEED
         elif self.__limit.max_real_time is not None and self.__result.real_time > self.__limit.max_real_time:
             return RunResultStatus.REAL_TIME_LIMIT_EXCEED
-        elif self.__limit.max_memory is not None and self.__result.max_memory > self.__limit.max_memory:
+        elif self.__result.oom_killed or \
+                (self.__limit.max_memory is not None and self.__result.max_memory > self.__limit.max_memory):
             return RunResultStatus.MEMORY_LIMIT_EXCEED
+        elif self.__output_limit_exceeded():
+            return RunResultStatus.OUTPUT_LIMIT_EXCEED
+        elif self.__mismatch is not None:  # the process may be killed by checker
+            return RunResultStatus.WRONG_OUTPUT
         elif self.__result.exitcode != 0:
             return RunResultStatus.RUNTIME_ERROR
         elif not self.__result.ok:
@@ -78,6 +109,36 @@ class RunResult:
         with self.__lock:
             return self.__result
 
+    @property
+    def output_size(self) -> Optional[Mapping[str, Optional[int]]]:
+        """
+        :return: bytes captured from each output stream, \
+            none for the stream plumbed directly into file (none means not counted)
+        """
+        with self.__lock:
+            return dict(self.__output_size) if self.__output_size is not None else None
+
+    @property
+    def delivery(self) -> Optional[TimingDelivery]:
+        """
+        :return: delivery of scheduled stdin lines, none when stdin is not scheduled
+        """
+        return self.__delivery
+
+    @property
+    def interaction(self) -> Optional['RunResult']:
+        """
+        :return: run result of external interactor in mutual run, none when not used
+        """
+        return self.__interaction
+
+    @property
+    def mismatch(self) -> Optional[OutputMismatch]:
+        """
+        :return: first mismatch found by output checker, none when not checked or no mismatch
+        """
+        return self.__mismatch
+
     @property
     def status(self) -> RunResultStatus:
         """
@@ -123,6 +184,10 @@ class RunResult:
         return {
             'limit': self.limit.json,
             'result': self.result.json if self.result else None,
+            'output_size': self.output_size,
+            'delivery': self.delivery.json if self.delivery else None,
+            'interaction': self.interaction.json if self.interaction else None,
+            'mismatch': self.mismatch.json if self.mismatch else None,
             'status': self.status.name,
             'ok': self.ok,
             'completed': self.completed,
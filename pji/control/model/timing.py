@@ -24,6 +24,23 @@ def _stable_process(lines: _TIMING_LIST_TYPING) -> _TIMING_LIST_TYPING:
     return [(_time, _line) for _time, i, _line in _sorted]
 
 
+_DUMP_FLOAT_LENGTH = 6
+
+
+def _dump_int_length(end_time: float) -> int:
+    """
+    :param end_time: time of the last line
+    :return: length of integer part, all the times are aligned with it in dumped content
+    """
+    return int(math.floor(math.log10(end_time)) + 1) if end_time > 0 else 1
+
+
+def _dump_line(time_: float, line: _LINE_TYPING, int_length: int) -> str:
+    _time_str = '%%.%sf' % _DUMP_FLOAT_LENGTH % time_
+    _time_str = ' ' * (_DUMP_FLOAT_LENGTH + 1 + int_length - len(_time_str)) + _time_str
+    return '[%s]%s%s' % (_time_str, _auto_decode(line), _auto_decode(os.linesep))
+
+
 class TimingContent(metaclass=ABCMeta):
     def __init__(self, lines: Optional[_TIMING_LIST_TYPING] = None):
         self.__lines = _stable_process(lines or [])
@@ -50,18 +67,12 @@ class TimingContent(metaclass=ABCMeta):
             'line': _auto_decode(_line),
         } for _time, _line in self.__lines]
 
-    __DUMP_FLOAT_LENGTH = 6
-
     def dumps(self) -> str:
         if self.__lines:
-            _end_time = self.__lines[-1][0]
-            _int_length = int(math.floor(math.log10(_end_time)) + 1)
-            _mask = '%%.%sf' % self.__DUMP_FLOAT_LENGTH
+            _int_length = _dump_int_length(self.__lines[-1][0])
             with io.StringIO() as s:
                 for _time, _line in self.__lines:
-                    _time_str = _mask % _time
-                    _time_str = ' ' * (self.__DUMP_FLOAT_LENGTH + 1 + _int_length - len(_time_str)) + _time_str
-                    s.write('[%s]%s%s' % (_time_str, _auto_decode(_line), _auto_decode(os.linesep)))
+                    s.write(_dump_line(_time, _line, _int_length))
 
                 return s.getvalue()
         else:
@@ -94,6 +105,75 @@ class TimingContent(metaclass=ABCMeta):
         )
 
 
+class TimingDelivery:
+    def __init__(self, skews: List[Optional[float]], skipped: float = 0.0):
+        """
+        :param skews: delivery skew of each scheduled line, which is the time from its target time to the time \
+            it is written into pipe (unit: s, none means not delivered)
+        :param skipped: virtual time skipped in fast-forward mode (unit: s)
+        """
+        self.__skews = list(skews)
+        self.__skipped = skipped
+
+    @property
+    def skews(self) -> List[Optional[float]]:
+        return list(self.__skews)
+
+    @property
+    def skipped(self) -> float:
+        return self.__skipped
+
+    @property
+    def count(self) -> int:
+        """
+        :return: count of delivered lines
+        """
+        return sum(1 for _skew in self.__skews if _skew is not None)
+
+    @property
+    def undelivered(self) -> int:
+        """
+        :return: count of lines not delivered (e.g. the process exited before)
+        """
+        return len(self.__skews) - self.count
+
+    @property
+    def max_skew(self) -> Optional[float]:
+        _skews = [_skew for _skew in self.__skews if _skew is not None]
+        return max(_skews) if _skews else None
+
+    @property
+    def mean_skew(self) -> Optional[float]:
+        _skews = [_skew for _skew in self.__skews if _skew is not None]
+        return sum(_skews) / len(_skews) if _skews else None
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('delivered', lambda: self.count),
+                ('undelivered', (lambda: self.undelivered, lambda: self.undelivered > 0)),
+                ('max_skew', (lambda: '%.6fs' % self.max_skew, lambda: self.max_skew is not None)),
+                ('skipped', (lambda: '%.3fs' % self.skipped, lambda: self.skipped > 0)),
+            ]
+        )
+
+    @property
+    def json(self):
+        """
+        get delivery information
+        :return: delivery information json
+        """
+        return {
+            'skews': self.skews,
+            'count': self.count,
+            'undelivered': self.undelivered,
+            'max_skew': self.max_skew,
+            'mean_skew': self.mean_skew,
+            'skipped': self.skipped,
+        }
+
+
 _LINE_IDENT = (re.compile(r'\s*\[\s*(\d+(\.\d*)?)\s*]([\s\S]*)'), (1, 3))
 _LINE_COMMENT = re.compile(r'\s*#\s*[\s\S]*')
 
@@ -1,3 +1,6 @@
+from .aio import AsyncCommonProcess, AsyncInteractiveProcess, async_common_process, async_interactive_process
+from .capture import CaptureBuffer
+from .check import OutputChecker, CHECK_MODES
 from .common import CommonProcess, common_process
 from .executor import ExecutorException
 from .interactive import InteractiveProcess, interactive_process
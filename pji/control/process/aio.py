@@ -0,0 +1,437 @@
+import asyncio
+import os
+from functools import partial
+from typing import Optional, Mapping, Tuple, Callable, AsyncIterator
+
+from .base import BYTES_LINESEQ, LineSplitter, CountdownEvent
+from .capture import CaptureBuffer, OutputCounter
+from .common import _capture_output, _capture_to_bytes
+from .decorator import process_setter
+from .launcher import launch_child, LaunchedChild
+from .supervisor import get_supervisor
+from ..model import ResourceLimit, RunResult, RunResultStatus, ResourceSample
+from ...utils import ValueProxy
+
+
+def _threadsafe_done(loop: asyncio.AbstractEventLoop, future: asyncio.Future) -> Callable[[], None]:
+    """
+    get the function which can be called in any thread (e.g. io supervisor) to complete the future
+    """
+
+    def _set_result():
+        if not future.done():
+            future.set_result(None)
+
+    def _done():
+        try:
+            loop.call_soon_threadsafe(_set_result)
+        except RuntimeError:  # loop is already closed
+            pass
+
+    return _done
+
+
+# Attention: this function is blocking (fork and handshake with child), it is run in the executor of event loop
+# noinspection PyUnusedLocal
+@process_setter
+def _launch_child(args, preexec_fn=None, resources=None,
+                  environ: Optional[Mapping[str, str]] = None,
+                  cwd: Optional[str] = None, identification=None,
+                  launcher: Optional[str] = None,
+                  stdin_fd: Optional[int] = None, stdout_fd: Optional[int] = None, stderr_fd: Optional[int] = None,
+                  cgroup=None, sample_interval: Optional[float] = None, placement=None, core_lease=None,
+                  executable: Optional[str] = None, groups=None) -> Tuple[LaunchedChild, ResourceLimit]:
+    resources = ResourceLimit.loads(resources)
+    _child = launch_child(
+        args=args, environ=dict(environ or {}), preexec_fn=preexec_fn,
+        resources=resources, cwd=cwd, identification=identification, launcher=launcher, cgroup=cgroup,
+        sample_interval=sample_interval, placement=placement, core_lease=core_lease,
+        executable=executable, groups=groups,
+        stdin_fd=stdin_fd, stdout_fd=stdout_fd, stderr_fd=stderr_fd,
+    )
+    return _child, resources
+
+
+async def _launch(**kwargs) -> Tuple[asyncio.AbstractEventLoop, LaunchedChild, ResourceLimit]:
+    _loop = asyncio.get_running_loop()
+    _child, _resources = await _loop.run_in_executor(None, partial(_launch_child, **kwargs))
+    return _loop, _child, _resources
+
+
+class AsyncGeneralProcess:
+    def __init__(self, loop: asyncio.AbstractEventLoop, child: LaunchedChild, resources: ResourceLimit,
+                 output_complete: asyncio.Future, output_size_func: Callable[[], Optional[Mapping[str, int]]]):
+        """
+        :param loop: event loop of this process
+        :param child: launched child process
+        :param resources: resource limits
+        :param output_complete: future completed when all the output pipes are closed
+        :param output_size_func: function to get the output sizes
+        """
+        self.__loop = loop
+        self.__child = child
+        self.__resources = resources
+        self.__output_complete = output_complete
+        self.__output_size_func = output_size_func
+        self.__result = None
+
+        self.__exited = loop.create_future()
+        child.watch.add_done_callback(_threadsafe_done(loop, self.__exited))
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self.__loop
+
+    @property
+    def pid(self) -> int:
+        return self.__child.pid
+
+    @property
+    def start_time(self) -> float:
+        return self.__child.start_time
+
+    @property
+    def resources(self) -> ResourceLimit:
+        return self.__resources
+
+    @property
+    def result(self) -> RunResult:
+        if self.__result is None or self.__result.result is None:
+            self.__result = RunResult(self.__resources, self.__child.watch.result, self.__output_size_func())
+        return self.__result
+
+    @property
+    def ok(self) -> bool:
+        return self.result.ok
+
+    @property
+    def completed(self) -> bool:
+        return self.result.completed
+
+    @property
+    def status(self) -> RunResultStatus:
+        return self.result.status
+
+    def snapshot(self) -> Optional[ResourceSample]:
+        """
+        get the latest resource sample
+        :return: latest sample (none when not sampled)
+        """
+        return self.__child.sampler.latest if self.__child.sampler is not None else None
+
+    def kill(self):
+        """
+        kill the process group, e.g. when the task using this process is cancelled
+        """
+        if not self.__exited.done():
+            self.__child.watch.kill()
+
+    async def join(self):
+        """
+        wait until the output pipes are closed and the process is exited and measured
+        """
+        await asyncio.shield(self.__output_complete)
+        await asyncio.shield(self.__exited)
+
+    async def _close(self):
+        raise NotImplementedError  # pragma: no cover
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:  # e.g. cancelled, the process should not be left running
+            self.kill()
+        await self._close()
+        await self.join()
+
+
+class AsyncCommonProcess(AsyncGeneralProcess):
+    def __init__(self, loop: asyncio.AbstractEventLoop, child: LaunchedChild, resources: ResourceLimit,
+                 tee_stdout_fd: Optional[int] = None, tee_stderr_fd: Optional[int] = None, spill_threshold=None):
+        """
+        :param loop: event loop of this process
+        :param child: launched child process
+        :param resources: resource limits
+        :param tee_stdout_fd: fd which the captured stdout is also written to (none means not used)
+        :param tee_stderr_fd: fd which the captured stderr is also written to (none means not used)
+        :param spill_threshold: max in-memory size of captured stdout or stderr
+        """
+        self.__child = child
+        self.__complete = loop.create_future()
+        self.__communicate_complete = CountdownEvent(3)
+        self.__communicate_complete.add_done_callback(_threadsafe_done(loop, self.__complete))
+        self.__stdin, self.__stdout, self.__stderr = ValueProxy(), ValueProxy(), ValueProxy()
+        self.__communicated = False
+
+        # stdout and stderr are captured by io supervisor, only the completion is sent to event loop
+        _streams = {'stdout': child.stdout, 'stderr': child.stderr}
+        _counter = OutputCounter(
+            limit=resources.max_output_size, on_exceed=child.watch.kill,
+            streams=[_name for _name, _fd in _streams.items() if _fd is not None],
+        )
+        _supervisor = get_supervisor()
+        _capture_output(_supervisor, 'stdout', child.stdout, tee_stdout_fd, spill_threshold,
+                        _counter, self.__stdout, self.__communicate_complete)
+        _capture_output(_supervisor, 'stderr', child.stderr, tee_stderr_fd, spill_threshold,
+                        _counter, self.__stderr, self.__communicate_complete)
+
+        def _output_size():
+            _sizes = _counter.sizes
+            return {_name: _sizes.get(_name, None) for _name in _streams.keys()}
+
+        AsyncGeneralProcess.__init__(self, loop, child, resources, self.__complete, _output_size)
+
+    async def communicate(self, stdin: Optional[bytes] = None) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """
+        send stdin and wait until stdout and stderr are closed
+        :param stdin: data of stdin (should be empty when stdin fd is given)
+        :return: stdout and stderr (none when plumbed directly)
+        """
+        if self.__communicated:
+            raise RuntimeError('Already communicated.')
+        self.__communicated = True
+
+        self.__stdin.value = stdin or b''
+        if self.__child.stdin is not None:
+            get_supervisor().add_writer(self.__child.stdin, self.__stdin.value, self.__communicate_complete.count_down)
+        elif stdin:
+            raise ValueError('Stdin should be empty when stdin fd is given, but {actual} found.'.format(
+                actual=repr(stdin)))
+        else:
+            self.__communicate_complete.count_down()
+
+        await asyncio.shield(self.__complete)
+        return self.stdout, self.stderr
+
+    @property
+    def stdin(self) -> Optional[bytes]:
+        return self.__stdin.value
+
+    @property
+    def stdout(self) -> Optional[bytes]:
+        return _capture_to_bytes(self.__stdout.value)
+
+    @property
+    def stderr(self) -> Optional[bytes]:
+        return _capture_to_bytes(self.__stderr.value)
+
+    @property
+    def stdout_capture(self) -> Optional[CaptureBuffer]:
+        return self.__stdout.value
+
+    @property
+    def stderr_capture(self) -> Optional[CaptureBuffer]:
+        return self.__stderr.value
+
+    async def _close(self):
+        if not self.__communicated:
+            await self.communicate()
+
+
+class _StdinProtocol(asyncio.BaseProtocol):
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.__loop = loop
+        self.__paused = False
+        self.__lost = False
+        self.__waiters = []
+
+    @property
+    def lost(self) -> bool:
+        return self.__lost
+
+    def __wakeup(self):
+        _waiters, self.__waiters = self.__waiters, []
+        for _waiter in _waiters:
+            if not _waiter.done():
+                _waiter.set_result(None)
+
+    def pause_writing(self):
+        self.__paused = True
+
+    def resume_writing(self):
+        self.__paused = False
+        self.__wakeup()
+
+    def connection_lost(self, exc):
+        self.__lost = True
+        self.__wakeup()
+
+    async def drain(self):
+        if self.__lost:
+            raise BrokenPipeError('Stdin of process is closed.')
+        if self.__paused:
+            _waiter = self.__loop.create_future()
+            self.__waiters.append(_waiter)
+            await _waiter
+            if self.__lost:
+                raise BrokenPipeError('Stdin of process is closed.')
+
+
+_OUTPUT_END = object()
+
+
+class AsyncInteractiveProcess(AsyncGeneralProcess):
+    def __init__(self, loop: asyncio.AbstractEventLoop, child: LaunchedChild, resources: ResourceLimit,
+                 stdin_transport: asyncio.WriteTransport, stdin_protocol: _StdinProtocol):
+        """
+        :param loop: event loop of this process
+        :param child: launched child process
+        :param resources: resource limits
+        :param stdin_transport: pipe transport of stdin
+        :param stdin_protocol: protocol of stdin transport
+        """
+        self.__stdin_transport = stdin_transport
+        self.__stdin_protocol = stdin_protocol
+        self.__queue = asyncio.Queue()
+        _complete = loop.create_future()
+
+        # lines are split by io supervisor, and then sent to the queue in event loop
+        _start_time = child.start_time
+        _output_complete = CountdownEvent(2)
+        _output_complete.add_done_callback(_threadsafe_done(loop, _complete))
+        _output_complete.add_done_callback(lambda: loop.call_soon_threadsafe(self.__queue.put_nowait, _OUTPUT_END))
+        _counter = OutputCounter(limit=resources.max_output_size, on_exceed=child.watch.kill,
+                                 streams=['stdout', 'stderr'])
+        _supervisor = get_supervisor()
+
+        def _add_line_reader(fd: int, tag: str):
+            def _put_line(_time: float, _line: bytes):
+                loop.call_soon_threadsafe(self.__queue.put_nowait, (_time - _start_time, tag, _line.rstrip(b'\r\n')))
+
+            _splitter = LineSplitter(_put_line)
+
+            def _on_data(data: bytes):
+                if _counter.add(tag, len(data)):  # the rest is drained and dropped after output limit exceeded
+                    _splitter.feed(data)
+
+            def _on_close():
+                _splitter.close()
+                _output_complete.count_down()
+
+            _supervisor.add_reader(fd, _on_data, _on_close)
+
+        _add_line_reader(child.stdout, 'stdout')
+        _add_line_reader(child.stderr, 'stderr')
+        self.__output_iter = self.__output_yield()
+        AsyncGeneralProcess.__init__(self, loop, child, resources, _complete, lambda: _counter.sizes)
+
+    async def __output_yield(self) -> AsyncIterator[Tuple[float, str, bytes]]:
+        while True:
+            _item = await self.__queue.get()
+            if _item is _OUTPUT_END:
+                break
+            yield _item
+
+    @property
+    def output_yield(self) -> AsyncIterator[Tuple[float, str, bytes]]:
+        """
+        :return: async iterator of output lines, (time from start, ``stdout`` or ``stderr``, line)
+        """
+        return self.__output_iter
+
+    async def print_stdin(self, line: bytes, end: bytes = BYTES_LINESEQ):
+        """
+        write a line into stdin, blocked (asynchronously) when the pipe is full
+        :param line: line to be written
+        :param end: end of line
+        """
+        if self.__stdin_protocol.lost or self.__stdin_transport.is_closing():
+            raise BrokenPipeError('Stdin of process is closed.')
+        self.__stdin_transport.write(line + end)
+        await self.__stdin_protocol.drain()
+
+    async def close_stdin(self):
+        """
+        close stdin after all the written data is flushed
+        """
+        if not self.__stdin_transport.is_closing():
+            self.__stdin_transport.close()
+
+    async def _close(self):
+        await self.close_stdin()
+        async for _ in self.__output_iter:  # load all output
+            pass
+
+
+# noinspection PyIncorrectDocstring
+async def async_common_process(args, shell: bool = False, preexec_fn=None, resources=None,
+                               environ: Optional[Mapping[str, str]] = None,
+                               cwd: Optional[str] = None, identification=None,
+                               launcher: Optional[str] = None, resource_backend: Optional[str] = None,
+                               stdin_fd: Optional[int] = None, stdout_fd: Optional[int] = None,
+                               stderr_fd: Optional[int] = None, tee: bool = False, spill_threshold=None,
+                               sample_interval: Optional[float] = None, placement=None) -> AsyncCommonProcess:
+    """
+    Create a common process in event loop, the pipes and exit of child are served by io supervisor \
+        and only the completions are sent to event loop, so no thread is used for each process
+    :param args: arguments for execution
+    :param shell: use shell to execute args
+    :param preexec_fn: pre execute function to attach before that
+    :param resources: resource limit
+    :param environ: environment variables
+    :param cwd: new work dir
+    :param identification: user and group for execution
+    :param launcher: launcher type, ``fork`` or ``forkserver`` (default from environment variable ``PJI_LAUNCHER``)
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param stdin_fd: fd to be dup2'd into child as stdin, stdin of ``communicate`` must be empty when used
+    :param stdout_fd: fd to be dup2'd into child as stdout
+    :param stderr_fd: fd to be dup2'd into child as stderr
+    :param tee: keep in-memory copy of stdout and stderr even when ``stdout_fd`` or ``stderr_fd`` is given
+    :param spill_threshold: max in-memory size of captured stdout or stderr (unit: B, default is 16MiB)
+    :param sample_interval: interval of resource sampling based on ``/proc`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of child process
+    :return: AsyncCommonProcess object to do run
+    """
+    _loop, _child, _resources = await _launch(
+        args=args, shell=shell, preexec_fn=preexec_fn, resources=resources, environ=environ, cwd=cwd,
+        identification=identification, launcher=launcher, resource_backend=resource_backend,
+        sample_interval=sample_interval, placement=placement, stdin_fd=stdin_fd,
+        stdout_fd=None if tee else stdout_fd,
+        stderr_fd=None if tee else stderr_fd,
+    )
+    return AsyncCommonProcess(
+        _loop, _child, _resources,
+        tee_stdout_fd=stdout_fd if tee else None,
+        tee_stderr_fd=stderr_fd if tee else None,
+        spill_threshold=spill_threshold,
+    )
+
+
+# noinspection PyIncorrectDocstring
+async def async_interactive_process(args, shell: bool = False, preexec_fn=None, resources=None,
+                                    environ: Optional[Mapping[str, str]] = None,
+                                    cwd: Optional[str] = None, identification=None,
+                                    launcher: Optional[str] = None, resource_backend: Optional[str] = None,
+                                    sample_interval: Optional[float] = None,
+                                    placement=None) -> AsyncInteractiveProcess:
+    """
+    Create an interactive process in event loop, stdin is written by pipe transport of event loop
+    :param args: arguments for execution
+    :param shell: use shell to execute args
+    :param preexec_fn: pre execute function to attach before that
+    :param resources: resource limit
+    :param environ: environment variables
+    :param cwd: new work dir
+    :param identification: user and group for execution
+    :param launcher: launcher type, ``fork`` or ``forkserver`` (default from environment variable ``PJI_LAUNCHER``)
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param sample_interval: interval of resource sampling based on ``/proc`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of child process
+    :return: AsyncInteractiveProcess object to do run
+    """
+    _loop, _child, _resources = await _launch(
+        args=args, shell=shell, preexec_fn=preexec_fn, resources=resources, environ=environ, cwd=cwd,
+        identification=identification, launcher=launcher, resource_backend=resource_backend,
+        sample_interval=sample_interval, placement=placement,
+    )
+    try:
+        _transport, _protocol = await _loop.connect_write_pipe(
+            lambda: _StdinProtocol(_loop), os.fdopen(_child.stdin, 'wb', 0))
+    except BaseException:  # pragma: no cover
+        _child.watch.kill()
+        raise
+
+    return AsyncInteractiveProcess(_loop, _child, _resources, _transport, _protocol)
@@ -1,26 +1,30 @@
-import io
 import os
 import signal
 import time
 from abc import ABCMeta
-from multiprocessing import Event, Value, Lock
-from multiprocessing.synchronize import Event as _EventType
-from queue import Empty, Queue
-from threading import Thread
-from typing import Tuple, Callable, Optional, BinaryIO
+from collections import deque
+from threading import Thread, Event, Lock, Condition
+from typing import Tuple, Callable, Optional, Mapping
 
-from ..model import ProcessResult, ResourceLimit, RunResult, RunResultStatus
+from .tree import TreeCleaner
+from ..model import ProcessResult, ResourceLimit, RunResult, RunResultStatus, ResourceSample, OutputMismatch
 from ...utils import ValueProxy
 
 
 class GeneralProcess(metaclass=ABCMeta):
     def __init__(self, start_time: float, resources: ResourceLimit,
                  process_result_func: Callable[[], Optional[ProcessResult]],
-                 lifetime_event: _EventType, lock: Optional[Lock] = None):
+                 lifetime_event: Event, lock: Optional[Lock] = None,
+                 output_size_func: Optional[Callable[[], Optional[Mapping[str, Optional[int]]]]] = None,
+                 snapshot_func: Optional[Callable[[], Optional[ResourceSample]]] = None,
+                 mismatch_func: Optional[Callable[[], Optional[OutputMismatch]]] = None):
         self.__start_time = start_time
         self.__resources = resources
         self.__process_result = None
         self.__process_result_func = process_result_func
+        self.__output_size_func = output_size_func or (lambda: None)
+        self.__snapshot_func = snapshot_func or (lambda: None)
+        self.__mismatch_func = mismatch_func or (lambda: None)
         self.__result = None
         self.__lifetime_event = lifetime_event
         self.__lock = lock or Lock()
@@ -32,7 +36,8 @@ class GeneralProcess(metaclass=ABCMeta):
 
     def __get_result(self) -> RunResult:
         if self.__result is None or self.__result.result is None:
-            self.__result = RunResult(self.__resources, self.__get_process_result())
+            self.__result = RunResult(self.__resources, self.__get_process_result(), self.__output_size_func(),
+                                      mismatch=self.__mismatch_func())
         return self.__result
 
     def _wait_for_end(self):
@@ -68,6 +73,13 @@ class GeneralProcess(metaclass=ABCMeta):
         with self.__lock:
             return self.__get_result().status
 
+    def snapshot(self) -> Optional[ResourceSample]:
+        """
+        get the latest resource sample, the lock is not taken so it will not be blocked by ``join``
+        :return: latest sample (none when not sampled)
+        """
+        return self.__snapshot_func()
+
     def join(self):
         with self.__lock:
             self._wait_for_end()
@@ -76,48 +88,193 @@ class GeneralProcess(metaclass=ABCMeta):
 BYTES_LINESEQ = bytes(os.linesep, 'utf8')
 
 
-def read_from_stream(stream: BinaryIO, process_complete: _EventType) -> bytes:
-    with io.BytesIO() as bio:
-        for line in stream:
-            bio.write(line)
-
-        return bio.getvalue()
-
-
-def load_lines_from_stream(stream: BinaryIO, stream_ready: _EventType, process_complete: _EventType,
-                           queue: Queue, trans=None):
-    _processing_queue = Queue()
-    _load_complete = Event()
-    trans = trans or (lambda x: x)
-
-    def _output_load_func():
-        stream_ready.set()
-        for line in stream:
-            _processing_queue.put((time.time(), line))
-
-        _load_complete.set()
-
-    def _item_process_func():
-        while not _processing_queue.empty() or not _load_complete.is_set():
-            try:
-                item = _processing_queue.get(timeout=0.2)
-            except Empty:
-                continue
+class LineSplitter:
+    def __init__(self, callback: Callable[[Optional[float], bytes], None], timestamp: bool = True):
+        """
+        :param callback: callback for each line with the time it is received
+        :param timestamp: get the time of lines (default is True, otherwise the time will be none)
+        """
+        self.__callback = callback
+        self.__timestamp = timestamp
+        self.__buffer = bytearray()
+
+    def feed(self, data: bytes):
+        """
+        feed a chunk of data
+        :param data: chunk data
+        """
+        _time = time.time() if self.__timestamp else None
+        _start, _index = 0, data.find(b'\n')
+        while _index >= 0:
+            _line = data[_start:_index + 1]
+            if self.__buffer:
+                _line = bytes(self.__buffer) + _line
+                self.__buffer.clear()
+            self.__callback(_time, _line)
+            _start, _index = _index + 1, data.find(b'\n', _index + 1)
+
+        self.__buffer += data[_start:]
+
+    def close(self):
+        """
+        flush the last line (which has no line separator)
+        """
+        if self.__buffer:
+            _line = bytes(self.__buffer)
+            self.__buffer.clear()
+            self.__callback(time.time() if self.__timestamp else None, _line)
+
+
+class CountdownEvent:
+    def __init__(self, count: int):
+        """
+        :param count: count of calls before set
+        """
+        self.__count = count
+        self.__lock = Lock()
+        self.__event = Event()
+        self.__callbacks = []
+        if self.__count <= 0:
+            self.__event.set()
+
+    def count_down(self):
+        with self.__lock:
+            self.__count -= 1
+            if self.__count <= 0:
+                self.__event.set()
+                _callbacks, self.__callbacks = self.__callbacks, []
             else:
-                queue.put(trans(item))
-
-    _output_load_thread = Thread(target=_output_load_func)
-    _item_process_func = Thread(target=_item_process_func)
+                _callbacks = []
 
-    _output_load_thread.start()
-    _item_process_func.start()
-
-    _output_load_thread.join()
-    _item_process_func.join()
+        for _callback in _callbacks:
+            _callback()
 
+    def add_done_callback(self, callback: Callable[[], None]):
+        """
+        add callback which will be called once the event is set, it will be called immediately when already set
+        :param callback: callback function
+        """
+        with self.__lock:
+            if not self.__event.is_set():
+                self.__callbacks.append(callback)
+                return
+        callback()
+
+    def is_set(self) -> bool:
+        return self.__event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.__event.wait(timeout)
+
+
+class OutputQueue:
+    """
+    Bounded queue of output records from io supervisor to consumer.
+    Putting never blocks (the supervisor should not be blocked), instead ``on_pause`` is called when the queue is full
+    and ``on_resume`` is called when half of it is drained, so that the rest of output is kept in pipe.
+    Getting is blocked (without polling) until a record is put or the queue is closed.
+    """
+
+    def __init__(self, maxsize: int, on_pause: Optional[Callable[[], None]] = None,
+                 on_resume: Optional[Callable[[], None]] = None):
+        """
+        :param maxsize: max count of records before paused
+        :param on_pause: callback when producer should be paused
+        :param on_resume: callback when producer should be resumed
+        """
+        self.__maxsize = maxsize
+        self.__on_pause = on_pause or (lambda: None)
+        self.__on_resume = on_resume or (lambda: None)
+
+        self.__items = deque()
+        self.__condition = Condition()
+        self.__closed = False
+        self.__paused = False
 
-def measure_thread(start_time_ok: Event, start_time: Value, child_pid: int) \
-        -> Tuple[Thread, _EventType, _EventType, _EventType, ValueProxy]:
+    @property
+    def paused(self) -> bool:
+        with self.__condition:
+            return self.__paused
+
+    def put(self, item):
+        """
+        put a record into queue
+        :param item: record
+        """
+        with self.__condition:
+            self.__items.append(item)
+            self.__condition.notify()
+            if not self.__paused and len(self.__items) >= self.__maxsize:
+                self.__paused = True
+                self.__on_pause()  # called in lock, so it will never be reordered with on_resume
+
+    def close(self):
+        """
+        mark the end of records, the rest records can still be got
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+
+    def get(self):
+        """
+        get a record from queue, blocked until a record is put or the queue is closed
+        :return: record, none when queue is closed and empty
+        """
+        with self.__condition:
+            while not self.__items and not self.__closed:
+                self.__condition.wait()
+            if not self.__items:
+                return None
+
+            _item = self.__items.popleft()
+            self.__try_resume()
+            return _item
+
+    def get_many(self) -> Optional[list]:
+        """
+        get all the records in queue, blocked until a record is put or the queue is closed
+        :return: list of records (at least one), none when queue is closed and empty
+        """
+        with self.__condition:
+            while not self.__items and not self.__closed:
+                self.__condition.wait()
+            if not self.__items:
+                return None
+
+            _items = list(self.__items)
+            self.__items.clear()
+            self.__try_resume()
+            return _items
+
+    def __try_resume(self):
+        if self.__paused and len(self.__items) <= self.__maxsize // 2:
+            self.__paused = False
+            self.__on_resume()
+
+    def __len__(self):
+        with self.__condition:
+            return len(self.__items)
+
+
+class EventGroup:
+    def __init__(self, *events):
+        """
+        :param events: events to be waited
+        """
+        self.__events = events
+
+    def is_set(self) -> bool:
+        return all(_event.is_set() for _event in self.__events)
+
+    def wait(self):
+        for _event in self.__events:
+            _event.wait()
+
+
+def measure_thread(start_time: float, child_pid: int, cgroup=None, sampler=None, watchdog=None,
+                   on_complete=None) \
+        -> Tuple[Thread, Event, Event, Event, ValueProxy]:
     _process_result = ValueProxy()
     _process_complete = Event()
     _measure_initialized = Event()
@@ -127,22 +284,28 @@ def measure_thread(start_time_ok: Event, start_time: Value, child_pid: int) \
         _measure_initialized.set()
         _, status, resource_usage = os.wait4(child_pid, os.WSTOPPED)
         _process_complete.set()
-        start_time_ok.wait()
-        _process_result.value = ProcessResult(status, start_time.value, time.time(), resource_usage)
+        _end_time = time.time()
+        _samples = sampler.stop() if sampler is not None else None
+        _cpu_time_exceeded = watchdog.stop() if watchdog is not None else False
+        _descendants = TreeCleaner(child_pid, cgroup).run()
+        _cgroup_usage = cgroup.finish() if cgroup is not None else None
+        _process_result.value = ProcessResult(status, start_time, _end_time, resource_usage,
+                                              _cgroup_usage, _samples, _cpu_time_exceeded, _descendants)
+        if on_complete is not None:
+            on_complete()
         _measure_complete.set()
 
     return Thread(target=_thread_func), _measure_initialized, _process_complete, _measure_complete, _process_result
 
 
-def killer_thread(start_time_ok: Event, start_time: Value, child_pid: int,
-                  real_time_limit: float, process_complete: Event) -> Tuple[Thread, _EventType]:
+def killer_thread(start_time: float, child_pid: int,
+                  real_time_limit: float, process_complete: Event) -> Tuple[Thread, Event]:
     _killer_initialized = Event()
 
     def _thread_func():
         _killer_initialized.set()
         if real_time_limit is not None:
-            start_time_ok.wait()
-            target_time = start_time.value + real_time_limit
+            target_time = start_time + real_time_limit
             while time.time() < target_time and not process_complete.is_set():
                 time.sleep(min(max(target_time - time.time(), 0.0), 0.2))
             if not process_complete.is_set():
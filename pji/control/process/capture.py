@@ -0,0 +1,199 @@
+import io
+import mmap
+import os
+import tempfile
+from threading import Lock
+from typing import Optional, Union, Iterator, BinaryIO, Callable, Iterable, Mapping
+
+from hbutils.scale import size_to_bytes
+
+DEFAULT_SPILL_THRESHOLD = 16 * 1024 * 1024
+_COPY_CHUNK = 1 << 20
+
+
+def _anonymous_file() -> BinaryIO:
+    if hasattr(os, 'memfd_create'):
+        try:
+            return os.fdopen(os.memfd_create('pji-capture', os.MFD_CLOEXEC), 'w+b')
+        except OSError:  # pragma: no cover
+            pass
+    return tempfile.TemporaryFile()  # pragma: no cover
+
+
+class CaptureBuffer:
+    """
+    Buffer of captured output, data is kept in memory until its size exceeds the spill threshold,
+    then all of the data will be spilled to an anonymous file (memfd when supported, otherwise temp file).
+    """
+
+    def __init__(self, spill_threshold: Union[int, str, None] = None):
+        """
+        :param spill_threshold: max size of in-memory data (unit: B, default is 16MiB)
+        """
+        self.__spill_threshold = size_to_bytes(spill_threshold) if spill_threshold is not None \
+            else DEFAULT_SPILL_THRESHOLD
+        self.__lock = Lock()
+        self.__memory = bytearray()
+        self.__file = None  # type: Optional[BinaryIO]
+        self.__size = 0
+        self.__closed = False
+
+    @property
+    def spill_threshold(self) -> int:
+        return self.__spill_threshold
+
+    @property
+    def size(self) -> int:
+        """
+        :return: size of captured data
+        """
+        with self.__lock:
+            return self.__size
+
+    @property
+    def spilled(self) -> bool:
+        """
+        :return: whether the data has been spilled to file
+        """
+        with self.__lock:
+            return self.__file is not None
+
+    def write(self, data: bytes):
+        """
+        append data to this buffer
+        :param data: data to append
+        """
+        with self.__lock:
+            if self.__closed:
+                raise ValueError('Capture buffer already closed.')
+
+            if self.__file is None and self.__size + len(data) > self.__spill_threshold:
+                self.__file = _anonymous_file()
+                self.__file.write(self.__memory)
+                self.__memory = bytearray()
+
+            if self.__file is not None:
+                self.__file.write(data)
+            else:
+                self.__memory.extend(data)
+            self.__size += len(data)
+
+    def chunks(self, chunk_size: int = _COPY_CHUNK) -> Iterator[bytes]:
+        """
+        iterate the captured data by chunks, spilled data will not be loaded into memory at once
+        :param chunk_size: size of each chunk
+        :return: iterator of chunks
+        """
+        with self.__lock:
+            _file, _memory, _size = self.__file, self.__memory, self.__size
+
+        if _file is None:
+            for _offset in range(0, _size, chunk_size):
+                yield bytes(_memory[_offset:_offset + chunk_size])
+        else:
+            _file.flush()
+            for _offset in range(0, _size, chunk_size):
+                yield os.pread(_file.fileno(), min(chunk_size, _size - _offset), _offset)
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: all the captured data
+        """
+        with self.__lock:
+            if self.__file is None:
+                return bytes(self.__memory)
+        return b''.join(self.chunks())
+
+    def to_file(self) -> BinaryIO:
+        """
+        :return: a new readable binary file object of the captured data, which should be closed by caller
+        """
+        with self.__lock:
+            if self.__file is None:
+                return io.BytesIO(bytes(self.__memory))
+            self.__file.flush()
+
+            # reopen instead of dup, so that the file offset is not shared with the writer
+            return open('/proc/self/fd/{fd}'.format(fd=self.__file.fileno()), 'rb')
+
+    def to_mmap(self) -> Union[mmap.mmap, memoryview]:
+        """
+        :return: read-only mmap of spilled data, or memoryview of in-memory data
+        """
+        with self.__lock:
+            if self.__file is None:
+                return memoryview(bytes(self.__memory))
+            self.__file.flush()
+            return mmap.mmap(self.__file.fileno(), self.__size, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """
+        release the memory and spilled file
+        """
+        with self.__lock:
+            self.__closed = True
+            self.__memory = bytearray()
+            if self.__file is not None:
+                self.__file.close()
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class OutputCounter:
+    """
+    Counter of the bytes captured from output streams, the exceed callback will be called once
+    when the total size exceeds the limit.
+    """
+
+    def __init__(self, limit: Optional[int], on_exceed: Callable[[], None], streams: Iterable[str]):
+        """
+        :param limit: max total size of output (unit: B, none means no limit)
+        :param on_exceed: callback when limit exceeded (e.g. kill the child)
+        :param streams: names of counted streams
+        """
+        self.__limit = limit
+        self.__on_exceed = on_exceed
+        self.__lock = Lock()
+        self.__sizes = {_stream: 0 for _stream in streams}
+        self.__total = 0
+        self.__exceeded = False
+
+    @property
+    def exceeded(self) -> bool:
+        with self.__lock:
+            return self.__exceeded
+
+    @property
+    def sizes(self) -> Mapping[str, int]:
+        """
+        :return: captured size of each stream
+        """
+        with self.__lock:
+            return dict(self.__sizes)
+
+    def add(self, stream: str, size: int) -> bool:
+        """
+        count the captured bytes
+        :param stream: name of stream
+        :param size: size of captured bytes
+        :return: whether the data should be kept, false when the limit is already exceeded before
+        """
+        with self.__lock:
+            if self.__exceeded:
+                return False
+
+            self.__sizes[stream] += size
+            self.__total += size
+            _exceeded = self.__limit is not None and self.__total > self.__limit
+            self.__exceeded = _exceeded
+
+        if _exceeded:
+            self.__on_exceed()
+        return True
@@ -0,0 +1,231 @@
+import errno
+import itertools
+import os
+import resource
+import signal
+from typing import Optional, FrozenSet
+
+from .supervisor import get_supervisor
+from ..model import ResourceLimit, CgroupUsage
+
+ENV_PJI_RESOURCE_BACKEND = 'PJI_RESOURCE_BACKEND'
+ENV_PJI_CGROUP_ROOT = 'PJI_CGROUP_ROOT'
+ENV_PJI_CGROUP_CPUS = 'PJI_CGROUP_CPUS'
+
+RESOURCE_BACKEND_RLIMIT = 'rlimit'
+RESOURCE_BACKEND_CGROUP = 'cgroup'
+
+_CONTROLLERS = ('memory', 'pids', 'cpu')
+_CPU_PERIOD = 100000
+_REMOVE_INTERVAL = 0.05
+_REMOVE_RETRIES = 200
+
+_CGROUP_IDS = itertools.count()
+
+
+def _read_file(path: str) -> str:
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def _write_file(path: str, content: str):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def _read_keyed_file(path: str) -> dict:
+    _result = {}
+    for _line in _read_file(path).splitlines():
+        _key, _value = _line.split()
+        _result[_key] = int(_value)
+    return _result
+
+
+def _find_cgroup2_mount() -> Optional[str]:
+    with open('/proc/self/mountinfo', 'r') as f:
+        for _line in f:
+            _fields = _line.split()
+            _sep = _fields.index('-')
+            if _fields[_sep + 1] == 'cgroup2':
+                return _fields[4]
+    return None
+
+
+def _self_cgroup_path() -> str:
+    with open('/proc/self/cgroup', 'r') as f:
+        for _line in f:
+            _id, _, _path = _line.rstrip('\n').split(':', 2)
+            if _id == '0':
+                return _path
+    return '/'
+
+
+def get_cgroup_root() -> str:
+    """
+    get the parent directory of the cgroups created by pji
+    :return: environment variable ``PJI_CGROUP_ROOT``, or cgroup of this process when not set
+    """
+    _root = os.environ.get(ENV_PJI_CGROUP_ROOT, None)
+    if _root:
+        return _root
+
+    _mount = _find_cgroup2_mount()
+    if _mount is None:
+        raise EnvironmentError('Cgroup v2 is not mounted in this environment.')
+    return os.path.join(_mount, _self_cgroup_path().lstrip('/'))
+
+
+def get_resource_backend(backend: Optional[str] = None) -> str:
+    """
+    get the resource backend
+    :param backend: resource backend, ``rlimit`` or ``cgroup`` (default is environment variable \
+        ``PJI_RESOURCE_BACKEND``, or ``rlimit`` when not set)
+    :return: resource backend
+    """
+    backend = backend or os.environ.get(ENV_PJI_RESOURCE_BACKEND, None) or RESOURCE_BACKEND_RLIMIT
+    if backend not in (RESOURCE_BACKEND_RLIMIT, RESOURCE_BACKEND_CGROUP):
+        raise ValueError('Unknown resource backend - {actual}.'.format(actual=repr(backend)))
+    return backend
+
+
+class Cgroup:
+    """
+    Leaf cgroup (v2) of one run, the child joins it before exec and the whole process tree is accounted.
+    """
+
+    def __init__(self, path: str, replaced_rlimits: FrozenSet[int]):
+        """
+        :param path: path of cgroup directory
+        :param replaced_rlimits: types of rlimits replaced by the limits of this cgroup
+        """
+        self.__path = path
+        self.__replaced_rlimits = replaced_rlimits
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def replaced_rlimits(self) -> FrozenSet[int]:
+        """
+        :return: types of rlimits which are enforced by this cgroup, and should not be applied
+        """
+        return self.__replaced_rlimits
+
+    def join(self):
+        """
+        move current process into this cgroup, should be called in child before exec
+        """
+        _write_file(os.path.join(self.__path, 'cgroup.procs'), '0')
+
+    def kill(self):
+        """
+        kill all the processes in this cgroup
+        """
+        _kill_file = os.path.join(self.__path, 'cgroup.kill')
+        try:
+            if os.path.exists(_kill_file):
+                _write_file(_kill_file, '1')
+            else:  # cgroup.kill is not supported before linux 5.14
+                for _pid in _read_file(os.path.join(self.__path, 'cgroup.procs')).split():
+                    try:
+                        os.kill(int(_pid), signal.SIGKILL)
+                    except ProcessLookupError:  # pragma: no cover
+                        pass
+        except FileNotFoundError:  # pragma: no cover
+            pass
+
+    def usage(self) -> CgroupUsage:
+        """
+        :return: resource usage of the whole cgroup
+        """
+        _peak_file = os.path.join(self.__path, 'memory.peak')
+        _events_file = os.path.join(self.__path, 'memory.events')
+        _cpu_stat = _read_keyed_file(os.path.join(self.__path, 'cpu.stat'))
+
+        return CgroupUsage(
+            memory_peak=int(_read_file(_peak_file)) if os.path.exists(_peak_file) else None,
+            cpu_time=_cpu_stat.get('user_usec', 0) / 1e6,
+            system_time=_cpu_stat.get('system_usec', 0) / 1e6,
+            oom_kill=_read_keyed_file(_events_file).get('oom_kill', 0) if os.path.exists(_events_file) else 0,
+        )
+
+    def remove(self):
+        """
+        remove this cgroup, it will be retried in io supervisor until the killed processes are gone
+        """
+        _supervisor = get_supervisor()
+
+        def _try_remove(retries: int):
+            try:
+                os.rmdir(self.__path)
+            except FileNotFoundError:
+                pass
+            except OSError as err:
+                if err.errno == errno.EBUSY and retries > 0:
+                    _supervisor.call_later(_REMOVE_INTERVAL, _try_remove, retries - 1)
+                else:
+                    raise
+
+        _supervisor.call_soon(_try_remove, _REMOVE_RETRIES)
+
+    def finish(self) -> CgroupUsage:
+        """
+        kill the rest of process tree, measure the usage and remove this cgroup, called when child exited
+        :return: resource usage of the whole cgroup
+        """
+        self.kill()
+        _usage = self.usage()
+        self.remove()
+        return _usage
+
+    def __repr__(self):
+        return '<{cls} {path}>'.format(cls=type(self).__name__, path=repr(self.__path))
+
+
+def _enable_controllers(root: str):
+    _available = set(_read_file(os.path.join(root, 'cgroup.controllers')).split())
+    _enabled = set(_read_file(os.path.join(root, 'cgroup.subtree_control')).split())
+    for _controller in _CONTROLLERS:
+        if _controller in _available and _controller not in _enabled:
+            try:
+                _write_file(os.path.join(root, 'cgroup.subtree_control'), '+' + _controller)
+            except OSError:  # EBUSY when root has processes itself, limits will fall back to rlimits
+                pass
+
+
+def create_cgroup(resources: ResourceLimit, root: Optional[str] = None, cpus: Optional[float] = None) -> Cgroup:
+    """
+    create a leaf cgroup for one run, limits whose controller is not delegated will fall back to rlimits
+    :param resources: resource limit
+    :param root: parent directory of cgroup (default is :func:`get_cgroup_root`)
+    :param cpus: cpu bandwidth in count of cores for ``cpu.max`` (default is environment variable \
+        ``PJI_CGROUP_CPUS``, or no limit when not set)
+    :return: cgroup object
+    """
+    root = root or get_cgroup_root()
+    if cpus is None and os.environ.get(ENV_PJI_CGROUP_CPUS, None):
+        cpus = float(os.environ[ENV_PJI_CGROUP_CPUS])
+
+    _enable_controllers(root)
+    _path = os.path.join(root, 'pji-{pid}-{id}'.format(pid=os.getpid(), id=next(_CGROUP_IDS)))
+    os.mkdir(_path)
+
+    try:
+        _replaced = set()
+        if resources.max_memory is not None and os.path.exists(os.path.join(_path, 'memory.max')):
+            _write_file(os.path.join(_path, 'memory.max'), str(int(resources.max_memory)))
+            if os.path.exists(os.path.join(_path, 'memory.swap.max')):
+                _write_file(os.path.join(_path, 'memory.swap.max'), '0')
+            _replaced.add(resource.RLIMIT_AS)
+        if resources.max_process_number is not None and os.path.exists(os.path.join(_path, 'pids.max')):
+            _write_file(os.path.join(_path, 'pids.max'), str(int(resources.max_process_number)))
+            _replaced.add(resource.RLIMIT_NPROC)
+        if cpus is not None and os.path.exists(os.path.join(_path, 'cpu.max')):
+            _write_file(os.path.join(_path, 'cpu.max'), '{quota} {period}'.format(
+                quota=max(int(cpus * _CPU_PERIOD), 1000), period=_CPU_PERIOD))
+    except BaseException:
+        os.rmdir(_path)
+        raise
+
+    return Cgroup(_path, frozenset(_replaced))
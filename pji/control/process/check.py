@@ -0,0 +1,206 @@
+import io
+import os
+import re
+from threading import Lock
+from typing import Optional, List, Union, BinaryIO
+
+from ..model import OutputMismatch
+
+_READ_CHUNK = 1 << 16
+_MAX_SHOWN = 64  # max length of the token or line kept in mismatch
+
+CHECK_MODES = ('token', 'line')
+_TOKEN_PATTERN = re.compile(rb'\S+')
+
+
+def _split_token(data: bytes, final: bool):
+    _items = data.split()
+    if not final and _items and not data[-1:].isspace():  # the last token may be continued in next chunk
+        return _items[:-1], _items[-1]
+    return _items, b''
+
+
+def _split_line(data: bytes, final: bool):
+    _items = data.split(b'\n')
+    _rest = _items.pop()
+    if final and _rest:
+        _items.append(_rest)
+        _rest = b''
+    return [_item.rstrip() for _item in _items], _rest  # trailing whitespaces are ignored
+
+
+_SPLITTERS = {'token': _split_token, 'line': _split_line}
+
+
+class _ExpectedReader:
+    def __init__(self, expected: Union[str, bytes, BinaryIO], mode: str):
+        self.__expected = expected
+        self.__stream = None  # type: Optional[BinaryIO]
+        self.__split = _SPLITTERS[mode]
+        self.__items = []  # type: List[bytes]
+        self.__index = 0
+        self.__rest = b''
+        self.__eof = False
+
+    def __fill(self):
+        if self.__stream is None:  # opened when it is compared at the first time
+            if isinstance(self.__expected, str):
+                self.__stream = open(self.__expected, 'rb')
+            elif isinstance(self.__expected, (bytes, bytearray)):
+                self.__stream = io.BytesIO(bytes(self.__expected))
+            else:
+                self.__stream = self.__expected
+
+        _chunk = self.__stream.read(_READ_CHUNK)
+        self.__eof = not _chunk
+        _items, self.__rest = self.__split(self.__rest + _chunk, self.__eof)
+        self.__items = self.__items[self.__index:] + _items
+        self.__index = 0
+
+    def take(self, count: int) -> List[bytes]:
+        """
+        :param count: count of items
+        :return: the next items, less than count when expected output is ended
+        """
+        while len(self.__items) - self.__index < count and not self.__eof:
+            self.__fill()
+        _result = self.__items[self.__index:self.__index + count]
+        self.__index += len(_result)
+        return _result
+
+    def close(self):
+        if self.__stream is not None and self.__stream is not self.__expected:  # given stream is not closed
+            self.__stream.close()
+
+
+def _shown(item: Optional[bytes]) -> Optional[bytes]:
+    return item[:_MAX_SHOWN] if item is not None else None
+
+
+class OutputChecker:
+    """
+    Streaming comparator of output, the output is compared with the expected output chunk by chunk
+    as soon as it arrives, so the first mismatch is found before the process ends.
+
+    In ``token`` mode the tokens split by whitespaces should be the same, and in ``line`` mode
+    the lines should be the same except the trailing whitespaces and the empty lines at the end.
+    """
+
+    def __init__(self, expected: Union[str, bytes, BinaryIO], mode: str = 'token'):
+        """
+        :param expected: path of expected output file, expected output bytes or binary stream \
+            (the stream will not be closed by checker)
+        :param mode: compare mode, ``token`` or ``line`` (default is ``token``)
+        """
+        if mode not in CHECK_MODES:
+            raise ValueError('Check mode should be one of {modes}, but {actual} found.'.format(
+                modes=repr(CHECK_MODES), actual=repr(mode)))
+
+        self.__mode = mode
+        self.__split = _SPLITTERS[mode]
+        self.__expected = _ExpectedReader(expected, mode)
+        self.__lock = Lock()
+        self.__rest = b''
+        self.__offset = 0  # offset of the rest
+        self.__mismatch = None  # type: Optional[OutputMismatch]
+        self.__closed = False
+
+    @property
+    def mode(self) -> str:
+        return self.__mode
+
+    @property
+    def mismatch(self) -> Optional[OutputMismatch]:
+        """
+        :return: first mismatch, none when not found yet
+        """
+        with self.__lock:
+            return self.__mismatch
+
+    def __item_offset(self, data: bytes, index: int) -> int:
+        if self.__mode == 'token':
+            for _i, _match in enumerate(_TOKEN_PATTERN.finditer(data)):
+                if _i == index:
+                    return _match.start()
+        else:
+            _position = 0
+            for _ in range(index):
+                _position = data.index(b'\n', _position) + 1
+            return _position
+        return len(data)  # pragma: no cover
+
+    def __compare(self, data: bytes, final: bool) -> bytes:
+        _items, _rest = self.__split(data, final)
+        _expected = self.__expected.take(len(_items))
+        if _items == _expected:
+            return _rest
+
+        for _index, _item in enumerate(_items):
+            _expected_item = _expected[_index] if _index < len(_expected) else None
+            if _expected_item is None and self.__mode == 'line' and not _item:
+                continue  # empty lines at the end
+            if _item != _expected_item:
+                self.__mismatch = OutputMismatch(self.__offset + self.__item_offset(data, _index),
+                                                 _shown(_expected_item), _shown(_item))
+                break
+
+        return _rest
+
+    def feed(self, data: bytes) -> bool:
+        """
+        compare a chunk of output
+        :param data: chunk of output
+        :return: no mismatch by now or not
+        """
+        with self.__lock:
+            if self.__mismatch is not None or self.__closed:
+                return self.__mismatch is None
+
+            _data = self.__rest + data if self.__rest else data
+            self.__rest = self.__compare(_data, False)
+            self.__offset += len(_data) - len(self.__rest)
+            return self.__mismatch is None
+
+    def close(self) -> bool:
+        """
+        end of output, the rest of expected output should be empty
+        :return: no mismatch or not
+        """
+        with self.__lock:
+            if self.__closed:
+                return self.__mismatch is None
+            self.__closed = True
+
+            try:
+                if self.__mismatch is None:
+                    _data, self.__rest = self.__rest, b''
+                    self.__compare(_data, True)
+                    self.__offset += len(_data)
+
+                while self.__mismatch is None:
+                    _expected = self.__expected.take(1)
+                    if not _expected:
+                        break
+                    elif self.__mode == 'token' or _expected[0]:  # empty lines at the end are ignored
+                        self.__mismatch = OutputMismatch(self.__offset, _shown(_expected[0]), None)
+            finally:
+                self.__expected.close()
+
+            return self.__mismatch is None
+
+    @classmethod
+    def loads(cls, data) -> 'OutputChecker':
+        """
+        load checker from data
+        :param data: checker object, path of expected output, or dict of ``expected`` and ``mode``
+        :return: checker object
+        """
+        if isinstance(data, cls):
+            return data
+        elif isinstance(data, dict):
+            return cls(**data)
+        elif isinstance(data, (str, os.PathLike)):
+            return cls(str(data))
+        else:
+            raise TypeError('Json, path or {type} expected but {actual} found.'.format(
+                type=cls.__name__, actual=repr(type(data).__name__)))
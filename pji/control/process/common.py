@@ -1,26 +1,32 @@
-import os
-import pickle
-from multiprocessing import Event, Value, Lock
-from multiprocessing.synchronize import Event as _EventType
-from threading import Thread
-from typing import Optional, Tuple, Mapping
-
-from .base import measure_thread, killer_thread, read_from_stream, GeneralProcess
+from threading import Lock, Event
+from typing import Optional, Tuple, Mapping, Callable
+
+from .base import GeneralProcess, CountdownEvent, EventGroup
+from .capture import CaptureBuffer, OutputCounter
+from .check import OutputChecker
 from .decorator import process_setter
-from .executor import get_child_executor_func
+from .executor import _write_all
+from .launcher import launch_child
+from .supervisor import get_supervisor
 from ..model import ResourceLimit
 from ...utils import ValueProxy
 
 
+def _capture_to_bytes(capture: Optional[CaptureBuffer]) -> Optional[bytes]:
+    return capture.to_bytes() if capture is not None else None
+
+
 class CommonProcess(GeneralProcess):
     def __init__(self, start_time: float,
-                 communicate_event: _EventType, communicate_complete: _EventType,
+                 communicate_func: Callable[[bytes], None], communicate_complete,
                  communicate_stdin: ValueProxy, communicate_stdout: ValueProxy, communicate_stderr: ValueProxy,
-                 resources: ResourceLimit, process_result_func, lifetime_event: _EventType):
+                 resources: ResourceLimit, process_result_func, lifetime_event: Event, output_size_func=None,
+                 snapshot_func=None, mismatch_func=None):
         self.__lock = Lock()
-        GeneralProcess.__init__(self, start_time, resources, process_result_func, lifetime_event, self.__lock)
+        GeneralProcess.__init__(self, start_time, resources, process_result_func, lifetime_event, self.__lock,
+                                output_size_func, snapshot_func, mismatch_func)
 
-        self.__communicate_event = communicate_event
+        self.__communicate_func = communicate_func
         self.__communicate_complete = communicate_complete
         self.__communicate_stdin = communicate_stdin
         self.__communicate_stdout = communicate_stdout
@@ -30,12 +36,13 @@ class CommonProcess(GeneralProcess):
     def __communicate(self, stdin: Optional[bytes] = None, wait: bool = True) -> Optional[Tuple[bytes, bytes]]:
         if not self.__communicated:
             self.__communicate_stdin.value = stdin or b''
-            self.__communicate_event.set()
+            self.__communicate_func(self.__communicate_stdin.value)
             self.__communicated = True
 
             if wait:
                 self.__communicate_complete.wait()
-                return self.__communicate_stdout.value, self.__communicate_stderr.value
+                return _capture_to_bytes(self.__communicate_stdout.value), \
+                       _capture_to_bytes(self.__communicate_stderr.value)
             else:
                 return None
         else:
@@ -58,10 +65,26 @@ class CommonProcess(GeneralProcess):
     @property
     def stdout(self) -> Optional[bytes]:
         with self.__lock:
-            return self.__communicate_stdout.value
+            return _capture_to_bytes(self.__communicate_stdout.value)
 
     @property
     def stderr(self) -> Optional[bytes]:
+        with self.__lock:
+            return _capture_to_bytes(self.__communicate_stderr.value)
+
+    @property
+    def stdout_capture(self) -> Optional[CaptureBuffer]:
+        """
+        :return: capture buffer of stdout, which may be spilled to file (none before communicated or plumbed)
+        """
+        with self.__lock:
+            return self.__communicate_stdout.value
+
+    @property
+    def stderr_capture(self) -> Optional[CaptureBuffer]:
+        """
+        :return: capture buffer of stderr, which may be spilled to file (none before communicated or plumbed)
+        """
         with self.__lock:
             return self.__communicate_stderr.value
 
@@ -73,11 +96,51 @@ class CommonProcess(GeneralProcess):
             self.__exit()
 
 
+def _capture_output(supervisor, name: str, read_fd: Optional[int], tee_fd: Optional[int], spill_threshold,
+                    counter: OutputCounter, value: ValueProxy, complete: CountdownEvent,
+                    keep: bool = True, checker: Optional[OutputChecker] = None, on_mismatch=None):
+    if read_fd is None:  # plumbed directly into child
+        complete.count_down()
+        return
+
+    _buffer = CaptureBuffer(spill_threshold) if keep else None
+    _matched = True
+
+    def _check(matched: bool):
+        nonlocal _matched
+        if _matched and not matched:
+            _matched = False
+            on_mismatch()
+
+    def _on_data(data: bytes):
+        if counter.add(name, len(data)):  # the rest is drained and dropped after output limit exceeded
+            if tee_fd is not None:
+                _write_all(tee_fd, data)
+            if _buffer is not None:
+                _buffer.write(data)
+            if checker is not None:
+                _check(checker.feed(data))
+
+    def _on_close():
+        if checker is not None:
+            _check(checker.close())
+        value.value = _buffer
+        complete.count_down()
+
+    supervisor.add_reader(read_fd, _on_data, _on_close)
+
+
 # Attention: only real_time_limit will be processed in this function, other limits will be processed in decorator
 # noinspection DuplicatedCode,PyIncorrectDocstring,PyUnresolvedReferences
 @process_setter
 def common_process(args, preexec_fn=None, resources=None,
-                   environ: Optional[Mapping[str, str]] = None) -> CommonProcess:
+                   environ: Optional[Mapping[str, str]] = None,
+                   cwd: Optional[str] = None, identification=None,
+                   launcher: Optional[str] = None,
+                   stdin_fd: Optional[int] = None, stdout_fd: Optional[int] = None, stderr_fd: Optional[int] = None,
+                   tee: bool = False, spill_threshold=None, cgroup=None,
+                   sample_interval: Optional[float] = None, placement=None, core_lease=None,
+                   executable: Optional[str] = None, groups=None, checker=None) -> CommonProcess:
     """
     Create an common process
     :param args: arguments for execution
@@ -87,145 +150,89 @@ def common_process(args, preexec_fn=None, resources=None,
     :param environ: environment variables
     :param cwd: new work dir
     :param identification: user and group for execution
+    :param launcher: launcher type, ``fork`` or ``forkserver`` (default from environment variable ``PJI_LAUNCHER``)
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param stdin_fd: fd (e.g. opened file) to be dup2'd into child as stdin, \
+        stdin of ``communicate`` must be empty when used
+    :param stdout_fd: fd (e.g. opened file) to be dup2'd into child as stdout, \
+        no byte will pass through this process and ``stdout`` will be none
+    :param stderr_fd: fd (e.g. opened file) to be dup2'd into child as stderr, \
+        no byte will pass through this process and ``stderr`` will be none
+    :param tee: keep in-memory copy of stdout and stderr even when ``stdout_fd`` or ``stderr_fd`` is given, \
+        the output will be read from pipe and written to the given fd
+    :param spill_threshold: max in-memory size of captured stdout or stderr (unit: B, default is 16MiB), \
+        output larger than this will be spilled to an anonymous file
+    :param cgroup: cgroup of child process (created by decorator when cgroup resource backend is used)
+    :param sample_interval: interval of resource sampling based on ``/proc``, the process group will be killed \
+        as soon as sampled rss exceeds ``max_memory`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of child process, \
+        see :class:`pji.control.model.Placement`
+    :param core_lease: exclusive cores of child process (allocated by decorator when placement is exclusive)
+    :param executable: resolved path of executable (resolved by decorator from spawn plan)
+    :param groups: supplementary group ids of user (resolved by decorator from spawn plan)
+    :param checker: output checker of stdout, see :class:`pji.control.process.OutputChecker`, \
+        the process group will be killed at the first mismatch (none means not checked), \
+        when ``stdout_fd`` is given the output will be read from pipe and written to it like ``tee``
     :return: CommonProcess object to do run
     """
     resources = ResourceLimit.loads(resources)
-    _full_lifetime_complete = Event()
     environ = dict(environ or {})
-
-    _executor_prepare_ok = Event()
-    _exception_get, _exception_put = os.pipe()
-
-    _parent_initialized = Event()
-    _start_time = Value('d', 0.0)
-    _start_time_ok = Event()
-
-    # noinspection DuplicatedCode
-    def _execute_parent() -> CommonProcess:
-        os.close(stdin_read)
-        os.close(stdout_write)
-        os.close(stderr_write)
-
-        # measure thread
-        _measure_thread, _measure_initialized, _process_complete, _measure_complete, _result_proxy = measure_thread(
-            start_time_ok=_start_time_ok,
-            start_time=_start_time,
-            child_pid=child_pid,
-        )
-
-        # killer thread
-        _killer_thread, _killer_initialized = killer_thread(
-            start_time_ok=_start_time_ok,
-            start_time=_start_time,
-            child_pid=child_pid,
-            real_time_limit=resources.max_real_time,
-            process_complete=_process_complete,
-        )
-
-        # communication thread
-        _communicate_initialized, _communicate_event, _communicate_complete = Event(), Event(), Event()
-        _communicate_stdin, _communicate_stdout, _communicate_stderr = ValueProxy(), ValueProxy(), ValueProxy()
-
-        def _communicate_func():
-            with os.fdopen(stdin_write, 'wb', 0) as fstdin, \
-                    os.fdopen(stdout_read, 'rb', 0) as fstdout, \
-                    os.fdopen(stderr_read, 'rb', 0) as fstderr:
-                _communicate_initialized.set()
-                _communicate_event.wait()
-
-                _stdout, _stderr = None, None
-
-                def _read_stdout():
-                    nonlocal _stdout
-                    _stdout = read_from_stream(fstdout, _process_complete)
-
-                def _read_stderr():
-                    nonlocal _stderr
-                    _stderr = read_from_stream(fstderr, _process_complete)
-
-                def _write_stdin():
-                    try:
-                        fstdin.write(_communicate_stdin.value)
-                        fstdin.flush()
-                    except BrokenPipeError:
-                        pass
-                    finally:
-                        fstdin.close()
-
-                _stdin_thread = Thread(target=_write_stdin)
-                _stdout_thread = Thread(target=_read_stdout)
-                _stderr_thread = Thread(target=_read_stderr)
-
-                # write stdin into stream
-                _stdin_thread.start()
-                _stdout_thread.start()
-                _stderr_thread.start()
-
-                # waiting for receiving of stdout and stderr
-                _stdin_thread.join()
-                _stdout_thread.join()
-                _stderr_thread.join()
-
-                # set stderr
-                _communicate_stdout.value = _stdout
-                _communicate_stderr.value = _stderr
-                _communicate_complete.set()
-
-                # ending of all the process
-                _process_complete.wait()
-                _measure_complete.wait()
-                _full_lifetime_complete.set()
-
-        _communicate_thread = Thread(target=_communicate_func)
-
-        # waiting for prepare ok
-        _executor_prepare_ok.wait()
-        with os.fdopen(_exception_get, 'rb', 0) as ef:
-            _exception = pickle.load(ef)
-            if _exception:
-                raise _exception
-
-        # start all the threads and services
-        _measure_thread.start()
-        _killer_thread.start()
-        _communicate_thread.start()
-
-        # wait for all the thread initialized
-        _measure_initialized.wait()
-        _killer_initialized.wait()
-        _communicate_initialized.wait()
-        _parent_initialized.set()
-
-        _start_time_ok.wait()
-        return CommonProcess(
-            start_time=_start_time.value,
-            communicate_event=_communicate_event,
-            communicate_complete=_communicate_complete,
-            communicate_stdin=_communicate_stdin,
-            communicate_stdout=_communicate_stdout,
-            communicate_stderr=_communicate_stderr,
-            resources=resources,
-            process_result_func=lambda: _result_proxy.value,
-            lifetime_event=_full_lifetime_complete,
-        )
-
-    stdin_read, stdin_write = os.pipe()
-    stdout_read, stdout_write = os.pipe()
-    stderr_read, stderr_write = os.pipe()
-
-    _execute_child = get_child_executor_func(
-        args, dict(environ or {}), preexec_fn,
-        _executor_prepare_ok, (_exception_get, _exception_put),
-        _parent_initialized,
-        _start_time_ok, _start_time,
-        (stdin_read, stdin_write),
-        (stdout_read, stdout_write),
-        (stderr_read, stderr_write),
+    checker = OutputChecker.loads(checker) if checker is not None else None
+
+    _child = launch_child(
+        args=args, environ=environ, preexec_fn=preexec_fn,
+        resources=resources, cwd=cwd, identification=identification, launcher=launcher, cgroup=cgroup,
+        sample_interval=sample_interval, placement=placement, core_lease=core_lease,
+        executable=executable, groups=groups,
+        stdin_fd=stdin_fd,
+        stdout_fd=None if tee or checker is not None else stdout_fd,
+        stderr_fd=None if tee else stderr_fd,
     )
+    stdin_write, stdout_read, stderr_read = _child.stdin, _child.stdout, _child.stderr
+    _watch = _child.watch
+
+    # communication, stdin / stdout / stderr are all served by io supervisor
+    _supervisor = get_supervisor()
+    _communicate_complete = CountdownEvent(3)
+    _communicate_stdin, _communicate_stdout, _communicate_stderr = ValueProxy(), ValueProxy(), ValueProxy()
+
+    def _communicate_func(stdin: bytes):
+        if stdin_write is not None:
+            _supervisor.add_writer(stdin_write, stdin, _communicate_complete.count_down)
+        elif stdin:
+            raise ValueError('Stdin should be empty when stdin fd is given, but {actual} found.'.format(
+                actual=repr(stdin)))
+        else:
+            _communicate_complete.count_down()
 
-    child_pid = os.fork()
-
-    if not child_pid:
-        _execute_child()
-    else:
-        return _execute_parent()
+    _streams = {'stdout': stdout_read, 'stderr': stderr_read}
+    _counter = OutputCounter(
+        limit=resources.max_output_size, on_exceed=_watch.kill,
+        streams=[_name for _name, _fd in _streams.items() if _fd is not None],
+    )
+    _capture_output(_supervisor, 'stdout', stdout_read, stdout_fd, spill_threshold,
+                    _counter, _communicate_stdout, _communicate_complete,
+                    keep=tee or stdout_fd is None, checker=checker, on_mismatch=_watch.kill)
+    _capture_output(_supervisor, 'stderr', stderr_read, stderr_fd, spill_threshold,
+                    _counter, _communicate_stderr, _communicate_complete)
+
+    def _output_size():
+        _sizes = _counter.sizes
+        return {_name: _sizes.get(_name, None) for _name in _streams.keys()}
+
+
+    return CommonProcess(
+        start_time=_child.start_time,
+        communicate_func=_communicate_func,
+        communicate_complete=_communicate_complete,
+        communicate_stdin=_communicate_stdin,
+        communicate_stdout=_communicate_stdout,
+        communicate_stderr=_communicate_stderr,
+        resources=resources,
+        process_result_func=lambda: _watch.result,
+        lifetime_event=EventGroup(_communicate_complete, _watch.complete),
+        output_size_func=_output_size,
+        snapshot_func=lambda: _child.sampler.latest if _child.sampler is not None else None,
+        mismatch_func=lambda: checker.mismatch if checker is not None else None,
+    )
@@ -1,11 +1,13 @@
 import os
+import stat
 from functools import wraps
-from typing import Optional
+from typing import Optional, List
 
-import where
-
-from ..model import ResourceLimit, Identification
-from ...utils import args_split
+from .cgroup import get_resource_backend, create_cgroup, RESOURCE_BACKEND_CGROUP
+from .placement import get_core_allocator
+from .plan import get_spawn_plan
+from .shell import shell_args
+from ..model import ResourceLimit, Identification, Placement
 
 
 def _do_nothing():
@@ -13,6 +15,7 @@ def _do_nothing():
 
 
 def _attach_preexec_fn(preexec_fn=None, pre_attach=None, post_attach=None):
+    custom = getattr(preexec_fn, 'custom_preexec', preexec_fn is not None)
     preexec_fn = preexec_fn or _do_nothing
     pre_attach = pre_attach or _do_nothing
     post_attach = post_attach or _do_nothing
@@ -23,6 +26,8 @@ def _attach_preexec_fn(preexec_fn=None, pre_attach=None, post_attach=None):
         preexec_fn()
         post_attach()
 
+    # whether user's preexec_fn is included, which can not be applied by fork server
+    _new_preexec_fn.custom_preexec = custom
     return _new_preexec_fn
 
 
@@ -30,16 +35,18 @@ def workdir_setter(func):
     @wraps(func)
     def _func(*args, cwd: Optional[str] = None, preexec_fn=None, **kwargs):
         cwd = cwd or os.getcwd()
-        if not os.path.exists(cwd):
+        try:
+            _mode = os.stat(cwd).st_mode
+        except FileNotFoundError:
             raise FileNotFoundError('Path {cwd} not found.'.format(cwd=repr(cwd)))
-        if not os.path.isdir(cwd):
+        if not stat.S_ISDIR(_mode):
             raise NotADirectoryError('{cwd} is not a directory.'.format(cwd=repr(cwd)))
 
         def _change_dir_func():
             os.chdir(cwd)
 
         preexec_fn = _attach_preexec_fn(preexec_fn, pre_attach=_change_dir_func)
-        return func(*args, preexec_fn=preexec_fn, **kwargs)
+        return func(*args, preexec_fn=preexec_fn, cwd=cwd, **kwargs)
 
     return _func
 
@@ -49,28 +56,73 @@ _REAL_TIME_LIMIT_KEY = 'real_time_limit'
 
 def resources_setter(func):
     @wraps(func)
-    def _func(*args, resources=None, preexec_fn=None, **kwargs):
+    def _func(*args, resources=None, preexec_fn=None, resource_backend: Optional[str] = None, **kwargs):
         resources = ResourceLimit.loads(resources)
+        if get_resource_backend(resource_backend) == RESOURCE_BACKEND_CGROUP:
+            cgroup = create_cgroup(resources)
+        else:
+            cgroup = None
+
+        def _join_cgroup_func():
+            cgroup.join()  # before setuid, which may lose the permission of cgroup
 
         def _apply_resource_limit_func():
-            resources.apply()
+            resources.apply(cgroup.replaced_rlimits if cgroup is not None else ())
+
+        preexec_fn = _attach_preexec_fn(
+            preexec_fn,
+            pre_attach=_join_cgroup_func if cgroup is not None else None,
+            post_attach=_apply_resource_limit_func,
+        )
+        try:
+            return func(*args, preexec_fn=preexec_fn, resources=resources, cgroup=cgroup, **kwargs)
+        except BaseException:
+            if cgroup is not None:
+                cgroup.remove()
+            raise
+
+    return _func
+
 
-        preexec_fn = _attach_preexec_fn(preexec_fn, post_attach=_apply_resource_limit_func)
-        return func(*args, preexec_fn=preexec_fn, resources=resources, **kwargs)
+def placement_setter(func):
+    @wraps(func)
+    def _func(*args, placement=None, preexec_fn=None, **kwargs):
+        placement = Placement.loads(placement)
+        if placement.exclusive:
+            core_lease = get_core_allocator().acquire(placement.cores, placement.cpus)
+            placement = placement.with_cpus(core_lease.cpus)
+        else:
+            core_lease = None
+
+        def _apply_placement_func():
+            placement.apply()  # before setuid, negative nice value needs the privilege
+
+        preexec_fn = _attach_preexec_fn(
+            preexec_fn,
+            pre_attach=_apply_placement_func if not placement.empty else None,
+        )
+        try:
+            return func(*args, preexec_fn=preexec_fn, placement=placement, core_lease=core_lease, **kwargs)
+        except BaseException:
+            if core_lease is not None:
+                core_lease.release()
+            raise
 
     return _func
 
 
 def users_setter(func):
     @wraps(func)
-    def _func(*args, identification=None, preexec_fn=None, **kwargs):
+    def _func(*args, identification=None, preexec_fn=None, groups: Optional[List[int]] = None, **kwargs):
         identification = Identification.loads(identification)
 
         def _apply_user_func():
+            if groups is not None and os.geteuid() == 0:  # drop supplementary groups of judge
+                os.setgroups(groups)
             identification.apply()
 
         preexec_fn = _attach_preexec_fn(preexec_fn, post_attach=_apply_user_func)
-        return func(*args, preexec_fn=preexec_fn, **kwargs)
+        return func(*args, preexec_fn=preexec_fn, identification=identification, groups=groups, **kwargs)
 
     return _func
 
@@ -78,31 +130,31 @@ def users_setter(func):
 def shell_setter(func):
     @wraps(func)
     def _func(*args_, args, shell: bool = False, **kwargs):
-        if shell:
-            if isinstance(args, str):
-                if where.first('sh'):
-                    args = [where.first('sh'), '-c', args]
-                elif where.first('cmd'):
-                    args = [where.first('cmd'), '/c', args]
-                else:
-                    raise EnvironmentError('Neither shell nor cmd found in this environment.')
-            else:
-                raise ValueError(
-                    'When shell is enabled, args should be str but {actual} found.'.format(actual=repr(type(args))))
-        else:
-            args = args_split(args)
-
+        args = shell_args(args, shell, kwargs.get('environ', None), kwargs.get('cwd', None))
         return func(*args_, args=args, **kwargs)
 
     return _func
 
 
+def plan_setter(func):
+    @wraps(func)
+    def _func(*args_, args, shell: bool = False, environ=None, cwd: Optional[str] = None,
+              identification=None, resources=None, **kwargs):
+        plan = get_spawn_plan(args, shell, environ, cwd or os.getcwd(), identification, resources)
+        return func(*args_, args=plan.args, environ=environ, cwd=cwd,
+                    identification=plan.identification, resources=plan.resources,
+                    executable=plan.executable, groups=plan.groups, **kwargs)
+
+    return _func
+
+
 def process_setter(func):
     @wraps(func)
+    @plan_setter
     @users_setter
     @resources_setter
+    @placement_setter
     @workdir_setter
-    @shell_setter
     def _func(*args, **kwargs):
         return func(*args, **kwargs)
 
@@ -1,10 +1,9 @@
 import os
 import pickle
+import struct
 import sys
 import time
-from multiprocessing import Value
-from multiprocessing.synchronize import Event as _EventType
-from typing import Mapping
+from typing import Mapping, Tuple, Optional
 
 import where
 
@@ -21,58 +20,177 @@ class ExecutorException(Exception):
         return self.__exception
 
 
+# handshake message: kind, timestamp, length of payload (pickled exception)
+_HANDSHAKE = struct.Struct('!BdI')
+_PREPARED = 1
+_STARTED = 2
+_FAILED = 3
+
+_READY = b'\x01'
+
+
+def _write_all(fd: int, data: bytes):
+    _data = memoryview(data)
+    while _data:
+        _data = _data[os.write(fd, _data):]
+
+
+def _read_exactly(fd: int, size: int) -> Optional[bytes]:
+    _buffer = bytearray()
+    while len(_buffer) < size:
+        _chunk = os.read(fd, size - len(_buffer))
+        if not _chunk:
+            return None
+        _buffer.extend(_chunk)
+    return bytes(_buffer)
+
+
+def _send_message(fd: int, kind: int, timestamp: float = 0.0, payload: bytes = b''):
+    _write_all(fd, _HANDSHAKE.pack(kind, timestamp, len(payload)) + payload)
+
+
+def _recv_message(fd: int) -> Optional[Tuple[int, float, bytes]]:
+    _header = _read_exactly(fd, _HANDSHAKE.size)
+    if _header is None:
+        return None
+
+    _kind, _timestamp, _length = _HANDSHAKE.unpack(_header)
+    _payload = _read_exactly(fd, _length) if _length else b''
+    return _kind, _timestamp, _payload
+
+
+def _send_failure(fd: int, err: BaseException):
+    try:
+        _payload = pickle.dumps(ExecutorException(err))
+    except Exception:  # pragma: no cover
+        _payload = pickle.dumps(ExecutorException(RuntimeError(repr(err))))
+    _send_message(fd, _FAILED, time.time(), _payload)
+
+
+class ChildHandshake:
+    """
+    Parent side of the startup handshake, based on two pipes and fixed-size binary messages.
+
+    * child -> parent (report pipe, closed on exec): ``PREPARED`` or ``FAILED`` with pickled exception, \
+        then ``STARTED`` with timestamp just before exec, or ``FAILED`` when exec failed.
+    * parent -> child (ready pipe): one byte when parent is ready.
+    """
+
+    def __init__(self):
+        self.__report_read, self.__report_write = os.pipe()
+        self.__ready_read, self.__ready_write = os.pipe()
+
+    @property
+    def child_fds(self) -> Tuple[int, int]:
+        """
+        :return: report write fd, ready read fd (used in child)
+        """
+        return self.__report_write, self.__ready_read
+
+    def close_child_fds(self):
+        """
+        close the fds used by child, should be called in parent after fork
+        """
+        os.close(self.__report_write)
+        os.close(self.__ready_read)
+
+    def close(self):
+        """
+        close the fds used by parent
+        """
+        os.close(self.__report_read)
+        os.close(self.__ready_write)
+
+    def __recv(self) -> Tuple[int, float]:
+        _message = _recv_message(self.__report_read)
+        if _message is None:
+            raise ExecutorException(ChildProcessError('Child exited before handshake completed.'))
+
+        _kind, _timestamp, _payload = _message
+        if _kind == _FAILED:
+            raise pickle.loads(_payload)
+        return _kind, _timestamp
+
+    def wait_prepared(self):
+        """
+        wait until the child prepared, exception will be raised when preparation failed
+        """
+        self.__recv()
+
+    def ready(self):
+        """
+        tell the child that parent is ready
+        """
+        _write_all(self.__ready_write, _READY)
+
+    def wait_started(self) -> float:
+        """
+        wait until the child executed, exception will be raised when execution failed
+        :return: start time
+        """
+        _, _start_time = self.__recv()
+
+        # report pipe is closed on exec, so eof means the execution succeeded
+        _message = _recv_message(self.__report_read)
+        if _message is not None:
+            _kind, _, _payload = _message
+            if _kind == _FAILED:
+                raise pickle.loads(_payload)
+
+        return _start_time
+
+
 def get_child_executor_func(args, environ: Mapping[str, str], preexec_fn,
-                            executor_prepare_ok: _EventType, exception_pipes,
-                            parent_initialized: _EventType,
-                            start_time_ok: _EventType, start_time: Value,
-                            stdin_pipes, stdout_pipes, stderr_pipes):
+                            report_write: int, ready_read: int,
+                            stdin_fd: int, stdout_fd: int, stderr_fd: int, executable: Optional[str] = None):
+    """
+    get the function to be executed in child process
+    :param args: arguments for execution
+    :param environ: environment variables
+    :param preexec_fn: pre execute function
+    :param report_write: write end of report pipe
+    :param ready_read: read end of ready pipe
+    :param stdin_fd: fd to be used as stdin (pipe or file, the fds of parent side are closed on exec)
+    :param stdout_fd: fd to be used as stdout
+    :param stderr_fd: fd to be used as stderr
+    :param executable: resolved path of executable (default is resolved from ``PATH``)
+    :return: function to execute child
+    """
     args = args_split(args)
-    arg_file = where.first(args[0])
+    arg_file = executable or where.first(args[0])
 
     if not arg_file:
         raise EnvironmentError('Executable {exec} not found.'.format(exec=args[0]))
 
-    stdin_read, stdin_write = stdin_pipes
-    stdout_read, stdout_write = stdout_pipes
-    stderr_read, stderr_write = stderr_pipes
-    exception_read, exception_write = exception_pipes
-
     # noinspection DuplicatedCode
     def _execute_child():
-        os.setsid()  # become the group leader
-
-        os.close(stdin_write)
-        sys.stdin = sys.__stdin__
-        os.dup2(stdin_read, sys.stdin.fileno())
-
-        os.close(stdout_read)
-        sys.stdout = sys.__stdout__
-        os.dup2(stdout_write, sys.stdout.fileno())
-
-        os.close(stderr_read)
-        sys.stderr = sys.__stderr__
-        os.dup2(stderr_write, sys.stderr.fileno())
-
-        _exception = None
         try:
-            if preexec_fn is not None:
-                preexec_fn()
-        except Exception as err:
-            _exception = err
-
-        os.close(exception_read)
-        with os.fdopen(exception_write, 'wb', 0) as ef:
-            if _exception is not None:
-                pickle.dump(ExecutorException(_exception), ef)
-            else:
-                pickle.dump(None, ef)
-        executor_prepare_ok.set()
-
-        if _exception is None:
-            parent_initialized.wait()
-            start_time.value = time.time()
-            start_time_ok.set()
-
-            os.execvpe(arg_file, args, environ)
+            os.setsid()  # become the group leader
+
+            sys.stdin = sys.__stdin__
+            os.dup2(stdin_fd, sys.stdin.fileno())
+            sys.stdout = sys.__stdout__
+            os.dup2(stdout_fd, sys.stdout.fileno())
+            sys.stderr = sys.__stderr__
+            os.dup2(stderr_fd, sys.stderr.fileno())
+
+            try:
+                if preexec_fn is not None:
+                    preexec_fn()
+            except Exception as err:
+                _send_failure(report_write, err)
+                return
+
+            _send_message(report_write, _PREPARED)
+            if _read_exactly(ready_read, len(_READY)) is None:
+                return  # parent is gone
+
+            _send_message(report_write, _STARTED, time.time())
+            try:
+                os.execve(arg_file, args, environ)
+            except Exception as err:
+                _send_failure(report_write, err)
+        finally:
+            os._exit(1)  # never return to the code of parent
 
     return _execute_child
@@ -0,0 +1,360 @@
+"""
+Fork server of pji, which forks and executes the children on behalf of the judge process.
+
+This module is executed as a standalone script (``python -I -S forkserver.py <request_fd> <event_fd>``),
+so it must only depend on the standard library, which keeps the server process small.
+Both spawn latency and the memory accounting of children will not depend on the size of the judge process.
+
+Protocol (each frame is a 4-byte big-endian length followed by an utf-8 json object):
+
+* request socket (judge -> server):
+    * ``{"type": "spawn", "id", "executable", "args", "environ", "cwd", "rlimits", "cgroup",
+      "cpus", "nice", "ioprio", "uid", "gid", "groups"}``, \
+      with fds of stdin, stdout, stderr and report pipe attached by ``SCM_RIGHTS``.
+    * ``{"type": "kill", "id"}``, kill the process group of the child.
+* event pipe (server -> judge):
+    * ``{"type": "spawned", "id", "pid"}`` or ``{"type": "failed", "id", "error"}``.
+    * ``{"type": "exited", "id", "status", "rusage", "end_time", "descendants"}``, sent after the rest of \
+      its session is killed and reaped, descendants is ``[count, utime, stime, maxrss]`` of the reaped orphans.
+* report pipe (child -> judge, closed on exec):
+    * ``{"start_time"}`` just before exec, or ``{"error", "errno", "message"}`` when failed.
+"""
+import array
+import json
+import os
+import resource
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+
+_HEADER = struct.Struct('!I')
+_SPAWN_FDS = 4
+_PR_SET_CHILD_SUBREAPER = 36
+_CLEAN_INTERVAL = 0.005
+_CLEAN_TIMEOUT = 1.0
+_UNLIMITED = resource.RLIM_INFINITY
+_SYS_IOPRIO_SET = {
+    'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'armv7l': 314,
+    'ppc64le': 273, 's390x': 282, 'riscv64': 30,
+}
+
+
+def dump_frame(data: dict) -> bytes:
+    _payload = json.dumps(data).encode('utf8')
+    return _HEADER.pack(len(_payload)) + _payload
+
+
+def load_frames(buffer: bytearray):
+    """
+    load all the complete frames from buffer, loaded part will be removed
+    :param buffer: buffer of received data
+    :return: list of frames
+    """
+    _frames = []
+    while len(buffer) >= _HEADER.size:
+        (_length,) = _HEADER.unpack_from(buffer)
+        if len(buffer) < _HEADER.size + _length:
+            break
+        _frames.append(json.loads(bytes(buffer[_HEADER.size:_HEADER.size + _length]).decode('utf8')))
+        del buffer[:_HEADER.size + _length]
+    return _frames
+
+
+def write_frame(fd: int, data: dict):
+    _data = memoryview(dump_frame(data))
+    while _data:
+        _data = _data[os.write(fd, _data):]
+
+
+def read_frames(fd: int):
+    """
+    read frames from fd until eof
+    :param fd: file descriptor
+    :return: list of frames
+    """
+    _buffer = bytearray()
+    while True:
+        _chunk = os.read(fd, 4096)
+        if not _chunk:
+            break
+        _buffer.extend(_chunk)
+    return load_frames(_buffer)
+
+
+def send_frame(sock: socket.socket, data: dict, fds=None):
+    _data = dump_frame(data)
+    if fds:
+        _sent = sock.sendmsg([_data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+        _data = _data[_sent:]
+    sock.sendall(_data)
+
+
+def _recv_exactly(sock: socket.socket, size: int, fds: list):
+    _buffer = bytearray()
+    while len(_buffer) < size:
+        _chunk, _ancillary, _, _ = sock.recvmsg(size - len(_buffer), socket.CMSG_SPACE(_SPAWN_FDS * 4))
+        if not _chunk:
+            return None
+        for _level, _type, _cdata in _ancillary:
+            if _level == socket.SOL_SOCKET and _type == socket.SCM_RIGHTS:
+                _fds = array.array('i')
+                _fds.frombytes(_cdata[:len(_cdata) - (len(_cdata) % _fds.itemsize)])
+                fds.extend(_fds)
+        _buffer.extend(_chunk)
+    return bytes(_buffer)
+
+
+def recv_frame(sock: socket.socket):
+    """
+    receive one frame with attached fds
+    :param sock: socket object
+    :return: frame (none when eof), list of fds
+    """
+    _fds = []
+    _header = _recv_exactly(sock, _HEADER.size, _fds)
+    if _header is None:
+        return None, _fds
+    (_length,) = _HEADER.unpack(_header)
+    _payload = _recv_exactly(sock, _length, _fds)
+    if _payload is None:
+        return None, _fds
+    return json.loads(_payload.decode('utf8')), _fds
+
+
+def _rmin(x, y):
+    if x == _UNLIMITED:
+        return y
+    elif y == _UNLIMITED:
+        return x
+    else:
+        return min(x, y)
+
+
+def _apply_rlimit(limit_type: int, value: int):
+    _value = _UNLIMITED if value < 0 else value
+    _cur_soft, _cur_hard = resource.getrlimit(limit_type)
+    _hard = _rmin(_cur_hard, _value)
+    resource.setrlimit(limit_type, (_rmin(_value, _hard), _hard))
+
+
+def _ioprio_set(class_: int, level: int):
+    import ctypes  # only imported when used, which keeps the server small
+    import platform
+
+    _number = _SYS_IOPRIO_SET.get(platform.machine(), None)
+    if _number is None:
+        raise EnvironmentError('Ioprio_set is not supported on {machine}.'.format(machine=platform.machine()))
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+    if _libc.syscall(_number, 1, 0, (class_ << 13) | level) < 0:  # IOPRIO_WHO_PROCESS, current process
+        _errno = ctypes.get_errno()
+        raise OSError(_errno, os.strerror(_errno))
+
+
+def _execute_child(spec: dict, stdin_fd: int, stdout_fd: int, stderr_fd: int, report_fd: int):
+    try:
+        os.setsid()  # become the group leader
+
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for _fd in {stdin_fd, stdout_fd, stderr_fd} - {0, 1, 2}:
+            os.close(_fd)
+
+        if spec.get('cgroup'):  # join before setuid, which may lose the permission of cgroup
+            with open(os.path.join(spec['cgroup'], 'cgroup.procs'), 'w') as f:
+                f.write('0')
+        if spec.get('cpus') is not None:
+            os.sched_setaffinity(0, spec['cpus'])
+        if spec.get('nice') is not None:  # before setuid, negative nice value needs the privilege
+            os.setpriority(os.PRIO_PROCESS, 0, spec['nice'])
+        if spec.get('ioprio') is not None:
+            _ioprio_set(*spec['ioprio'])
+        os.chdir(spec['cwd'])
+        for _limit_type, _value in spec['rlimits']:
+            _apply_rlimit(_limit_type, _value)
+        if spec.get('groups') is not None and os.geteuid() == 0:
+            os.setgroups(spec['groups'])
+        if spec['gid'] is not None:
+            os.setgid(spec['gid'])
+        if spec['uid'] is not None:
+            os.setuid(spec['uid'])
+
+        write_frame(report_fd, {'start_time': time.time()})
+        os.execve(spec['executable'], spec['args'], spec['environ'])
+    except BaseException as err:
+        write_frame(report_fd, {
+            'error': type(err).__name__,
+            'errno': getattr(err, 'errno', None),
+            'message': str(err),
+        })
+    finally:
+        os._exit(127)
+
+
+def _rusage_tuple(rusage) -> list:
+    return [getattr(rusage, _name) for _name in (
+        'ru_utime', 'ru_stime', 'ru_maxrss', 'ru_ixrss', 'ru_idrss', 'ru_isrss', 'ru_minflt', 'ru_majflt',
+        'ru_nswap', 'ru_inblock', 'ru_oublock', 'ru_msgsnd', 'ru_msgrcv', 'ru_nsignals', 'ru_nvcsw', 'ru_nivcsw',
+    )]
+
+
+def _set_child_subreaper():
+    import ctypes
+
+    try:
+        ctypes.CDLL(None, use_errno=True).prctl(_PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0)
+    except (OSError, AttributeError):  # orphans will be reparented to init
+        pass
+
+
+def _read_parent_and_session(pid: int):
+    try:
+        with open('/proc/{pid}/stat'.format(pid=pid), 'r') as f:
+            _content = f.read()
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+
+    _fields = _content[_content.rindex(')') + 2:].split()
+    return int(_fields[1]), int(_fields[3])
+
+
+def _session_members(sid: int) -> list:
+    _result = []
+    for _name in os.listdir('/proc'):
+        if _name.isdigit() and int(_name) != sid:
+            _info = _read_parent_and_session(int(_name))
+            if _info is not None and _info[1] == sid:
+                _result.append(int(_name))
+    return _result
+
+
+class _Server:
+    def __init__(self, request_fd: int, event_fd: int):
+        self.__sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, fileno=request_fd)
+        self.__event_fd = event_fd
+        os.set_inheritable(request_fd, False)
+        os.set_inheritable(event_fd, False)
+
+        self.__children = {}  # pid -> id
+        self.__cleanings = {}  # pid -> exited frame, sent after the rest of session is cleaned
+        self.__descendants = {}  # session id -> [count, utime, stime, maxrss] of reaped orphans
+        self.__selector = selectors.DefaultSelector()
+        self.__wakeup_read, self.__wakeup_write = os.pipe()
+        os.set_blocking(self.__wakeup_read, False)
+        os.set_blocking(self.__wakeup_write, False)
+        signal.set_wakeup_fd(self.__wakeup_write)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+        self.__selector.register(self.__sock, selectors.EVENT_READ)
+        self.__selector.register(self.__wakeup_read, selectors.EVENT_READ)
+
+    def __spawn(self, spec: dict, fds: list):
+        try:
+            if len(fds) != _SPAWN_FDS:
+                raise ValueError('{expected} fds expected but {actual} found.'.format(
+                    expected=_SPAWN_FDS, actual=len(fds)))
+            os.set_inheritable(fds[-1], False)
+            _pid = os.fork()
+            if not _pid:
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                _execute_child(spec, *fds)
+        except Exception as err:
+            write_frame(self.__event_fd, {'type': 'failed', 'id': spec['id'], 'error': repr(err)})
+        else:
+            self.__children[_pid] = spec['id']
+            write_frame(self.__event_fd, {'type': 'spawned', 'id': spec['id'], 'pid': _pid})
+        finally:
+            for _fd in fds:
+                os.close(_fd)
+
+    def __kill(self, id_: int):
+        for _pid, _id in self.__children.items():
+            if _id == id_:  # not reaped yet, so the process group is still valid
+                try:
+                    os.killpg(os.getpgid(_pid), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def __reap(self):
+        while True:
+            try:  # peek first, so that the session of orphan can be read before reaped
+                _info = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            except ChildProcessError:
+                break
+            if _info is None or not _info.si_pid:
+                break
+
+            _parent_and_session = _read_parent_and_session(_info.si_pid)
+            _pid, _status, _rusage = os.wait4(_info.si_pid, 0)
+            _id = self.__children.pop(_pid, None)
+            if _id is not None:
+                self.__cleanings[_pid] = ({
+                    'type': 'exited', 'id': _id, 'status': _status,
+                    'rusage': _rusage_tuple(_rusage), 'end_time': time.time(),
+                }, time.monotonic() + _CLEAN_TIMEOUT)
+            elif _parent_and_session is not None:
+                _sid = _parent_and_session[1]
+                if _sid in self.__children or _sid in self.__cleanings:  # orphan of a child
+                    _usage = self.__descendants.setdefault(_sid, [0, 0.0, 0.0, 0])
+                    _usage[0] += 1
+                    _usage[1] += _rusage.ru_utime
+                    _usage[2] += _rusage.ru_stime
+                    _usage[3] = max(_usage[3], _rusage.ru_maxrss)
+
+    def __clean(self):
+        for _pid, (_frame, _deadline) in list(self.__cleanings.items()):
+            _members = _session_members(_pid)
+            for _member in _members:
+                try:
+                    os.kill(_member, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+            if not _members or time.monotonic() >= _deadline:
+                del self.__cleanings[_pid]
+                _frame['descendants'] = self.__descendants.pop(_pid, [0, 0.0, 0.0, 0])
+                write_frame(self.__event_fd, _frame)
+
+    def __shutdown(self):
+        for _pid in list(self.__children.keys()):
+            try:
+                os.killpg(os.getpgid(_pid), signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def serve(self):
+        while True:
+            for _key, _ in self.__selector.select(_CLEAN_INTERVAL if self.__cleanings else None):
+                if _key.fileobj is self.__sock:
+                    _frame, _fds = recv_frame(self.__sock)
+                    if _frame is None:
+                        self.__shutdown()
+                        return
+                    elif _frame['type'] == 'spawn':
+                        self.__spawn(_frame, _fds)
+                    elif _frame['type'] == 'kill':
+                        self.__kill(_frame['id'])
+                else:
+                    try:
+                        while os.read(self.__wakeup_read, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+
+            self.__reap()
+            self.__clean()
+
+
+def main(argv):
+    _request_fd, _event_fd = int(argv[1]), int(argv[2])
+    _set_child_subreaper()
+    _Server(_request_fd, _event_fd).serve()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -1,29 +1,67 @@
 import os
-import pickle
-from multiprocessing import Event, Value, Lock
-from multiprocessing.synchronize import Event as _EventType
-from queue import Queue, Empty
-from threading import Thread
-from typing import Optional, Mapping
-
-from .base import BYTES_LINESEQ, measure_thread, killer_thread, load_lines_from_stream, GeneralProcess
+import time
+from threading import Event, Lock
+from typing import Optional, Mapping, Callable, Tuple, Iterator, List, Iterable
+
+from .base import BYTES_LINESEQ, GeneralProcess, LineSplitter, CountdownEvent, OutputQueue
+from .capture import OutputCounter
+from .check import OutputChecker
 from .decorator import process_setter
-from .executor import get_child_executor_func
+from .launcher import launch_child
+from .sampler import waiting_for_input
+from .schedule import StdinSchedule
+from .supervisor import get_supervisor, _IOV_MAX
 from ..model import ResourceLimit
-from ...utils import gen_lock
+
+_OUTPUT_QUEUE_SIZE = 1 << 16
+_RAW_OUTPUT_QUEUE_SIZE = 1 << 8  # each chunk is at most 64KiB
+
+
+class _OutputIterator:
+    def __init__(self, queue: OutputQueue, on_end: Callable[[], None], batch: bool = False):
+        """
+        :param queue: queue of output records
+        :param on_end: callback when all the records are got
+        :param batch: yield the list of all the records in queue each time
+        """
+        self.__queue = queue
+        self.__on_end = on_end
+        self.__batch = batch
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # thread-safe, so the records can be consumed in several threads
+        _item = self.__queue.get_many() if self.__batch else self.__queue.get()
+        if _item is None:
+            self.__on_end()
+            raise StopIteration
+        return _item
 
 
 class InteractiveProcess(GeneralProcess):
     def __init__(self, start_time: float, stdin_stream, output_iter,
-                 resources: ResourceLimit, process_result_func, lifetime_event: _EventType):
+                 resources: ResourceLimit, process_result_func, lifetime_event: Event, output_size_func=None,
+                 snapshot_func=None, output_batch_iter=None, raw_output: bool = False, quiet_func=None,
+                 mismatch_func=None):
         self.__lock = Lock()
-        GeneralProcess.__init__(self, start_time, resources, process_result_func, lifetime_event, self.__lock)
+        GeneralProcess.__init__(self, start_time, resources, process_result_func, lifetime_event, self.__lock,
+                                output_size_func, snapshot_func, mismatch_func)
 
         self.__stdin_stream = stdin_stream
         self.__output_iter = output_iter
-        self.__stdin_closed = False
+        self.__output_batch_iter = output_batch_iter
+        self.__raw_output = raw_output
+        self.__quiet_func = quiet_func
+        self.__stdin_closed = stdin_stream is None  # stdin is plumbed directly
+
+    def __check_stdin(self):
+        if self.__stdin_stream is None:
+            raise ValueError('Stdin is plumbed directly, so it can not be written by this process.')
 
     def __write_stdin(self, data: bytes):
+        self.__check_stdin()
         try:
             self.__stdin_stream.write(data)
         except BrokenPipeError as err:
@@ -37,7 +75,31 @@ class InteractiveProcess(GeneralProcess):
             self.__stdin_closed = True
             raise err
 
+    def __writev_stdin(self, buffers: List[memoryview]) -> int:
+        self.__check_stdin()
+        _fd = self.__stdin_stream.fileno()
+        _total, _index = 0, 0
+        try:
+            while _index < len(buffers):
+                _size = os.writev(_fd, buffers[_index:_index + _IOV_MAX])
+                _total += _size
+                while _size > 0:  # partial write, continue from the rest of the buffer
+                    _length = len(buffers[_index])
+                    if _size >= _length:
+                        _size -= _length
+                        _index += 1
+                    else:
+                        buffers[_index] = buffers[_index][_size:]
+                        _size = 0
+        except BrokenPipeError as err:
+            self.__stdin_closed = True
+            raise err
+
+        return _total
+
     def __close_stdin(self):
+        if self.__stdin_stream is None:
+            return
         try:
             self.__stdin_stream.close()
             self.__stdin_closed = True
@@ -55,16 +117,69 @@ class InteractiveProcess(GeneralProcess):
         self._wait_for_end()
 
     @property
-    def output_yield(self):
+    def raw_output(self) -> bool:
+        return self.__raw_output
+
+    @property
+    def output_yield(self) -> Iterator[Tuple[Optional[float], str, bytes]]:
+        """
+        :return: iterator of (time, tag, line) records, or (time, tag, chunk) in raw output mode
+        """
         with self.__lock:
             return self.__output_iter
 
+    @property
+    def output_batches(self) -> Iterator[List[Tuple[Optional[float], str, bytes]]]:
+        """
+        :return: iterator of the lists of records, each of them contains all the records received by then, \
+            they are consumed from the same queue of ``output_yield``
+        """
+        with self.__lock:
+            return self.__output_batch_iter
+
     def print_stdin(self, line: bytes, flush: bool = True, end: bytes = BYTES_LINESEQ):
         with self.__lock:
             self.__write_stdin(line + end)
             if flush:
                 self.__flush_stdin()
 
+    def write_lines(self, lines: Iterable[bytes], end: bytes = BYTES_LINESEQ) -> int:
+        """
+        write lines into stdin with vectored writes (``os.writev``), which cost much less system calls \
+            than ``print_stdin`` for each line
+        :param lines: lines to be written
+        :param end: end of each line
+        :return: size of bytes written
+        """
+        _buffers = []
+        for _line in lines:
+            if _line:
+                _buffers.append(memoryview(_line))
+            if end:
+                _buffers.append(memoryview(end))
+
+        with self.__lock:
+            return self.__writev_stdin(_buffers)
+
+    def schedule_stdin(self, lines: List[Tuple[float, bytes]], end: bytes = BYTES_LINESEQ,
+                       fast_forward: Optional[float] = None) -> StdinSchedule:
+        """
+        deliver lines into stdin at their scheduled time by io supervisor, without blocking this thread, \
+            stdin is taken by the schedule so it can not be written by other methods any more
+        :param lines: list of (time relative to start time, line), sorted by time
+        :param end: end of each line
+        :param fast_forward: quiet time, the next lines are delivered once there is no output for this time \
+            and the process is blocked on reading input, the skipped time is accounted by the schedule \
+            as virtual time (unit: s, none means the lines are delivered in real time)
+        :return: schedule object, which can be cancelled and reports the delivery skew of lines
+        """
+        _start_time = self.start_time
+        with self.__lock:
+            self.__check_stdin()
+            _fd = os.dup(self.__stdin_stream.fileno())
+            self.__close_stdin()
+            return StdinSchedule(_fd, _start_time, lines, end, fast_forward, self.__quiet_func)
+
     def close_stdin(self):
         with self.__lock:
             self.__close_stdin()
@@ -78,22 +193,18 @@ class InteractiveProcess(GeneralProcess):
             self.__exit()
 
 
-def _read_pipe(pipe_entry, start_time_ok: _EventType, start_time: Value,
-               tag: str, stream_ready: _EventType, process_complete: _EventType, queue: Queue):
-    def _transform_func(item):
-        _time, _line = item
-        start_time_ok.wait()
-        return _time - start_time.value, tag, _line.rstrip(b'\r\n')
-
-    with os.fdopen(pipe_entry, 'rb', 0) as stream:
-        return load_lines_from_stream(stream, stream_ready, process_complete, queue, _transform_func)
-
-
 # Attention: only real_time_limit will be processed in this function, other limits will be processed in decorator
 # noinspection DuplicatedCode, PyIncorrectDocstring,PyUnresolvedReferences,SpellCheckingInspection
 @process_setter
 def interactive_process(args, preexec_fn=None, resources=None,
-                        environ: Optional[Mapping[str, str]] = None) -> InteractiveProcess:
+                        environ: Optional[Mapping[str, str]] = None,
+                        cwd: Optional[str] = None, identification=None,
+                        launcher: Optional[str] = None, cgroup=None,
+                        sample_interval: Optional[float] = None, placement=None,
+                        core_lease=None, executable: Optional[str] = None,
+                        groups=None, raw_output: bool = False, timestamp: bool = True,
+                        stdin_fd: Optional[int] = None, stdout_fd: Optional[int] = None,
+                        stderr_fd: Optional[int] = None, checker=None) -> InteractiveProcess:
     """
     Create an interactive process
     :param args: arguments for execution
@@ -103,141 +214,128 @@ def interactive_process(args, preexec_fn=None, resources=None,
     :param environ: environment variables
     :param cwd: new work dir
     :param identification: user and group for execution
+    :param launcher: launcher type, ``fork`` or ``forkserver`` (default from environment variable ``PJI_LAUNCHER``)
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param cgroup: cgroup of child process (created by decorator when cgroup resource backend is used)
+    :param sample_interval: interval of resource sampling based on ``/proc``, the process group will be killed \
+        as soon as sampled rss exceeds ``max_memory`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of child process, \
+        see :class:`pji.control.model.Placement`
+    :param core_lease: exclusive cores of child process (allocated by decorator when placement is exclusive)
+    :param executable: resolved path of executable (resolved by decorator from spawn plan)
+    :param groups: supplementary group ids of user (resolved by decorator from spawn plan)
+    :param raw_output: yield the exact chunks read from stdout and stderr instead of lines (default is False)
+    :param timestamp: get the relative time of records (default is True, otherwise the time will be none)
+    :param stdin_fd: fd to be dup2'd into child as stdin, then stdin can not be written by this process \
+        (none means a pipe will be created)
+    :param stdout_fd: fd to be dup2'd into child as stdout, then nothing from stdout will be yielded \
+        (none means a pipe will be created)
+    :param stderr_fd: fd to be dup2'd into child as stderr, then nothing from stderr will be yielded \
+        (none means a pipe will be created)
+    :param checker: output checker of stdout, see :class:`pji.control.process.OutputChecker`, \
+        the process group will be killed at the first mismatch (none means not checked)
     :return: InteractiveProcess object to do run
     """
     resources = ResourceLimit.loads(resources)
+    checker = OutputChecker.loads(checker) if checker is not None else None
+    if checker is not None and stdout_fd is not None:
+        raise ValueError('Stdout should not be plumbed directly when output checker is used.')
     _full_lifetime_complete = Event()
     environ = dict(environ or {})
 
-    _executor_prepare_ok = Event()
-    _exception_get, _exception_put = os.pipe()
-
-    _parent_initialized = Event()
-    _start_time = Value('d', 0.0)
-    _start_time_ok = Event()
-
-    # noinspection DuplicatedCode
-    def _execute_parent() -> InteractiveProcess:
-        os.close(stdin_read)
-        os.close(stdout_write)
-        os.close(stderr_write)
-
-        # measure thread
-        _measure_thread, _measure_initialized, _process_complete, _measure_complete, _result_proxy = measure_thread(
-            start_time_ok=_start_time_ok,
-            start_time=_start_time,
-            child_pid=child_pid,
-        )
-
-        # killer thread
-        _killer_thread, _killer_initialized = killer_thread(
-            start_time_ok=_start_time_ok,
-            start_time=_start_time,
-            child_pid=child_pid,
-            real_time_limit=resources.max_real_time,
-            process_complete=_process_complete,
-        )
-
-        # lines output
-        _output_queue = Queue()
-        _output_start, _output_complete = Event(), Event()
-        _stdout_ready, _stderr_ready = Event(), Event()
-        _stdout_thread = Thread(
-            target=lambda: _read_pipe(
-                pipe_entry=stdout_read,
-                start_time_ok=_start_time_ok,
-                start_time=_start_time,
-                tag='stdout',
-                stream_ready=_stdout_ready,
-                process_complete=_process_complete,
-                queue=_output_queue,
-            ))
-        _stderr_thread = Thread(
-            target=lambda: _read_pipe(
-                pipe_entry=stderr_read,
-                start_time_ok=_start_time_ok,
-                start_time=_start_time,
-                tag='stderr',
-                stream_ready=_stderr_ready,
-                process_complete=_process_complete,
-                queue=_output_queue,
-            ))
-
-        def _output_queue_func():
-            _stdout_thread.start()
-            _stderr_thread.start()
-            _stdout_ready.wait()
-            _stderr_ready.wait()
-            _output_start.set()
-
-            _stdout_thread.join()
-            _stderr_thread.join()
-            _output_complete.set()
-
-        _queue_thread = Thread(target=_output_queue_func)
-
-        def _output_yield():
-            _output_start.wait()
-            while not _output_complete.is_set() or not _output_queue.empty():
-                try:
-                    _time, _tag, _line = _output_queue.get(timeout=0.2)
-                except Empty:
-                    pass
-                else:
-                    yield _time, _tag, _line
-
-            _measure_thread.join()
-            _killer_thread.join()
-            _queue_thread.join()
-            _full_lifetime_complete.set()
-
-        # waiting for prepare ok
-        _executor_prepare_ok.wait()
-        with os.fdopen(_exception_get, 'rb', 0) as ef:
-            _exception = pickle.load(ef)
-            if _exception:
-                raise _exception
-
-        # start all the threads and services
-        _measure_thread.start()
-        _killer_thread.start()
-        _queue_thread.start()
-        _stdin_stream = os.fdopen(stdin_write, 'wb', 0)
-        _output_iter = gen_lock(_output_yield())
-
-        # wait for all the thread initialized
-        _measure_initialized.wait()
-        _killer_initialized.wait()
-        _output_start.wait()
-        _parent_initialized.set()
-
-        _start_time_ok.wait()
-        return InteractiveProcess(
-            start_time=_start_time.value,
-            stdin_stream=_stdin_stream,
-            output_iter=_output_iter,
-            resources=resources,
-            process_result_func=lambda: _result_proxy.value,
-            lifetime_event=_full_lifetime_complete,
-        )
-
-    stdin_read, stdin_write = os.pipe()
-    stdout_read, stdout_write = os.pipe()
-    stderr_read, stderr_write = os.pipe()
-
-    _execute_child = get_child_executor_func(
-        args, dict(environ or {}), preexec_fn,
-        _executor_prepare_ok, (_exception_get, _exception_put),
-        _parent_initialized,
-        _start_time_ok, _start_time,
-        (stdin_read, stdin_write),
-        (stdout_read, stdout_write),
-        (stderr_read, stderr_write),
+    _child = launch_child(
+        args=args, environ=environ, preexec_fn=preexec_fn,
+        resources=resources, cwd=cwd, identification=identification, launcher=launcher, cgroup=cgroup,
+        sample_interval=sample_interval, placement=placement, core_lease=core_lease,
+        executable=executable, groups=groups,
+        stdin_fd=stdin_fd, stdout_fd=stdout_fd, stderr_fd=stderr_fd,
+    )
+    stdin_write, stdout_read, stderr_read = _child.stdin, _child.stdout, _child.stderr
+    _watch = _child.watch
+    _start_time_value = _child.start_time
+    _last_output_time = time.monotonic()
+
+    # stdout and stderr are served by io supervisor, and the records are delivered into one bounded queue
+    _supervisor = get_supervisor()
+    _readers = []
+    _output_queue = OutputQueue(
+        _RAW_OUTPUT_QUEUE_SIZE if raw_output else _OUTPUT_QUEUE_SIZE,
+        on_pause=lambda: [_reader.pause() for _reader in _readers],
+        on_resume=lambda: [_reader.resume() for _reader in _readers],
+    )
+    _streams = {_tag: _fd for _tag, _fd in [('stdout', stdout_read), ('stderr', stderr_read)] if _fd is not None}
+    _output_complete = CountdownEvent(len(_streams))
+    _output_complete.add_done_callback(_output_queue.close)
+    _counter = OutputCounter(limit=resources.max_output_size, on_exceed=_watch.kill, streams=list(_streams.keys()))
+
+    def _line_splitter(tag: str) -> LineSplitter:
+        def _put_line(_time: Optional[float], _line: bytes):
+            _output_queue.put((_time - _start_time_value if _time is not None else None,
+                               tag, _line.rstrip(b'\r\n')))
+
+        return LineSplitter(_put_line, timestamp)
+
+    def _chunk_putter(tag: str) -> Callable[[bytes], None]:
+        def _put_chunk(data: bytes):
+            _output_queue.put((time.time() - _start_time_value if timestamp else None, tag, data))
+
+        return _put_chunk
+
+    _matched = True
+
+    def _check(matched: bool):
+        nonlocal _matched
+        if _matched and not matched:
+            _matched = False
+            _watch.kill()
+
+    def _add_output_reader(fd: int, tag: str):
+        _checker = checker if tag == 'stdout' else None
+        if raw_output:
+            _feed, _close = _chunk_putter(tag), None
+        else:
+            _splitter = _line_splitter(tag)
+            _feed, _close = _splitter.feed, _splitter.close
+
+        def _on_data(data: bytes):
+            nonlocal _last_output_time
+            _last_output_time = time.monotonic()
+            if _counter.add(tag, len(data)):  # the rest is drained and dropped after output limit exceeded
+                _feed(data)
+                if _checker is not None:
+                    _check(_checker.feed(data))
+
+        def _on_close():
+            if _close is not None:
+                _close()
+            if _checker is not None:
+                _check(_checker.close())
+            _output_complete.count_down()
+
+        _readers.append(_supervisor.add_reader(fd, _on_data, _on_close))
+
+    for _tag, _fd in _streams.items():
+        _add_output_reader(_fd, _tag)
+
+    def _quiet(duration: float) -> bool:
+        return time.monotonic() - _last_output_time >= duration and waiting_for_input(_child.pid)
+
+    def _output_end():
+        _watch.join()
+        _full_lifetime_complete.set()
+
+    return InteractiveProcess(
+        start_time=_start_time_value,
+        stdin_stream=os.fdopen(stdin_write, 'wb', 0) if stdin_write is not None else None,
+        output_iter=_OutputIterator(_output_queue, _output_end),
+        output_batch_iter=_OutputIterator(_output_queue, _output_end, batch=True),
+        raw_output=raw_output,
+        resources=resources,
+        process_result_func=lambda: _watch.result,
+        lifetime_event=_full_lifetime_complete,
+        output_size_func=lambda: _counter.sizes,
+        snapshot_func=lambda: _child.sampler.latest if _child.sampler is not None else None,
+        quiet_func=_quiet,
+        mismatch_func=lambda: checker.mismatch if checker is not None else None,
     )
-
-    child_pid = os.fork()
-
-    if not child_pid:
-        _execute_child()
-    else:
-        return _execute_parent()
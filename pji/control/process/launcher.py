@@ -0,0 +1,520 @@
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import time
+from resource import struct_rusage
+from threading import Lock, Event
+from typing import Optional, Mapping, List
+
+import where
+
+from .cgroup import Cgroup
+from .executor import get_child_executor_func, ExecutorException, ChildHandshake
+from .forkserver import send_frame, read_frames, load_frames
+from .reaper import watch_child, ChildWatch
+from .placement import CoreLease
+from .sampler import ResourceSampler
+from .supervisor import get_supervisor
+from .tree import set_child_subreaper
+from .watchdog import CpuTimeWatchdog
+from ..model import ResourceLimit, Identification, ProcessResult, Placement, DescendantUsage
+from ...utils import args_split
+
+ENV_PJI_LAUNCHER = 'PJI_LAUNCHER'
+
+LAUNCHER_FORK = 'fork'
+LAUNCHER_FORKSERVER = 'forkserver'
+
+
+class LaunchedChild:
+    def __init__(self, pid: int, start_time: float, watch: ChildWatch,
+                 stdin: Optional[int], stdout: Optional[int], stderr: Optional[int],
+                 sampler: Optional[ResourceSampler] = None):
+        """
+        :param pid: pid of child process
+        :param start_time: start time of child process
+        :param watch: watch of child process
+        :param stdin: write end of stdin pipe (none when file is plumbed directly)
+        :param stdout: read end of stdout pipe (none when file is plumbed directly)
+        :param stderr: read end of stderr pipe (none when file is plumbed directly)
+        :param sampler: resource sampler of child process (none means not sampled)
+        """
+        self.__pid = pid
+        self.__start_time = start_time
+        self.__watch = watch
+        self.__sampler = sampler
+        self.__stdin = stdin
+        self.__stdout = stdout
+        self.__stderr = stderr
+
+    @property
+    def pid(self) -> int:
+        return self.__pid
+
+    @property
+    def start_time(self) -> float:
+        return self.__start_time
+
+    @property
+    def watch(self) -> ChildWatch:
+        return self.__watch
+
+    @property
+    def sampler(self) -> Optional[ResourceSampler]:
+        return self.__sampler
+
+    @property
+    def stdin(self) -> Optional[int]:
+        return self.__stdin
+
+    @property
+    def stdout(self) -> Optional[int]:
+        return self.__stdout
+
+    @property
+    def stderr(self) -> Optional[int]:
+        return self.__stderr
+
+
+class _StdioPlumbing:
+    """
+    Stdio of child process, a pipe is created for each stream unless a fd is given,
+    the given fd (e.g. an opened file) will be dup2'd into child directly.
+    """
+
+    def __init__(self, stdin: Optional[int] = None, stdout: Optional[int] = None, stderr: Optional[int] = None):
+        """
+        :param stdin: fd to be used as stdin directly (none means pipe)
+        :param stdout: fd to be used as stdout directly (none means pipe)
+        :param stderr: fd to be used as stderr directly (none means pipe)
+        """
+        self.__child_fds, self.__parent_fds, self.__owned_fds = [], [], []
+        for _fd, _readable in ((stdin, True), (stdout, False), (stderr, False)):
+            if _fd is None:
+                _read, _write = os.pipe()
+                _child, _parent = (_read, _write) if _readable else (_write, _read)
+                self.__child_fds.append(_child)
+                self.__parent_fds.append(_parent)
+                self.__owned_fds.append(_child)
+            else:
+                self.__child_fds.append(_fd)
+                self.__parent_fds.append(None)
+
+    @property
+    def child_fds(self) -> List[int]:
+        """
+        :return: fds of stdin, stdout and stderr used by child
+        """
+        return list(self.__child_fds)
+
+    @property
+    def parent_fds(self) -> List[Optional[int]]:
+        """
+        :return: fds of stdin, stdout and stderr used by parent (none when plumbed directly)
+        """
+        return list(self.__parent_fds)
+
+    def close_child_fds(self):
+        """
+        close the pipe ends of child, should be called in parent after spawned
+        """
+        for _fd in self.__owned_fds:
+            os.close(_fd)
+
+    def close_parent_fds(self):
+        """
+        close the pipe ends of parent, should be called when spawn failed
+        """
+        for _fd in self.__parent_fds:
+            if _fd is not None:
+                os.close(_fd)
+
+
+def _create_sampler(child_pid: int, start_time: float, resources: ResourceLimit,
+                    cgroup: Optional[Cgroup], sample_interval: Optional[float]) -> Optional[ResourceSampler]:
+    if sample_interval is not None:
+        return ResourceSampler(child_pid, start_time, sample_interval, resources.max_memory, cgroup)
+    else:
+        return None
+
+
+def _create_watchdog(child_pid: int, resources: ResourceLimit,
+                     cgroup: Optional[Cgroup]) -> Optional[CpuTimeWatchdog]:
+    if resources.max_cpu_time is not None:
+        return CpuTimeWatchdog(child_pid, resources.max_cpu_time, cgroup=cgroup)
+    else:
+        return None
+
+
+def _fork_launch(args, environ: Mapping[str, str], preexec_fn, resources: ResourceLimit,
+                 stdio: _StdioPlumbing, cgroup: Optional[Cgroup], sample_interval: Optional[float],
+                 executable: Optional[str] = None) -> LaunchedChild:
+    _handshake = ChildHandshake()
+
+    # noinspection DuplicatedCode
+    def _execute_parent() -> LaunchedChild:
+        stdio.close_child_fds()
+        _handshake.close_child_fds()
+
+        try:
+            _handshake.wait_prepared()
+            _handshake.ready()
+            _start_time = _handshake.wait_started()
+        except BaseException:
+            stdio.close_parent_fds()
+            _handshake.close()
+            os.waitpid(child_pid, 0)  # child always exits when handshake failed
+            raise
+        else:
+            _handshake.close()
+
+        # exit notification and real time limit, served by pidfd when supported
+        _sampler = _create_sampler(child_pid, _start_time, resources, cgroup, sample_interval)
+        _watchdog = _create_watchdog(child_pid, resources, cgroup)
+        _watch = watch_child(
+            child_pid=child_pid,
+            start_time=_start_time,
+            real_time_limit=resources.max_real_time,
+            cgroup=cgroup,
+            sampler=_sampler,
+            watchdog=_watchdog,
+        )
+        if _sampler is not None:
+            _sampler.start(on_exceed=_watch.kill)
+        if _watchdog is not None:
+            _watchdog.start(on_exceed=_watch.kill)
+
+        return LaunchedChild(child_pid, _start_time, _watch, *stdio.parent_fds, sampler=_sampler)
+
+    try:
+        _execute_child = get_child_executor_func(
+            args, dict(environ), preexec_fn,
+            *_handshake.child_fds, *stdio.child_fds, executable=executable,
+        )
+        child_pid = os.fork()
+    except BaseException:
+        stdio.close_child_fds()
+        stdio.close_parent_fds()
+        _handshake.close_child_fds()
+        _handshake.close()
+        raise
+
+    if not child_pid:
+        _execute_child()
+    else:
+        return _execute_parent()
+
+
+class ForkServerChildWatch(ChildWatch):
+    """
+    Child watch of the children launched by fork server, exit status and resource usage are reported by server.
+    """
+
+    def __init__(self, server: 'ForkServer', id_: int, cgroup: Optional[Cgroup] = None):
+        """
+        :param server: fork server
+        :param id_: id of spawn request
+        :param cgroup: cgroup of child process (none means not used)
+        """
+        ChildWatch.__init__(self)
+        self.__server = server
+        self.__id = id_
+        self.__cgroup = cgroup
+        self.__lock = Lock()
+        self.__spawned = Event()
+        self.__complete = Event()
+
+        self.__pid, self.__error = None, None
+        self.__start_time, self.__killer, self.__sampler, self.__watchdog = None, None, None, None
+        self.__exit_info, self.__result = None, None
+
+    def _spawned(self, pid: Optional[int], error: Optional[str]):
+        self.__pid, self.__error = pid, error
+        self.__spawned.set()
+
+    def _wait_spawned(self) -> int:
+        self.__spawned.wait()
+        if self.__error is not None:
+            raise ExecutorException(OSError(self.__error))
+        return self.__pid
+
+    def _started(self, start_time: Optional[float], real_time_limit: Optional[float],
+                 sampler: Optional[ResourceSampler] = None, watchdog: Optional[CpuTimeWatchdog] = None):
+        with self.__lock:
+            self.__start_time = start_time
+            self.__sampler = sampler
+            self.__watchdog = watchdog
+            if real_time_limit is not None and start_time is not None and self.__exit_info is None:
+                _deadline = time.monotonic() + max(start_time + real_time_limit - time.time(), 0.0)
+                self.__killer = get_supervisor().call_at(_deadline, self.__server._kill, self.__id)
+            self.__try_complete()
+
+    def _exited(self, status: int, rusage: list, end_time: float, descendants: Optional[list] = None):
+        with self.__lock:
+            if descendants is not None:
+                _count, _utime, _stime, _maxrss = descendants
+                _descendants = DescendantUsage(_count, _utime, _stime, _maxrss * 1024.0)
+            else:
+                _descendants = None
+            self.__exit_info = (status, struct_rusage(rusage), end_time, _descendants)
+            if self.__killer is not None:
+                self.__killer.cancel()
+            self.__try_complete()
+
+    def kill(self):
+        self.__server._kill(self.__id)
+        if self.__cgroup is not None and not self.__complete.is_set():
+            self.__cgroup.kill()
+
+    def __try_complete(self):
+        if self.__exit_info is not None and self.__start_time is not None:
+            _status, _rusage, _end_time, _descendants = self.__exit_info
+            _samples = self.__sampler.stop() if self.__sampler is not None else None
+            _cpu_time_exceeded = self.__watchdog.stop() if self.__watchdog is not None else False
+            _cgroup_usage = self.__cgroup.finish() if self.__cgroup is not None else None
+            self.__result = ProcessResult(_status, self.__start_time, _end_time, _rusage,
+                                          _cgroup_usage, _samples, _cpu_time_exceeded, _descendants)
+            self._run_done_callbacks()
+            self.__complete.set()
+
+    @property
+    def complete(self):
+        return self.__complete
+
+    @property
+    def result(self) -> Optional[ProcessResult]:
+        return self.__result
+
+
+class ForkServer:
+    """
+    Client of the fork server process (see :mod:`pji.control.process.forkserver`).
+    """
+
+    def __init__(self):
+        _request_sock, _server_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        _event_read, _event_write = os.pipe()
+        self.__process = subprocess.Popen(
+            [sys.executable, '-I', '-S', os.path.join(os.path.dirname(__file__), 'forkserver.py'),
+             str(_server_sock.fileno()), str(_event_write)],
+            pass_fds=(_server_sock.fileno(), _event_write),
+            stdin=subprocess.DEVNULL, close_fds=True,
+        )
+        _server_sock.close()
+        os.close(_event_write)
+
+        self.__request_sock = _request_sock
+        self.__request_lock = Lock()
+        self.__ids = itertools.count()
+        self.__watches = {}
+        self.__watches_lock = Lock()
+        self.__closed = False
+
+        self.__event_buffer = bytearray()
+        get_supervisor().add_reader(_event_read, self.__on_event_data, self.__on_event_close)
+
+    @property
+    def pid(self) -> int:
+        return self.__process.pid
+
+    def __on_event_data(self, data: bytes):
+        self.__event_buffer.extend(data)
+        for _frame in load_frames(self.__event_buffer):
+            with self.__watches_lock:
+                _watch = self.__watches.get(_frame['id'])
+                if _frame['type'] == 'failed' or _frame['type'] == 'exited':
+                    self.__watches.pop(_frame['id'], None)
+
+            if _watch is not None:
+                if _frame['type'] == 'spawned':
+                    _watch._spawned(_frame['pid'], None)
+                elif _frame['type'] == 'failed':
+                    _watch._spawned(None, _frame['error'])
+                elif _frame['type'] == 'exited':
+                    _watch._exited(_frame['status'], _frame['rusage'], _frame['end_time'],
+                                   _frame.get('descendants', None))
+
+    def __on_event_close(self):
+        with self.__watches_lock:
+            self.__closed = True
+            _watches, self.__watches = self.__watches, {}
+        for _watch in _watches.values():
+            _watch._spawned(None, 'Fork server exited unexpectedly.')
+
+    def _kill(self, id_: int):
+        with self.__request_lock:
+            send_frame(self.__request_sock, {'type': 'kill', 'id': id_})
+
+    def launch(self, args, environ: Mapping[str, str], cwd: str,
+               resources: ResourceLimit, identification: Identification, stdio: _StdioPlumbing,
+               cgroup: Optional[Cgroup] = None, sample_interval: Optional[float] = None,
+               placement: Optional[Placement] = None, executable: Optional[str] = None,
+               groups: Optional[List[int]] = None) -> LaunchedChild:
+        """
+        launch a child process by fork server
+        :param args: arguments for execution
+        :param environ: environment variables
+        :param cwd: work dir
+        :param resources: resource limit
+        :param identification: user and group for execution
+        :param stdio: stdio of child process
+        :param cgroup: cgroup to be joined by child (none means not used)
+        :param sample_interval: interval of resource sampling (none means not sampled)
+        :param placement: cpu affinity and priorities of child (none means not changed)
+        :param executable: resolved path of executable (default is resolved from ``PATH``)
+        :param groups: supplementary group ids of user (none means not changed)
+        :return: launched child
+        """
+        placement = placement or Placement()
+        args = args_split(args)
+        arg_file = executable or where.first(args[0])
+        _id = next(self.__ids)
+        _watch = ForkServerChildWatch(self, _id, cgroup)
+        with self.__watches_lock:
+            _closed = self.__closed
+            if arg_file and not _closed:
+                self.__watches[_id] = _watch
+
+        if not arg_file or _closed:
+            stdio.close_child_fds()
+            stdio.close_parent_fds()
+            if not arg_file:
+                raise EnvironmentError('Executable {exec} not found.'.format(exec=args[0]))
+            else:
+                raise ExecutorException(OSError('Fork server exited unexpectedly.'))
+
+        report_read, report_write = os.pipe()
+        try:
+            with self.__request_lock:
+                send_frame(self.__request_sock, {
+                    'type': 'spawn', 'id': _id,
+                    'executable': arg_file, 'args': list(args), 'environ': dict(environ), 'cwd': cwd,
+                    'rlimits': [(_type, _value) for _type, _value in resources.rlimits
+                                if cgroup is None or _type not in cgroup.replaced_rlimits],
+                    'cgroup': cgroup.path if cgroup is not None else None,
+                    'cpus': sorted(placement.cpus) if placement.cpus is not None else None,
+                    'nice': placement.nice,
+                    'ioprio': placement.ioprio,
+                    'uid': identification.user.uid if identification.user else None,
+                    'gid': identification.group.gid if identification.group else None,
+                    'groups': groups,
+                }, [*stdio.child_fds, report_write])
+        finally:
+            stdio.close_child_fds()
+            os.close(report_write)
+
+        try:
+            _pid = _watch._wait_spawned()
+            _frames = read_frames(report_read)
+        except BaseException:
+            stdio.close_parent_fds()
+            raise
+        finally:
+            os.close(report_read)
+
+        _start_time = None
+        for _frame in _frames:
+            if 'error' in _frame:
+                stdio.close_parent_fds()
+                _watch._started(None, None)
+                if _frame['errno'] is not None:
+                    raise ExecutorException(OSError(_frame['errno'], _frame['message']))
+                else:
+                    raise ExecutorException(RuntimeError('{type}: {message}'.format(
+                        type=_frame['error'], message=_frame['message'])))
+            else:
+                _start_time = _frame['start_time']
+
+        _sampler = _create_sampler(_pid, _start_time, resources, cgroup, sample_interval)
+        _watchdog = _create_watchdog(_pid, resources, cgroup)
+        _watch._started(_start_time, resources.max_real_time, _sampler, _watchdog)
+        if _sampler is not None:
+            _sampler.start(on_exceed=_watch.kill)
+        if _watchdog is not None:
+            _watchdog.start(on_exceed=_watch.kill)
+        return LaunchedChild(_pid, _start_time, _watch, *stdio.parent_fds, sampler=_sampler)
+
+
+_FORKSERVER = None
+_FORKSERVER_LOCK = Lock()
+
+
+def get_forkserver() -> ForkServer:
+    """
+    get the fork server shared by this process, it will be started when first used
+    :return: fork server client
+    """
+    global _FORKSERVER
+    with _FORKSERVER_LOCK:
+        if _FORKSERVER is None:
+            _FORKSERVER = ForkServer()
+        return _FORKSERVER
+
+
+def _reset_forkserver_after_fork():
+    global _FORKSERVER, _FORKSERVER_LOCK
+    _FORKSERVER = None
+    _FORKSERVER_LOCK = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_forkserver_after_fork)
+
+
+def launch_child(args, environ: Mapping[str, str], preexec_fn, resources: ResourceLimit,
+                 cwd: str, identification: Identification, launcher: Optional[str] = None,
+                 stdin_fd: Optional[int] = None, stdout_fd: Optional[int] = None,
+                 stderr_fd: Optional[int] = None, cgroup: Optional[Cgroup] = None,
+                 sample_interval: Optional[float] = None, placement: Optional[Placement] = None,
+                 core_lease: Optional[CoreLease] = None, executable: Optional[str] = None,
+                 groups: Optional[List[int]] = None) -> LaunchedChild:
+    """
+    launch a child process
+    :param args: arguments for execution
+    :param environ: environment variables
+    :param preexec_fn: pre execute function (only used by fork launcher)
+    :param resources: resource limit
+    :param cwd: work dir
+    :param identification: user and group for execution
+    :param launcher: launcher type, ``fork`` or ``forkserver`` (default is environment variable ``PJI_LAUNCHER``, \
+        or ``fork`` when not set)
+    :param stdin_fd: fd to be dup2'd into child as stdin (none means a pipe will be created)
+    :param stdout_fd: fd to be dup2'd into child as stdout (none means a pipe will be created)
+    :param stderr_fd: fd to be dup2'd into child as stderr (none means a pipe will be created)
+    :param cgroup: cgroup of child process, joined by ``preexec_fn`` in fork launcher and by child of \
+        fork server in forkserver launcher (none means not used)
+    :param sample_interval: interval of resource sampling, the process group will be killed as soon as \
+        sampled rss exceeds ``max_memory`` (unit: s, none means not sampled)
+    :param placement: cpu affinity and priorities of child, applied by ``preexec_fn`` in fork launcher \
+        and by child of fork server in forkserver launcher (none means not changed)
+    :param core_lease: exclusive cores of child, which will be released after child exited (none means not used)
+    :param executable: resolved path of executable (default is resolved from ``PATH``)
+    :param groups: supplementary group ids of user, applied by ``preexec_fn`` in fork launcher \
+        and by child of fork server in forkserver launcher (none means not changed)
+    :return: launched child
+    """
+    launcher = launcher or os.environ.get(ENV_PJI_LAUNCHER, None) or LAUNCHER_FORK
+    if launcher == LAUNCHER_FORK:
+        set_child_subreaper()  # orphaned descendants will be reaped and accounted after child exited
+        _launch = lambda _stdio: _fork_launch(
+            args, environ, preexec_fn, resources, _stdio, cgroup, sample_interval, executable)
+    elif launcher == LAUNCHER_FORKSERVER:
+        if getattr(preexec_fn, 'custom_preexec', preexec_fn is not None):
+            raise ValueError('Custom preexec_fn is not supported by {launcher} launcher.'.format(
+                launcher=repr(LAUNCHER_FORKSERVER)))
+        _launch = lambda _stdio: get_forkserver().launch(
+            args, environ, cwd, resources, identification, _stdio, cgroup, sample_interval, placement,
+            executable, groups)
+    else:
+        raise ValueError('Unknown launcher - {actual}.'.format(actual=repr(launcher)))
+
+    if sample_interval is not None and sample_interval <= 0:
+        raise ValueError('Sample interval should be positive, but {actual} found.'.format(
+            actual=repr(sample_interval)))
+
+    _child = _launch(_StdioPlumbing(stdin_fd, stdout_fd, stderr_fd))
+    if core_lease is not None:
+        _child.watch.add_done_callback(core_lease.release)
+    return _child
@@ -0,0 +1,199 @@
+import fcntl
+import os
+import tempfile
+import time
+from threading import Lock, Condition
+from typing import Optional, Iterable, FrozenSet, List, Tuple
+
+ENV_PJI_CORE_LOCK_DIR = 'PJI_CORE_LOCK_DIR'
+
+_RETRY_INTERVAL = 0.02
+
+
+def get_core_lock_dir() -> str:
+    """
+    get the directory of core lock files, which is shared by all the judge processes on this host
+    :return: environment variable ``PJI_CORE_LOCK_DIR``, or ``pji-cores`` in temp directory when not set
+    """
+    return os.environ.get(ENV_PJI_CORE_LOCK_DIR, None) or os.path.join(tempfile.gettempdir(), 'pji-cores')
+
+
+class CoreLease:
+    """
+    Cores allocated exclusively for one run, they should be released when the run is completed.
+    """
+
+    def __init__(self, allocator: 'CoreAllocator', locks: List[Tuple[int, int]]):
+        """
+        :param allocator: allocator of the cores
+        :param locks: list of (cpu id, fd of locked file)
+        """
+        self.__allocator = allocator
+        self.__locks = locks
+        self.__cpus = frozenset(_cpu for _cpu, _ in locks)
+        self.__lock = Lock()
+        self.__released = False
+
+    @property
+    def cpus(self) -> FrozenSet[int]:
+        return self.__cpus
+
+    @property
+    def released(self) -> bool:
+        with self.__lock:
+            return self.__released
+
+    def release(self):
+        """
+        release the cores, nothing will happen when already released
+        """
+        with self.__lock:
+            if self.__released:
+                return
+            self.__released = True
+
+        self.__allocator._release(self.__locks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def __repr__(self):
+        return '<{cls} cpus: {cpus}>'.format(
+            cls=type(self).__name__, cpus=','.join(map(str, sorted(self.__cpus))))
+
+
+class CoreAllocator:
+    """
+    Host-level allocator of cpu cores, each core is guarded by a ``flock`` on ``cpu<id>.lock`` in lock directory,
+    so the concurrent runs in all the judge processes on this host get disjoint cores.
+    The locks of a crashed judge process are released by kernel.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None, cpus: Optional[Iterable[int]] = None):
+        """
+        :param lock_dir: directory of lock files (default is :func:`get_core_lock_dir`)
+        :param cpus: cpu ids to be allocated (default is the cpus which this process can run on)
+        """
+        self.__lock_dir = lock_dir or get_core_lock_dir()
+        self.__cpus = tuple(sorted(cpus if cpus is not None else os.sched_getaffinity(0)))
+        self.__condition = Condition()
+
+        os.makedirs(self.__lock_dir, exist_ok=True)
+        try:
+            os.chmod(self.__lock_dir, 0o1777)  # shared by the judges of all the users
+        except PermissionError:  # pragma: no cover
+            pass
+
+    @property
+    def lock_dir(self) -> str:
+        return self.__lock_dir
+
+    @property
+    def cpus(self) -> Tuple[int, ...]:
+        return self.__cpus
+
+    def __try_lock(self, cpu: int) -> Optional[int]:
+        _fd = os.open(os.path.join(self.__lock_dir, 'cpu{id}.lock'.format(id=cpu)),
+                      os.O_RDONLY | os.O_CREAT | os.O_CLOEXEC, 0o666)
+        try:
+            fcntl.flock(_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(_fd)
+            return None
+        except BaseException:  # pragma: no cover
+            os.close(_fd)
+            raise
+        else:
+            return _fd
+
+    def try_acquire(self, count: int = 1, candidates: Optional[Iterable[int]] = None) -> Optional[CoreLease]:
+        """
+        try to allocate cores without blocking
+        :param count: count of cores
+        :param candidates: cpu ids to be chosen from (default is all the cpus of this allocator)
+        :return: lease of cores, none when not enough cores are free now
+        """
+        _candidates = self.__candidates(count, candidates)
+        _locks = []
+        try:
+            for _cpu in _candidates:
+                _fd = self.__try_lock(_cpu)
+                if _fd is not None:
+                    _locks.append((_cpu, _fd))
+                    if len(_locks) >= count:
+                        return CoreLease(self, _locks)
+        except BaseException:  # pragma: no cover
+            self.__unlock(_locks)
+            raise
+
+        self.__unlock(_locks)
+        return None
+
+    def acquire(self, count: int = 1, candidates: Optional[Iterable[int]] = None,
+                timeout: Optional[float] = None) -> CoreLease:
+        """
+        allocate cores, blocked until enough cores are free
+        :param count: count of cores
+        :param candidates: cpu ids to be chosen from (default is all the cpus of this allocator)
+        :param timeout: max time to wait (unit: s, none means forever)
+        :return: lease of cores
+        """
+        self.__candidates(count, candidates)
+        _deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            _lease = self.try_acquire(count, candidates)
+            if _lease is not None:
+                return _lease
+
+            _wait = _RETRY_INTERVAL
+            if _deadline is not None:
+                _wait = min(_wait, _deadline - time.monotonic())
+                if _wait <= 0:
+                    raise TimeoutError('No {count} free cores within {timeout}s.'.format(
+                        count=count, timeout=timeout))
+            with self.__condition:  # woken up by releases in this process, and retried for other processes
+                self.__condition.wait(_wait)
+
+    def __candidates(self, count: int, candidates: Optional[Iterable[int]]) -> List[int]:
+        if candidates is not None:
+            _candidates = sorted(set(candidates) & set(self.__cpus))
+        else:
+            _candidates = list(self.__cpus)
+
+        if count < 1 or count > len(_candidates):
+            raise ValueError('Count of cores should be within [1, {max}], but {actual} found.'.format(
+                max=len(_candidates), actual=repr(count)))
+        return _candidates
+
+    @classmethod
+    def __unlock(cls, locks: List[Tuple[int, int]]):
+        for _, _fd in locks:
+            os.close(_fd)  # flock is released when its last fd is closed
+
+    def _release(self, locks: List[Tuple[int, int]]):
+        self.__unlock(locks)
+        with self.__condition:
+            self.__condition.notify_all()
+
+    def __repr__(self):
+        return '<{cls} {dir} cpus: {cpus}>'.format(
+            cls=type(self).__name__, dir=repr(self.__lock_dir), cpus=','.join(map(str, self.__cpus)))
+
+
+_CORE_ALLOCATOR = None
+_CORE_ALLOCATOR_LOCK = Lock()
+
+
+def get_core_allocator() -> CoreAllocator:
+    """
+    get the core allocator shared by this process, it will be created when first used
+    :return: core allocator
+    """
+    global _CORE_ALLOCATOR
+    with _CORE_ALLOCATOR_LOCK:
+        if _CORE_ALLOCATOR is None:
+            _CORE_ALLOCATOR = CoreAllocator()
+        return _CORE_ALLOCATOR
@@ -0,0 +1,184 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Mapping, List, Tuple
+
+import where
+
+from .shell import shell_args, _shell_fast_path_enabled
+from ..model import ResourceLimit, Identification
+
+_IDENTITY_FILES = ('/etc/passwd', '/etc/group')
+_MAX_PLANS = 256
+
+
+def _identity_stamp() -> Tuple[Optional[int], ...]:
+    _stamps = []
+    for _file in _IDENTITY_FILES:
+        try:
+            _stamps.append(os.stat(_file).st_mtime_ns)
+        except OSError:
+            _stamps.append(None)
+    return tuple(_stamps)
+
+
+def _plan_stamp():
+    # everything outside the key of plan, which may change the result of compilation
+    return os.environ.get('PATH', None), os.getcwd(), _identity_stamp(), _shell_fast_path_enabled()
+
+
+class SpawnPlan:
+    """
+    Compiled spawn plan of a command, with the resolved executable, argv, identity and rlimits,
+    so the same command can be launched again and again without resolving them from scratch.
+    """
+
+    def __init__(self, args: List[str], executable: Optional[str], identification: Identification,
+                 resources: ResourceLimit, groups: Optional[List[int]] = None, stamp=None):
+        """
+        :param args: list args to be executed (argv)
+        :param executable: resolved path of executable (none means not found)
+        :param identification: user and group for execution
+        :param resources: resource limits
+        :param groups: supplementary group ids of user (none means not changed)
+        :param stamp: state of environment when compiled, the plan is invalid when it is changed
+        """
+        self.__args = args
+        self.__executable = executable
+        self.__identification = identification
+        self.__resources = resources
+        self.__groups = groups
+        self.__stamp = stamp
+
+    @property
+    def args(self) -> List[str]:
+        return list(self.__args)
+
+    @property
+    def executable(self) -> Optional[str]:
+        return self.__executable
+
+    @property
+    def identification(self) -> Identification:
+        return self.__identification
+
+    @property
+    def resources(self) -> ResourceLimit:
+        return self.__resources
+
+    @property
+    def uid(self) -> Optional[int]:
+        return self.__identification.user.uid if self.__identification.user else None
+
+    @property
+    def gid(self) -> Optional[int]:
+        return self.__identification.group.gid if self.__identification.group else None
+
+    @property
+    def groups(self) -> Optional[List[int]]:
+        return list(self.__groups) if self.__groups is not None else None
+
+    @property
+    def rlimits(self) -> List[Tuple[int, int]]:
+        return self.__resources.rlimits
+
+    def valid(self, stamp=None) -> bool:
+        """
+        check whether this plan can still be used
+        :param stamp: current state of environment (default is the state now)
+        :return: valid or not
+        """
+        if self.__stamp != (stamp if stamp is not None else _plan_stamp()):
+            return False
+        return self.__executable is None or os.access(self.__executable, os.X_OK)
+
+    def __repr__(self):
+        return '<{cls} executable: {exec}, args: {args}>'.format(
+            cls=type(self).__name__, exec=repr(self.__executable), args=repr(self.__args))
+
+
+def compile_spawn_plan(args, shell: bool = False, environ: Optional[Mapping[str, str]] = None,
+                       cwd: Optional[str] = None, identification=None, resources=None) -> SpawnPlan:
+    """
+    compile the spawn plan of command
+    :param args: arguments
+    :param shell: use shell to execute args
+    :param environ: environment variables
+    :param cwd: work directory (default is current directory)
+    :param identification: user and group for execution
+    :param resources: resource limits
+    :return: spawn plan
+    """
+    _stamp = _plan_stamp()
+    _args = shell_args(args, shell, environ, cwd)
+    _executable = where.first(_args[0]) if _args else None
+    _identification = Identification.loads(identification)
+    _resources = ResourceLimit.loads(resources)
+    _resources.rlimits  # noqa, calculated once and cached in resource limit object
+
+    if _identification.user is not None:
+        _gid = _identification.group.gid if _identification.group else _identification.user.gid
+        _groups = os.getgrouplist(_identification.user.name, _gid)
+    else:
+        _groups = None
+
+    return SpawnPlan(_args, _executable, _identification, _resources, _groups, _stamp)
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return frozenset((_key, _hashable(_value)) for _key, _value in value.items())
+    elif isinstance(value, list):
+        return tuple(_hashable(_item) for _item in value)
+    else:
+        return value
+
+
+_PLANS = OrderedDict()
+_PLANS_LOCK = Lock()
+
+
+def get_spawn_plan(args, shell: bool = False, environ: Optional[Mapping[str, str]] = None,
+                   cwd: Optional[str] = None, identification=None, resources=None) -> SpawnPlan:
+    """
+    get the spawn plan of command, which is cached by command, environment variables, work directory, \
+        identification and resource limits, and compiled again when ``PATH``, current directory or \
+        the mtime of ``/etc/passwd`` or ``/etc/group`` is changed
+    :param args: arguments
+    :param shell: use shell to execute args
+    :param environ: environment variables
+    :param cwd: work directory (default is current directory)
+    :param identification: user and group for execution
+    :param resources: resource limits
+    :return: spawn plan
+    """
+    _key = (_hashable(args), bool(shell), frozenset((environ or {}).items()), cwd,
+            _hashable(identification), _hashable(resources))
+    try:
+        hash(_key)
+    except TypeError:  # not cacheable
+        return compile_spawn_plan(args, shell, environ, cwd, identification, resources)
+
+    _stamp = _plan_stamp()
+    with _PLANS_LOCK:
+        _plan = _PLANS.get(_key, None)
+        if _plan is not None:
+            _PLANS.move_to_end(_key)
+    if _plan is not None and _plan.valid(_stamp):
+        return _plan
+
+    _plan = compile_spawn_plan(args, shell, environ, cwd, identification, resources)
+    if _plan.executable is not None:  # executable may be created later
+        with _PLANS_LOCK:
+            _PLANS[_key] = _plan
+            while len(_PLANS) > _MAX_PLANS:
+                _PLANS.popitem(last=False)
+    return _plan
+
+
+def clear_spawn_plans():
+    """
+    clear the cached spawn plans
+    """
+    with _PLANS_LOCK:
+        _PLANS.clear()
@@ -0,0 +1,247 @@
+import os
+import signal
+import time
+from abc import ABCMeta, abstractmethod
+from threading import Event, Lock
+from typing import Optional, Callable, List
+
+from .base import measure_thread, killer_thread
+from .cgroup import Cgroup
+from .sampler import ResourceSampler
+from .supervisor import get_supervisor
+from .tree import TreeCleaner
+from .watchdog import CpuTimeWatchdog
+from ..model import ProcessResult
+
+
+class ChildWatch(metaclass=ABCMeta):
+    """
+    Watch a child process until it exits, kill it when real time limit exceeded, then measure its result.
+    """
+
+    def __init__(self):
+        self.__callbacks_lock = Lock()
+        self.__callbacks = []  # type: List[Callable[[], None]]
+        self.__done = False
+
+    def _run_done_callbacks(self):
+        """
+        run the done callbacks, should be called by subclass once the result is measured and before complete is set
+        """
+        with self.__callbacks_lock:
+            self.__done = True
+            _callbacks, self.__callbacks = self.__callbacks, []
+        for _callback in _callbacks:
+            _callback()
+
+    def add_done_callback(self, callback: Callable[[], None]):
+        """
+        add callback which will be called once the result is measured (before ``join`` returns), \
+            it will be called immediately when already measured
+        :param callback: callback function
+        """
+        with self.__callbacks_lock:
+            if not self.__done:
+                self.__callbacks.append(callback)
+                return
+        callback()
+
+    @property
+    @abstractmethod
+    def complete(self):
+        """
+        :return: event which will be set when the result is measured
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    @property
+    @abstractmethod
+    def result(self) -> Optional[ProcessResult]:
+        """
+        :return: process result (none when not completed)
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    @abstractmethod
+    def kill(self):
+        """
+        kill the process group of child, nothing will happen when child is already reaped
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def join(self):
+        """
+        wait until the child is reaped and measured
+        """
+        self.complete.wait()
+
+
+class PidfdChildWatch(ChildWatch):
+    """
+    Child watch based on pidfd, exit notification and deadline kill are both served by the io supervisor,
+    so no thread is needed and the child is killed exactly at its deadline.
+    """
+
+    def __init__(self, pidfd: int, child_pid: int, start_time: float, real_time_limit: Optional[float],
+                 cgroup: Optional[Cgroup] = None, sampler: Optional[ResourceSampler] = None,
+                 watchdog: Optional[CpuTimeWatchdog] = None):
+        """
+        :param pidfd: pidfd of child process
+        :param child_pid: pid of child process
+        :param start_time: start time of child process
+        :param real_time_limit: real time limit (none means no limit)
+        :param cgroup: cgroup of child process (none means not used)
+        :param sampler: resource sampler of child process (none means not used)
+        :param watchdog: cpu time watchdog of child process (none means not used)
+        """
+        ChildWatch.__init__(self)
+        self.__pidfd = pidfd
+        self.__child_pid = child_pid
+        self.__cgroup = cgroup
+        self.__sampler = sampler
+        self.__watchdog = watchdog
+        self.__start_time = start_time
+        self.__exited = False
+        self.__complete = Event()
+        self.__result = None
+
+        _supervisor = get_supervisor()
+        if real_time_limit is not None:
+            _deadline = time.monotonic() + max(start_time + real_time_limit - time.time(), 0.0)
+            self.__killer = _supervisor.call_at(_deadline, self.__kill)
+        else:
+            self.__killer = None
+        _supervisor.add_waiter(self.__pidfd, self.__on_exit)
+
+    def __kill(self):
+        # the child is only reaped in the loop thread, so its pid and process group can not be reused here
+        if self.__exited:
+            return
+        try:
+            signal.pidfd_send_signal(self.__pidfd, signal.SIGKILL)
+            os.killpg(os.getpgid(self.__child_pid), signal.SIGKILL)
+        except ProcessLookupError:  # pragma: no cover
+            pass
+        if self.__cgroup is not None:
+            self.__cgroup.kill()
+
+    def __on_exit(self):
+        # pidfd is readable, so the child has exited and wait4 will not block
+        _, status, resource_usage = os.wait4(self.__child_pid, 0)
+        _end_time = time.time()
+        self.__exited = True
+        if self.__killer is not None:
+            self.__killer.cancel()
+        os.close(self.__pidfd)
+
+        _samples = self.__sampler.stop() if self.__sampler is not None else None
+        _cpu_time_exceeded = self.__watchdog.stop() if self.__watchdog is not None else False
+
+        def _on_cleaned(descendants):
+            _cgroup_usage = self.__cgroup.finish() if self.__cgroup is not None else None
+            self.__result = ProcessResult(status, self.__start_time, _end_time, resource_usage,
+                                          _cgroup_usage, _samples, _cpu_time_exceeded, descendants)
+            self._run_done_callbacks()
+            self.__complete.set()
+
+        # the rest of process tree is killed, and the orphans are reaped without blocking the loop
+        TreeCleaner(self.__child_pid, self.__cgroup).run_later(_on_cleaned)
+
+    def kill(self):
+        get_supervisor().call_soon(self.__kill)
+
+    @property
+    def complete(self):
+        return self.__complete
+
+    @property
+    def result(self) -> Optional[ProcessResult]:
+        return self.__result
+
+
+class ThreadChildWatch(ChildWatch):
+    """
+    Child watch based on measure thread (blocked in wait4) and killer thread (polling real time).
+    Used when pidfd is not supported.
+    """
+
+    def __init__(self, child_pid: int, start_time: float, real_time_limit: Optional[float],
+                 cgroup: Optional[Cgroup] = None, sampler: Optional[ResourceSampler] = None,
+                 watchdog: Optional[CpuTimeWatchdog] = None):
+        """
+        :param child_pid: pid of child process
+        :param start_time: start time of child process
+        :param real_time_limit: real time limit (none means no limit)
+        :param cgroup: cgroup of child process (none means not used)
+        :param sampler: resource sampler of child process (none means not used)
+        :param watchdog: cpu time watchdog of child process (none means not used)
+        """
+        ChildWatch.__init__(self)
+        self.__child_pid = child_pid
+        self.__cgroup = cgroup
+        self.__measure_thread, _measure_initialized, self.__process_complete, self.__measure_complete, \
+        self.__result_proxy = measure_thread(start_time=start_time, child_pid=child_pid,
+                                             cgroup=cgroup, sampler=sampler, watchdog=watchdog,
+                                             on_complete=self._run_done_callbacks)
+        self.__killer_thread, _killer_initialized = killer_thread(
+            start_time=start_time,
+            child_pid=child_pid,
+            real_time_limit=real_time_limit,
+            process_complete=self.__process_complete,
+        )
+
+        self.__measure_thread.start()
+        self.__killer_thread.start()
+        _measure_initialized.wait()
+        _killer_initialized.wait()
+
+    def kill(self):
+        if not self.__process_complete.is_set():
+            try:
+                os.killpg(os.getpgid(self.__child_pid), signal.SIGKILL)
+            except ProcessLookupError:  # pragma: no cover
+                pass
+            if self.__cgroup is not None:
+                self.__cgroup.kill()
+
+    @property
+    def complete(self):
+        return self.__measure_complete
+
+    @property
+    def result(self) -> Optional[ProcessResult]:
+        return self.__result_proxy.value
+
+    def join(self):
+        self.__measure_thread.join()
+        self.__killer_thread.join()
+
+
+def _pidfd_open(pid: int) -> Optional[int]:
+    if hasattr(os, 'pidfd_open') and hasattr(signal, 'pidfd_send_signal'):
+        try:
+            return os.pidfd_open(pid)
+        except OSError:  # ENOSYS on kernels before 5.3, or fd exhausted
+            return None
+    else:
+        return None  # pragma: no cover
+
+
+def watch_child(child_pid: int, start_time: float, real_time_limit: Optional[float],
+                cgroup: Optional[Cgroup] = None, sampler: Optional[ResourceSampler] = None,
+                watchdog: Optional[CpuTimeWatchdog] = None) -> ChildWatch:
+    """
+    watch the child process, pidfd will be used when supported, otherwise fall back to threads
+    :param child_pid: pid of child process
+    :param start_time: start time of child process
+    :param real_time_limit: real time limit (none means no limit)
+    :param cgroup: cgroup of child process, which will be measured and removed after exit (none means not used)
+    :param sampler: resource sampler of child process, which will be stopped after exit (none means not used)
+    :param watchdog: cpu time watchdog of child process, which will be stopped after exit (none means not used)
+    :return: child watch object
+    """
+    _pidfd = _pidfd_open(child_pid)
+    if _pidfd is not None:
+        return PidfdChildWatch(_pidfd, child_pid, start_time, real_time_limit, cgroup, sampler, watchdog)
+    else:
+        return ThreadChildWatch(child_pid, start_time, real_time_limit, cgroup, sampler, watchdog)
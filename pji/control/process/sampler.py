@@ -0,0 +1,230 @@
+import os
+import time
+from threading import Lock
+from typing import Optional, List, Callable, Iterable, Tuple
+
+from .cgroup import Cgroup
+from .supervisor import get_supervisor
+from ..model import ResourceSample
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except (FileNotFoundError, ProcessLookupError, PermissionError):  # process is gone or not accessible
+        return None
+
+
+def _read_stat(pid: int) -> Optional[Tuple[int, float]]:
+    """
+    :return: process group, cpu time (user and system)
+    """
+    _content = _read_file('/proc/{pid}/stat'.format(pid=pid))
+    if _content is None:
+        return None
+
+    # comm may contain spaces and brackets, so split after the last bracket
+    _fields = _content[_content.rindex(')') + 2:].split()
+    return int(_fields[2]), (int(_fields[11]) + int(_fields[12])) / _CLOCK_TICKS
+
+
+def _read_kb_field(content: Optional[str], name: str) -> Optional[int]:
+    if content is not None:
+        for _line in content.splitlines():
+            if _line.startswith(name):
+                return int(_line.split()[1]) * 1024
+    return None
+
+
+def _descendants(pid: int) -> List[int]:
+    _result, _queue = [], [pid]
+    while _queue:
+        _pid = _queue.pop()
+        _result.append(_pid)
+        try:
+            _tids = os.listdir('/proc/{pid}/task'.format(pid=_pid))
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+        for _tid in _tids:
+            _children = _read_file('/proc/{pid}/task/{tid}/children'.format(pid=_pid, tid=_tid))
+            if _children:
+                _queue.extend(int(_child) for _child in _children.split())
+    return _result
+
+
+def _group_members(pgid: int) -> List[int]:
+    _result = []
+    for _name in os.listdir('/proc'):
+        if _name.isdigit():
+            _stat = _read_stat(int(_name))
+            if _stat is not None and _stat[0] == pgid:
+                _result.append(int(_name))
+    return _result
+
+
+_CHILDREN_SUPPORTED = os.path.exists('/proc/self/task/{pid}/children'.format(pid=os.getpid()))
+
+_PIPE_READ_WCHANS = ('pipe_read', 'pipe_wait', 'anon_pipe_read')  # differs between kernel versions
+_CHILD_WAIT_WCHANS = ('do_wait',)  # e.g. shell waiting for its child
+
+
+def _read_state(pid: int) -> Optional[Tuple[str, str]]:
+    """
+    :return: state and wait channel of process (none means gone or not accessible)
+    """
+    _content = _read_file('/proc/{pid}/stat'.format(pid=pid))
+    _wchan = _read_file('/proc/{pid}/wchan'.format(pid=pid))
+    if _content is None or _wchan is None:
+        return None
+    return _content[_content.rindex(')') + 2:].split()[0], _wchan.strip()
+
+
+def waiting_for_input(child_pid: int) -> bool:
+    """
+    check whether the process group of child is waiting for input, which means all the processes are sleeping, \
+        and at least one of them is blocked on reading pipe while the others are waiting for their children
+    :param child_pid: pid of child process (also the process group id)
+    :return: waiting for input or not, false when wait channel is not available
+    """
+    _reading = False
+    for _pid in (_descendants(child_pid) if _CHILDREN_SUPPORTED else _group_members(child_pid)):
+        _state = _read_state(_pid)
+        if _state is None:
+            return False
+
+        _status, _wchan = _state
+        if _status in ('Z', 'X'):  # exited but not reaped yet
+            continue
+        elif _status != 'S':
+            return False
+        elif _wchan in _PIPE_READ_WCHANS:
+            _reading = True
+        elif _wchan not in _CHILD_WAIT_WCHANS:
+            return False
+
+    return _reading
+
+
+class ResourceSampler:
+    """
+    Sampler of the resource usage of process group, based on ``/proc``, served by io supervisor.
+    The process group will be killed as soon as the sampled rss exceeds the memory limit.
+    """
+
+    def __init__(self, child_pid: int, start_time: float, interval: float,
+                 max_memory: Optional[float] = None, cgroup: Optional[Cgroup] = None):
+        """
+        :param child_pid: pid of child process (also the process group id)
+        :param start_time: start time of child process
+        :param interval: interval of sampling (unit: s)
+        :param max_memory: memory limit of the process group (unit: B, none means no limit)
+        :param cgroup: cgroup of child process, its members will be sampled when given
+        """
+        if interval <= 0:
+            raise ValueError('Sample interval should be positive, but {actual} found.'.format(actual=repr(interval)))
+
+        self.__child_pid = child_pid
+        self.__start_time = start_time
+        self.__interval = interval
+        self.__max_memory = max_memory
+        self.__cgroup = cgroup
+
+        self.__lock = Lock()
+        self.__samples = []  # type: List[ResourceSample]
+        self.__latest = None  # type: Optional[ResourceSample]
+        self.__memory_exceeded = False
+        self.__on_exceed = None  # type: Optional[Callable[[], None]]
+        self.__timer = None
+        self.__stopped = False
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def latest(self) -> Optional[ResourceSample]:
+        """
+        :return: latest sample, no lock is taken (none means not sampled yet)
+        """
+        return self.__latest
+
+    @property
+    def memory_exceeded(self) -> bool:
+        """
+        :return: whether the process group is killed because of memory limit
+        """
+        return self.__memory_exceeded
+
+    def __members(self) -> Iterable[int]:
+        if self.__cgroup is not None:
+            _procs = _read_file(os.path.join(self.__cgroup.path, 'cgroup.procs'))
+            return [int(_pid) for _pid in _procs.split()] if _procs else []
+        elif _CHILDREN_SUPPORTED:
+            return _descendants(self.__child_pid)
+        else:  # pragma: no cover
+            return _group_members(self.__child_pid)
+
+    def sample(self) -> ResourceSample:
+        """
+        take a sample of the process group now
+        :return: sample object
+        """
+        _time = time.time() - self.__start_time
+        _rss, _pss, _cpu_time, _processes = 0, 0, 0.0, 0
+        for _pid in self.__members():
+            _stat = _read_stat(_pid)
+            _status = _read_file('/proc/{pid}/status'.format(pid=_pid))
+            _process_rss = _read_kb_field(_status, 'VmRSS:')
+            if _stat is None or _process_rss is None:  # exited, or zombie which has no memory
+                continue
+
+            _rss += _process_rss
+            _cpu_time += _stat[1]
+            _processes += 1
+            if _pss is not None:
+                _process_pss = _read_kb_field(_read_file('/proc/{pid}/smaps_rollup'.format(pid=_pid)), 'Pss:')
+                _pss = _pss + _process_pss if _process_pss is not None else None
+
+        return ResourceSample(_time, _rss, _pss, _cpu_time, _processes)
+
+    def __tick(self):
+        _sample = self.sample()
+        with self.__lock:
+            if self.__stopped:
+                return
+
+            if _sample.processes:
+                self.__samples.append(_sample)
+                self.__latest = _sample
+            _exceeded = self.__max_memory is not None and _sample.rss > self.__max_memory \
+                and not self.__memory_exceeded
+            if _exceeded:
+                self.__memory_exceeded = True
+            self.__timer = get_supervisor().call_later(self.__interval, self.__tick)
+
+        if _exceeded and self.__on_exceed is not None:
+            self.__on_exceed()
+
+    def start(self, on_exceed: Optional[Callable[[], None]] = None):
+        """
+        start sampling
+        :param on_exceed: callback when memory limit exceeded (e.g. kill the process group)
+        """
+        with self.__lock:
+            self.__on_exceed = on_exceed
+            self.__timer = get_supervisor().call_later(0.0, self.__tick)
+
+    def stop(self) -> List[ResourceSample]:
+        """
+        stop sampling, should be called when child exited
+        :return: all the samples
+        """
+        with self.__lock:
+            self.__stopped = True
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+            return list(self.__samples)
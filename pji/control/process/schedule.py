@@ -0,0 +1,182 @@
+import bisect
+import time
+from threading import Event, Lock
+from typing import List, Tuple, Optional, Callable
+
+from .base import BYTES_LINESEQ
+from .supervisor import get_supervisor
+from ..model import TimingDelivery
+
+_MIN_POLL_INTERVAL = 0.001
+
+
+class StdinSchedule:
+    """
+    Delivery of scheduled lines into stdin of child, driven by the timers of io supervisor (a heap on monotonic clock).
+    The lines due at the same time are written together without blocking, and stdin is closed after the last line.
+
+    In fast-forward mode, the next lines are delivered as soon as the child is quiet (no output and waiting for
+    input), the skipped time is accounted in virtual time, so the lines are still delivered on time in virtual time.
+    """
+
+    def __init__(self, fd: int, start_time: float, lines: List[Tuple[float, bytes]], end: bytes = BYTES_LINESEQ,
+                 fast_forward: Optional[float] = None, quiet_func: Optional[Callable[[float], bool]] = None):
+        """
+        :param fd: file descriptor of stdin, it will be closed by io supervisor
+        :param start_time: start time of child (wall clock)
+        :param lines: list of (relative time, line), sorted by time
+        :param end: end of each line
+        :param fast_forward: quiet time before fast-forward (unit: s, none means not fast-forwarded)
+        :param quiet_func: function to check whether the child has been quiet for the given time, \
+            required in fast-forward mode
+        """
+        if fast_forward is not None and quiet_func is None:
+            raise ValueError('Quiet function is required in fast-forward mode.')
+
+        self.__lines = list(lines)
+        self.__end = end
+        self.__fast_forward = fast_forward
+        self.__quiet_func = quiet_func
+        self.__poll_interval = max(fast_forward / 2, _MIN_POLL_INTERVAL) if fast_forward is not None else None
+
+        self.__lock = Lock()
+        self.__skews = [None] * len(self.__lines)
+        self.__complete = Event()
+        self.__start = start_time + (time.monotonic() - time.time())  # wall clock to monotonic clock
+        self.__offset = 0.0  # virtual time skipped
+        self.__skips = []  # type: List[Tuple[float, float]]
+        self.__last_delivery = self.__start
+        self.__cancelled = False
+
+        self.__groups = []  # type: List[Tuple[float, int, int]]
+        _index = 0
+        while _index < len(self.__lines):
+            _end_index = _index + 1
+            while _end_index < len(self.__lines) and self.__lines[_end_index][0] <= self.__lines[_index][0]:
+                _end_index += 1
+            self.__groups.append((self.__lines[_index][0], _index, _end_index))
+            _index = _end_index
+
+        _supervisor = get_supervisor()
+        self.__writer = _supervisor.add_stream_writer(fd, self.__complete.set)
+        self.__timer, self.__poller = None, None
+        self.__pending = 0  # index of the next group
+        if self.__groups:
+            with self.__lock:
+                self.__arm()
+        else:
+            self.__writer.close()
+
+    def __arm(self):
+        _supervisor = get_supervisor()
+        _time, _, _ = self.__groups[self.__pending]
+        self.__timer = _supervisor.call_at(self.__start + _time - self.__offset, self.__on_deadline, precise=True)
+        if self.__fast_forward is not None:
+            self.__poller = _supervisor.call_later(self.__poll_interval, self.__poll)
+
+    def __virtual_now(self) -> float:
+        return time.monotonic() - self.__start + self.__offset
+
+    def __written(self, index: int, deadline: float):
+        def _callback():
+            _skew = max(self.__virtual_now() - deadline, 0.0)
+            with self.__lock:
+                self.__skews[index] = _skew
+
+        return _callback
+
+    def __on_deadline(self):
+        with self.__lock:
+            if self.__cancelled:
+                return
+            if self.__poller is not None:
+                self.__poller.cancel()
+        self.__deliver()
+
+    def __poll(self):
+        _now = time.monotonic()
+        _quiet = _now - self.__last_delivery >= self.__fast_forward and self.__quiet_func(self.__fast_forward)
+        with self.__lock:
+            if self.__cancelled:
+                return
+            if not _quiet:
+                self.__poller = get_supervisor().call_later(self.__poll_interval, self.__poll)
+                return
+
+            _time, _, _ = self.__groups[self.__pending]
+            _skip = self.__start + _time - self.__offset - _now
+            if _skip > 0:
+                self.__offset += _skip
+                self.__skips.append((_now - self.__start, self.__offset))
+            self.__timer.cancel()
+        self.__deliver()
+
+    def __deliver(self):
+        # called in loop thread, so written immediately when pipe is not full
+        _time, _start, _end = self.__groups[self.__pending]
+        _items = []
+        for _index in range(_start, _end):
+            _items.append((self.__lines[_index][1], None))
+            _items.append((self.__end, self.__written(_index, _time)))
+        self.__writer.write_many(_items)
+
+        with self.__lock:
+            self.__pending += 1
+            self.__last_delivery = time.monotonic()
+            _last = self.__pending >= len(self.__groups)
+            if not _last and not self.__cancelled:
+                self.__arm()
+        if _last:
+            self.__writer.close()
+
+    @property
+    def complete(self) -> bool:
+        """
+        :return: all the lines are delivered (or dropped) and stdin is closed
+        """
+        return self.__complete.is_set()
+
+    @property
+    def delivery(self) -> TimingDelivery:
+        """
+        :return: delivery of the lines by now
+        """
+        with self.__lock:
+            return TimingDelivery(self.__skews, self.__offset)
+
+    @property
+    def skipped(self) -> float:
+        """
+        :return: virtual time skipped in fast-forward mode by now
+        """
+        with self.__lock:
+            return self.__offset
+
+    def virtual_time(self, time_: float) -> float:
+        """
+        translate the time relative to start time into virtual time
+        :param time_: relative time (wall clock)
+        :return: relative time with the skipped time before it
+        """
+        with self.__lock:
+            _index = bisect.bisect_right(self.__skips, (time_, float('inf')))
+            return time_ + self.__skips[_index - 1][1] if _index > 0 else time_
+
+    def cancel(self):
+        """
+        cancel the undelivered lines and close stdin
+        """
+        with self.__lock:
+            self.__cancelled = True
+            for _handle in (self.__timer, self.__poller):
+                if _handle is not None:
+                    _handle.cancel()
+        self.__writer.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        wait until complete
+        :param timeout: max time to wait (unit: s, none means forever)
+        :return: complete or not
+        """
+        return self.__complete.wait(timeout)
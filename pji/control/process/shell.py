@@ -0,0 +1,123 @@
+import os
+import re
+import shlex
+import shutil
+from typing import Optional, Mapping, List
+
+import where
+
+from ...utils import args_split
+
+ENV_PJI_SHELL_FAST_PATH = 'PJI_SHELL_FAST_PATH'
+
+# unquoted characters which need the shell (pipes, redirects, globbing, subshells, escaping, etc.)
+_SHELL_SPECIAL_CHARS = frozenset('|&;<>()`*?[]{}~!#$\\\n')
+_SHELL_DOUBLE_QUOTED_SPECIAL_CHARS = frozenset('`$\\')
+_SHELL_BUILTINS = frozenset({
+    # keywords
+    '!', '{', '}', '[[', ']]', 'case', 'do', 'done', 'elif', 'else', 'esac', 'fi', 'for', 'function',
+    'if', 'in', 'select', 'then', 'time', 'until', 'while',
+    # builtins, including the ones whose behaviours differ from the executables with the same names
+    '.', ':', '[', 'alias', 'bg', 'break', 'cd', 'command', 'continue', 'declare', 'echo', 'eval', 'exec',
+    'exit', 'export', 'false', 'fc', 'fg', 'getopts', 'hash', 'jobs', 'kill', 'let', 'local', 'printf', 'pwd',
+    'read', 'readonly', 'return', 'set', 'shift', 'source', 'test', 'times', 'trap', 'true', 'type', 'typeset',
+    'ulimit', 'umask', 'unalias', 'unset', 'wait',
+})
+_ENV_REFERENCE = re.compile(r'\$(?:([A-Za-z_][A-Za-z0-9_]*)|\{([A-Za-z_][A-Za-z0-9_]*)\})')
+_SAFE_ENV_VALUE = re.compile(r'^[^\s\'"`\\|&;<>()*?\[\]{}~!#$]+$')
+_ASSIGNMENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*=')
+
+
+def _shell_fast_path_enabled() -> bool:
+    return os.environ.get(ENV_PJI_SHELL_FAST_PATH, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def _needs_shell(command: str) -> bool:
+    _quote = None
+    for _char in command:
+        if _quote is None:
+            if _char in ('"', "'"):
+                _quote = _char
+            elif _char in _SHELL_SPECIAL_CHARS:
+                return True
+        elif _char == _quote:
+            _quote = None
+        elif _quote == '"' and _char in _SHELL_DOUBLE_QUOTED_SPECIAL_CHARS:
+            return True
+
+    return _quote is not None  # unclosed quotation, let shell report it
+
+
+def _is_directly_executable(file: str) -> bool:
+    if not os.path.isfile(file) or not os.access(file, os.X_OK):
+        return False
+
+    try:
+        with open(file, 'rb') as f:
+            _magic = f.read(4)
+    except OSError:
+        return False
+    return _magic == b'\x7fELF' or _magic[:2] == b'#!'  # other files are run by shell itself when exec failed
+
+
+def shell_free_args(command: str, environ: Optional[Mapping[str, str]] = None,
+                    cwd: Optional[str] = None) -> Optional[List[str]]:
+    """
+    split simple command line which can be executed without shell, references of environment variables \
+        (``$NAME`` or ``${NAME}``) are replaced here
+    :param command: command line
+    :param environ: environment variables of the command
+    :param cwd: work directory of the command (default is current directory)
+    :return: list args with the resolved executable, none when shell is needed
+    """
+    environ = environ or {}
+    if "'" in command and _ENV_REFERENCE.search(command):  # not expanded in single quotes
+        return None
+    if _needs_shell(_ENV_REFERENCE.sub('_', command)):
+        return None
+
+    _values = [environ.get(_match.group(1) or _match.group(2), '') for _match in _ENV_REFERENCE.finditer(command)]
+    if not all(_SAFE_ENV_VALUE.match(_value) for _value in _values):  # word splitting, globbing or empty value
+        return None
+
+    _args = shlex.split(_ENV_REFERENCE.sub(lambda m: environ[m.group(1) or m.group(2)], command))
+    if not _args or _args[0] in _SHELL_BUILTINS or _ASSIGNMENT.match(_args[0]):
+        return None
+
+    _name = _args[0]
+    if '/' in _name:
+        _file = os.path.join(cwd or os.getcwd(), _name)
+    else:
+        _file = shutil.which(_name, path=environ.get('PATH', os.defpath))
+    if not _file or not _is_directly_executable(_file):
+        return None
+
+    return [os.path.abspath(_file), *_args[1:]]
+
+
+def shell_args(args, shell: bool = False, environ: Optional[Mapping[str, str]] = None,
+               cwd: Optional[str] = None) -> List[str]:
+    """
+    get the list args to be executed, simple command line is executed directly even in shell mode
+    :param args: arguments
+    :param shell: use shell to execute args
+    :param environ: environment variables of the command
+    :param cwd: work directory of the command (default is current directory)
+    :return: list args
+    """
+    if shell:
+        if not isinstance(args, str):
+            raise ValueError(
+                'When shell is enabled, args should be str but {actual} found.'.format(actual=repr(type(args))))
+
+        _fast_args = shell_free_args(args, environ, cwd) if _shell_fast_path_enabled() else None
+        if _fast_args is not None:
+            return _fast_args
+        elif where.first('sh'):
+            return [where.first('sh'), '-c', args]
+        elif where.first('cmd'):
+            return [where.first('cmd'), '/c', args]
+        else:
+            raise EnvironmentError('Neither shell nor cmd found in this environment.')
+    else:
+        return args_split(args)
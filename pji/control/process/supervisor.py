@@ -0,0 +1,463 @@
+import heapq
+import itertools
+import os
+import selectors
+import sys
+import time
+import traceback
+from collections import deque
+from threading import Thread, Lock, current_thread
+from typing import Callable, Optional, Iterable, Tuple
+
+_READ_CHUNK_SIZE = 1 << 16
+_READ_ROUNDS_PER_EVENT = 16
+_PRECISE_MARGIN = 0.002  # timeout of selector is rounded up to milliseconds
+
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (ValueError, OSError):  # pragma: no cover
+    _IOV_MAX = 1024
+
+
+class TimerHandle:
+    def __init__(self, when: float, callback: Callable[[], None], precise: bool = False):
+        """
+        :param when: target time (monotonic clock)
+        :param callback: callback function
+        :param precise: wake up early and spin until the target time
+        """
+        self.__when = when
+        self.__callback = callback
+        self.__precise = precise
+        self.__cancelled = False
+
+    @property
+    def when(self) -> float:
+        return self.__when
+
+    @property
+    def precise(self) -> bool:
+        return self.__precise
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancelled
+
+    def cancel(self):
+        """
+        cancel this timer, the callback will not be called
+        """
+        self.__cancelled = True
+
+    def _run(self):
+        if not self.__cancelled:
+            self.__callback()
+
+
+class _Reader:
+    def __init__(self, fd: int, on_data: Callable[[bytes], None], on_close: Callable[[], None]):
+        self.fd = fd
+        self.on_data = on_data
+        self.on_close = on_close
+        self.paused = False
+        self.registered = False
+        self.closed = False
+
+
+class ReaderHandle:
+    def __init__(self, supervisor: 'IOSupervisor', reader: _Reader):
+        """
+        :param supervisor: io supervisor which serves the reader
+        :param reader: reader object
+        """
+        self.__supervisor = supervisor
+        self.__reader = reader
+
+    def pause(self):
+        """
+        stop reading from fd (thread-safe), the unread data is kept in pipe
+        """
+        self.__supervisor._set_reader_paused(self.__reader, True)
+
+    def resume(self):
+        """
+        continue reading from fd (thread-safe)
+        """
+        self.__supervisor._set_reader_paused(self.__reader, False)
+
+
+class _Writer:
+    def __init__(self, fd: int, data: bytes, on_close: Callable[[], None]):
+        self.fd = fd
+        self.data = memoryview(data)
+        self.on_close = on_close
+
+
+class _StreamWriter:
+    def __init__(self, fd: int, on_close: Callable[[], None]):
+        self.fd = fd
+        self.on_close = on_close
+        self.buffers = deque()  # list of [data, callback when written]
+        self.registered = False
+        self.closing = False
+        self.closed = False
+
+
+class WriterHandle:
+    def __init__(self, supervisor: 'IOSupervisor', writer: _StreamWriter):
+        """
+        :param supervisor: io supervisor which serves the writer
+        :param writer: writer object
+        """
+        self.__supervisor = supervisor
+        self.__writer = writer
+
+    def write(self, data: bytes, on_written: Optional[Callable[[], None]] = None):
+        """
+        write data into fd without blocking (thread-safe)
+        :param data: data to be written
+        :param on_written: callback when all the data is written, it will not be called when pipe is broken
+        """
+        self.write_many([(data, on_written)])
+
+    def write_many(self, items: Iterable[Tuple[bytes, Optional[Callable[[], None]]]]):
+        """
+        write several buffers into fd together with vectored writes (thread-safe)
+        :param items: tuples of data and the callback when it is written
+        """
+        self.__supervisor._stream_write(self.__writer, [[memoryview(_data), _callback] for _data, _callback in items])
+
+    def close(self):
+        """
+        close fd after all the data is written (thread-safe)
+        """
+        self.__supervisor._stream_close(self.__writer)
+
+
+class _Waiter:
+    def __init__(self, fd: int, callback: Callable[[], None]):
+        self.fd = fd
+        self.callback = callback
+
+
+class IOSupervisor:
+    """
+    Single-threaded selector loop which serves the pipes and timers of all the live children.
+    All the callbacks are executed in the loop thread, so they should never block.
+    """
+
+    def __init__(self):
+        self.__selector = selectors.DefaultSelector()
+        self.__wakeup_read, self.__wakeup_write = os.pipe()
+        os.set_blocking(self.__wakeup_read, False)
+        os.set_blocking(self.__wakeup_write, False)
+        self.__selector.register(self.__wakeup_read, selectors.EVENT_READ, None)
+
+        self.__lock = Lock()
+        self.__pending = deque()
+        self.__timers = []
+        self.__sequence = itertools.count()
+        self.__thread = None
+
+    def __ensure_started(self):
+        if self.__thread is None:
+            self.__thread = Thread(target=self.__loop, name='pji-io-supervisor', daemon=True)
+            self.__thread.start()
+
+    def __wakeup(self):
+        try:
+            os.write(self.__wakeup_write, b'\x00')
+        except BlockingIOError:
+            pass
+
+    def call_soon(self, callback: Callable, *args):
+        """
+        schedule a callback in the loop thread (thread-safe)
+        :param callback: callback function
+        :param args: arguments of callback
+        """
+        with self.__lock:
+            self.__pending.append(lambda: callback(*args))
+            self.__ensure_started()
+        self.__wakeup()
+
+    def call_at(self, when: float, callback: Callable, *args, precise: bool = False) -> TimerHandle:
+        """
+        schedule a callback at the given time (thread-safe)
+        :param when: target time (monotonic clock)
+        :param callback: callback function
+        :param args: arguments of callback
+        :param precise: called with sub-millisecond accuracy, the loop wakes up a little early \
+            and spins until the target time (default is False)
+        :return: timer handle
+        """
+        _handle = TimerHandle(when, lambda: callback(*args), precise)
+        with self.__lock:
+            heapq.heappush(self.__timers, (when, next(self.__sequence), _handle))
+            self.__ensure_started()
+        self.__wakeup()
+        return _handle
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        """
+        schedule a callback after the given delay (thread-safe)
+        :param delay: delay (unit: s)
+        :param callback: callback function
+        :param args: arguments of callback
+        :return: timer handle
+        """
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def add_reader(self, fd: int, on_data: Callable[[bytes], None],
+                   on_close: Optional[Callable[[], None]] = None) -> ReaderHandle:
+        """
+        drain the given fd until eof, fd will be closed by supervisor
+        :param fd: file descriptor to read from
+        :param on_data: callback when chunk received
+        :param on_close: callback when eof reached
+        :return: handle to pause and resume the reader
+        """
+        _reader = _Reader(fd, on_data, on_close or _do_nothing)
+        self.call_soon(self.__register_reader, _reader)
+        return ReaderHandle(self, _reader)
+
+    def add_writer(self, fd: int, data: bytes, on_close: Optional[Callable[[], None]] = None):
+        """
+        write all the data into fd and then close it, broken pipe will be ignored
+        :param fd: file descriptor to write to
+        :param data: data to be written
+        :param on_close: callback when fd closed
+        """
+        self.call_soon(self.__register_writer, _Writer(fd, data, on_close or _do_nothing))
+
+    def add_stream_writer(self, fd: int, on_close: Optional[Callable[[], None]] = None) -> WriterHandle:
+        """
+        keep writing the data given by handle into fd, until it is closed by handle or the pipe is broken, \
+            fd will be closed by supervisor
+        :param fd: file descriptor to write to
+        :param on_close: callback when fd closed
+        :return: handle to write data and close fd
+        """
+        os.set_blocking(fd, False)  # before any data written by loop thread
+        return WriterHandle(self, _StreamWriter(fd, on_close or _do_nothing))
+
+    def __call_in_loop(self, callback: Callable, *args):
+        if current_thread() is self.__thread:
+            callback(*args)  # such as called by timers, run directly to avoid the delay
+        else:
+            self.call_soon(callback, *args)
+
+    def _stream_write(self, writer: _StreamWriter, buffers: list):
+        self.__call_in_loop(self.__stream_write, writer, buffers)
+
+    def _stream_close(self, writer: _StreamWriter):
+        self.__call_in_loop(self.__stream_close, writer)
+
+    def __stream_write(self, writer: _StreamWriter, buffers: list):
+        if writer.closed or writer.closing:
+            return
+        writer.buffers.extend(buffers)
+        if not writer.registered:
+            self.__process_stream_writer(writer)
+
+    def __stream_close(self, writer: _StreamWriter):
+        if writer.closed or writer.closing:
+            return
+        writer.closing = True
+        if not writer.registered:
+            self.__process_stream_writer(writer)
+
+    def __process_stream_writer(self, writer: _StreamWriter):
+        while writer.buffers:
+            try:
+                _size = os.writev(writer.fd, [_data for _data, _ in itertools.islice(writer.buffers, _IOV_MAX)])
+            except BlockingIOError:
+                break
+            except OSError:  # broken pipe, the rest is dropped
+                writer.buffers.clear()
+                writer.closing = True
+                break
+
+            while writer.buffers and _size >= len(writer.buffers[0][0]):
+                _data, _callback = writer.buffers.popleft()
+                _size -= len(_data)
+                if _callback is not None:
+                    _safe_call(_callback)
+            if _size > 0:  # partial write
+                writer.buffers[0][0] = writer.buffers[0][0][_size:]
+
+        if writer.buffers and not writer.registered:
+            self.__selector.register(writer.fd, selectors.EVENT_WRITE, writer)
+            writer.registered = True
+        elif not writer.buffers:
+            if writer.registered:
+                self.__selector.unregister(writer.fd)
+                writer.registered = False
+            if writer.closing:
+                writer.closed = True
+                os.close(writer.fd)
+                _safe_call(writer.on_close)
+
+    def add_waiter(self, fd: int, callback: Callable[[], None]):
+        """
+        call the callback once when fd become readable, fd will not be closed by supervisor
+        :param fd: file descriptor to wait for (such as pidfd)
+        :param callback: callback when fd readable
+        """
+        self.call_soon(self.__selector.register, fd, selectors.EVENT_READ, _Waiter(fd, callback))
+
+    def __register_reader(self, reader: _Reader):
+        os.set_blocking(reader.fd, False)
+        if not reader.paused:
+            self.__selector.register(reader.fd, selectors.EVENT_READ, reader)
+            reader.registered = True
+
+    def _set_reader_paused(self, reader: _Reader, paused: bool):
+        self.call_soon(self.__set_reader_paused, reader, paused)
+
+    def __set_reader_paused(self, reader: _Reader, paused: bool):
+        reader.paused = paused
+        if reader.closed:
+            return
+        if paused and reader.registered:
+            self.__selector.unregister(reader.fd)
+            reader.registered = False
+        elif not paused and not reader.registered:
+            self.__selector.register(reader.fd, selectors.EVENT_READ, reader)
+            reader.registered = True
+
+    def __register_writer(self, writer: _Writer):
+        os.set_blocking(writer.fd, False)
+        if self.__process_writer(writer):
+            self.__close_writer(writer)
+        else:
+            self.__selector.register(writer.fd, selectors.EVENT_WRITE, writer)
+
+    def __close_reader(self, reader: _Reader):
+        self.__selector.unregister(reader.fd)
+        reader.registered, reader.closed = False, True
+        os.close(reader.fd)
+        _safe_call(reader.on_close)
+
+    def __close_writer(self, writer: _Writer):
+        writer.data.release()
+        os.close(writer.fd)
+        _safe_call(writer.on_close)
+
+    def __process_reader(self, reader: _Reader):
+        for _ in range(_READ_ROUNDS_PER_EVENT):
+            try:
+                data = os.read(reader.fd, _READ_CHUNK_SIZE)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b''
+
+            if data:
+                _safe_call(reader.on_data, data)
+            else:
+                self.__close_reader(reader)
+                return
+
+    @classmethod
+    def __process_writer(cls, writer: _Writer) -> bool:
+        while writer.data:
+            try:
+                _size = os.write(writer.fd, writer.data)
+            except BlockingIOError:
+                return False
+            except BrokenPipeError:
+                break
+            else:
+                writer.data = writer.data[_size:]
+
+        return True
+
+    def __timeout(self) -> Optional[float]:
+        with self.__lock:
+            if self.__pending:
+                return 0.0
+            elif self.__timers:
+                _when, _, _handle = self.__timers[0]
+                _margin = _PRECISE_MARGIN if _handle.precise and not _handle.cancelled else 0.0
+                return max(_when - _margin - time.monotonic(), 0.0)
+            else:
+                return None
+
+    def __run_pending(self):
+        while True:
+            with self.__lock:
+                if not self.__pending:
+                    break
+                _callback = self.__pending.popleft()
+            _safe_call(_callback)
+
+    def __run_timers(self):
+        _now = time.monotonic()
+        while True:
+            with self.__lock:
+                if not self.__timers or self.__timers[0][0] > _now:
+                    break
+                _, _, _handle = heapq.heappop(self.__timers)
+            _safe_call(_handle._run)
+
+    def __loop(self):
+        while True:
+            for key, _ in self.__selector.select(self.__timeout()):
+                if key.data is None:
+                    try:
+                        while os.read(self.__wakeup_read, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif isinstance(key.data, _Reader):
+                    self.__process_reader(key.data)
+                elif isinstance(key.data, _Waiter):
+                    self.__selector.unregister(key.fd)
+                    _safe_call(key.data.callback)
+                elif isinstance(key.data, _StreamWriter):
+                    self.__process_stream_writer(key.data)
+                elif isinstance(key.data, _Writer):
+                    if self.__process_writer(key.data):
+                        self.__selector.unregister(key.fd)
+                        self.__close_writer(key.data)
+
+            self.__run_timers()
+            self.__run_pending()
+
+
+def _do_nothing():
+    pass
+
+
+def _safe_call(func, *args):
+    try:
+        func(*args)
+    except Exception:  # pragma: no cover
+        traceback.print_exc(file=sys.stderr)
+
+
+_SUPERVISOR = None
+_SUPERVISOR_LOCK = Lock()
+
+
+def get_supervisor() -> IOSupervisor:
+    """
+    get the io supervisor shared by this process
+    :return: io supervisor object
+    """
+    global _SUPERVISOR
+    with _SUPERVISOR_LOCK:
+        if _SUPERVISOR is None:
+            _SUPERVISOR = IOSupervisor()
+        return _SUPERVISOR
+
+
+def _reset_supervisor_after_fork():
+    global _SUPERVISOR, _SUPERVISOR_LOCK
+    _SUPERVISOR = None
+    _SUPERVISOR_LOCK = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_supervisor_after_fork)
@@ -0,0 +1,168 @@
+import ctypes
+import os
+import signal
+import time
+from threading import Lock
+from typing import Optional, Callable, Dict, Tuple
+
+from .cgroup import Cgroup
+from .sampler import _read_file
+from .supervisor import get_supervisor
+from ..model import DescendantUsage
+
+ENV_PJI_SUBREAPER = 'PJI_SUBREAPER'
+
+_PR_SET_CHILD_SUBREAPER = 36
+_CLEAN_INTERVAL = 0.005
+_CLEAN_TIMEOUT = 1.0
+
+_SUBREAPER = None
+_SUBREAPER_LOCK = Lock()
+
+
+def set_child_subreaper() -> bool:
+    """
+    make this process a child subreaper, so that the orphaned descendants of children will be reparented to it \
+        instead of init, it can be disabled by setting environment variable ``PJI_SUBREAPER`` to ``0``
+    :return: whether this process is a subreaper
+    """
+    global _SUBREAPER
+    with _SUBREAPER_LOCK:
+        if _SUBREAPER is None:
+            if os.environ.get(ENV_PJI_SUBREAPER, '1').strip() in ('0', 'false', 'no'):
+                _SUBREAPER = False
+            else:
+                try:
+                    _libc = ctypes.CDLL(None, use_errno=True)
+                    _SUBREAPER = _libc.prctl(_PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+                except (OSError, AttributeError):  # pragma: no cover
+                    _SUBREAPER = False
+        return _SUBREAPER
+
+
+def _reset_subreaper_after_fork():
+    global _SUBREAPER, _SUBREAPER_LOCK
+    _SUBREAPER = None  # the attribute is not inherited by child process
+    _SUBREAPER_LOCK = Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_subreaper_after_fork)
+
+
+def _read_parent_and_session(pid: int) -> Optional[Tuple[int, int]]:
+    _content = _read_file('/proc/{pid}/stat'.format(pid=pid))
+    if _content is None:
+        return None
+
+    _fields = _content[_content.rindex(')') + 2:].split()
+    return int(_fields[1]), int(_fields[3])
+
+
+def session_members(sid: int) -> Dict[int, int]:
+    """
+    find the processes (including zombies) in the given session
+    :param sid: session id
+    :return: mapping of pid to its parent pid
+    """
+    _result = {}
+    for _name in os.listdir('/proc'):
+        if _name.isdigit():
+            _info = _read_parent_and_session(int(_name))
+            if _info is not None and _info[1] == sid:
+                _result[int(_name)] = _info[0]
+    return _result
+
+
+class TreeCleaner:
+    """
+    Cleaner of the process tree of one child, called after the child exited.
+    The rest of its session (and cgroup when used) is killed, and the descendants reparented to this process
+    (as child subreaper) are reaped and accounted.
+    """
+
+    def __init__(self, child_pid: int, cgroup: Optional[Cgroup] = None, timeout: float = _CLEAN_TIMEOUT):
+        """
+        :param child_pid: pid of child process (also the session id)
+        :param cgroup: cgroup of child process (none means not used)
+        :param timeout: max time to wait for the killed descendants (unit: s)
+        """
+        self.__child_pid = child_pid
+        self.__cgroup = cgroup
+        self.__timeout = timeout
+        self.__deadline = None
+
+        self.__count = 0
+        self.__cpu_time = 0.0
+        self.__system_time = 0.0
+        self.__max_memory = 0.0
+
+    @property
+    def usage(self) -> DescendantUsage:
+        """
+        :return: usage of the descendants reaped by this cleaner
+        """
+        return DescendantUsage(self.__count, self.__cpu_time, self.__system_time, self.__max_memory)
+
+    def __members(self) -> Dict[int, int]:
+        _members = session_members(self.__child_pid)
+        if self.__cgroup is not None:  # descendants which called setsid are still in cgroup
+            for _pid in (_read_file(os.path.join(self.__cgroup.path, 'cgroup.procs')) or '').split():
+                _info = _read_parent_and_session(int(_pid))
+                if _info is not None:
+                    _members[int(_pid)] = _info[0]
+        _members.pop(self.__child_pid, None)
+        return _members
+
+    def step(self) -> bool:
+        """
+        kill the rest of the process tree, and reap the ones which are children of this process
+        :return: whether the cleaning is completed
+        """
+        if self.__deadline is None:
+            self.__deadline = time.monotonic() + self.__timeout
+
+        _members = self.__members()
+        _self_pid = os.getpid()
+        for _pid, _ppid in _members.items():
+            try:
+                os.kill(_pid, signal.SIGKILL)
+            except ProcessLookupError:  # pragma: no cover
+                pass
+
+            if _ppid == _self_pid:
+                try:
+                    _reaped, _, _rusage = os.wait4(_pid, os.WNOHANG)
+                except ChildProcessError:  # pragma: no cover
+                    continue
+                if _reaped:
+                    self.__count += 1
+                    self.__cpu_time += _rusage.ru_utime
+                    self.__system_time += _rusage.ru_stime
+                    self.__max_memory = max(self.__max_memory, _rusage.ru_maxrss * 1024.0)
+
+        return not _members or time.monotonic() >= self.__deadline
+
+    def run(self) -> DescendantUsage:
+        """
+        clean the process tree, blocked until completed
+        :return: usage of the descendants
+        """
+        while not self.step():
+            time.sleep(_CLEAN_INTERVAL)
+        return self.usage
+
+    def run_later(self, callback: Callable[[DescendantUsage], None]):
+        """
+        clean the process tree in io supervisor without blocking it
+        :param callback: callback with usage of the descendants when completed
+        """
+        _supervisor = get_supervisor()
+
+        def _step():
+            if self.step():
+                callback(self.usage)
+            else:
+                _supervisor.call_later(_CLEAN_INTERVAL, _step)
+
+        _step()
@@ -0,0 +1,152 @@
+import os
+import time
+from threading import Lock
+from typing import Optional, Callable
+
+from .cgroup import Cgroup
+from .sampler import _read_file, _descendants, _group_members, _CHILDREN_SUPPORTED
+from .supervisor import get_supervisor
+
+DEFAULT_CPU_TIME_EPSILON = 0.01
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+_CPUCLOCK_SCHED = 2
+
+
+def _process_cpu_clock(pid: int) -> int:
+    # clock id of the process-wide cpu clock, the same as clock_getcpuclockid in glibc
+    return ((~pid) << 3) | _CPUCLOCK_SCHED
+
+
+def _read_cpu_times(pid: int):
+    """
+    :return: cpu time of process itself (user and system), cpu time of its reaped children
+    """
+    _content = _read_file('/proc/{pid}/stat'.format(pid=pid))
+    if _content is None:
+        return None
+
+    _fields = _content[_content.rindex(')') + 2:].split()
+    return (int(_fields[11]) + int(_fields[12])) / _CLOCK_TICKS, \
+           (int(_fields[13]) + int(_fields[14])) / _CLOCK_TICKS
+
+
+def _cpu_count(pid: int) -> int:
+    try:
+        return max(len(os.sched_getaffinity(pid)), 1)
+    except (OSError, AttributeError):  # pragma: no cover
+        return os.cpu_count() or 1
+
+
+class CpuTimeWatchdog:
+    """
+    Watchdog of the cpu time of process group, served by io supervisor.
+    The process group will be killed as soon as its cpu time exceeds the limit, instead of waiting for
+    ``RLIMIT_CPU`` which can only be set in whole seconds.
+    """
+
+    def __init__(self, child_pid: int, cpu_time_limit: float,
+                 epsilon: float = DEFAULT_CPU_TIME_EPSILON, cgroup: Optional[Cgroup] = None):
+        """
+        :param child_pid: pid of child process (also the process group id)
+        :param cpu_time_limit: cpu time limit of the process group (unit: s)
+        :param epsilon: max overshoot of cpu time on each core before killed (unit: s)
+        :param cgroup: cgroup of child process, its cpu usage will be used when given
+        """
+        if epsilon <= 0:
+            raise ValueError('Cpu time epsilon should be positive, but {actual} found.'.format(actual=repr(epsilon)))
+
+        self.__child_pid = child_pid
+        self.__cpu_time_limit = cpu_time_limit
+        self.__epsilon = epsilon
+        self.__cgroup = cgroup
+        self.__cpu_count = _cpu_count(child_pid)
+
+        self.__lock = Lock()
+        self.__exceeded = False
+        self.__on_exceed = None  # type: Optional[Callable[[], None]]
+        self.__timer = None
+        self.__stopped = False
+
+    @property
+    def cpu_time_limit(self) -> float:
+        return self.__cpu_time_limit
+
+    @property
+    def epsilon(self) -> float:
+        return self.__epsilon
+
+    @property
+    def exceeded(self) -> bool:
+        """
+        :return: whether the process group is killed because of cpu time limit
+        """
+        with self.__lock:
+            return self.__exceeded
+
+    def cpu_time(self) -> float:
+        """
+        measure the cpu time (user and system) of the process group now, including its reaped children
+        :return: cpu time (unit: s)
+        """
+        if self.__cgroup is not None:
+            for _line in (_read_file(os.path.join(self.__cgroup.path, 'cpu.stat')) or '').splitlines():
+                if _line.startswith('usage_usec '):
+                    return int(_line.split()[1]) / 1e6
+
+        _members = _descendants(self.__child_pid) if _CHILDREN_SUPPORTED else _group_members(self.__child_pid)
+        _total = 0.0
+        for _pid in _members:
+            _times = _read_cpu_times(_pid)
+            if _times is None:  # already exited
+                continue
+
+            _self_time, _children_time = _times
+            if _pid == self.__child_pid:
+                try:  # nanosecond precision, while /proc is in clock ticks
+                    _self_time = time.clock_gettime(_process_cpu_clock(_pid))
+                except OSError:  # pragma: no cover
+                    pass
+            _total += _self_time + _children_time
+
+        return _total
+
+    def __tick(self):
+        _used = self.cpu_time()
+        with self.__lock:
+            if self.__stopped:
+                return
+
+            _remaining = self.__cpu_time_limit - _used
+            if _remaining < 0:
+                self.__exceeded = True
+                self.__timer = None
+            else:
+                # cpu time can not grow faster than the cores, so nothing will be missed before next tick
+                _delay = max(_remaining, self.__epsilon) / self.__cpu_count
+                self.__timer = get_supervisor().call_later(_delay, self.__tick)
+            _exceeded = self.__exceeded
+
+        if _exceeded and self.__on_exceed is not None:
+            self.__on_exceed()
+
+    def start(self, on_exceed: Optional[Callable[[], None]] = None):
+        """
+        start watching
+        :param on_exceed: callback when cpu time limit exceeded (e.g. kill the process group)
+        """
+        with self.__lock:
+            self.__on_exceed = on_exceed
+            self.__timer = get_supervisor().call_later(0.0, self.__tick)
+
+    def stop(self) -> bool:
+        """
+        stop watching, should be called when child exited
+        :return: whether the cpu time limit is exceeded
+        """
+        with self.__lock:
+            self.__stopped = True
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+            return self.__exceeded
@@ -1,3 +1,5 @@
+from .aio import async_common_run
 from .common import common_run
-from .mutual import mutual_run, MutualStdout, MutualStderr
+from .many import run_many, RUN_MODES
+from .mutual import mutual_run, MutualStdout, MutualStderr, MutualTranscript, MutualInteractor
 from .timing import timing_run, TimingStdin, TimingStdout, TimingStderr
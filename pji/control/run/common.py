@@ -1,13 +1,14 @@
 import io
 
-from .encoding import _try_read_to_bytes, _try_write
+from .encoding import _try_read_to_bytes, _try_write_capture, _try_get_fd
 from ..model import RunResult
 from ..process import common_process
 from ...utils import eclosing
 
 
 def common_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
-               environ=None, cwd=None, resources=None, identification=None) -> RunResult:
+               environ=None, cwd=None, resources=None, identification=None, direct_io: bool = True,
+               resource_backend=None, sample_interval=None, placement=None, checker=None) -> RunResult:
     """
     Create an common process with stream
     :param args: arguments for execution
@@ -19,6 +20,16 @@ def common_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
     :param cwd: new work dir
     :param resources: resource limit
     :param identification: user and group for execution
+    :param direct_io: dup2 the file-backed streams into child directly, \
+        so that their content will not pass through this process (default is True)
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param sample_interval: interval of resource sampling, the process group will be killed as soon as \
+        sampled rss exceeds ``max_memory`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of the process, \
+        see :class:`pji.control.model.Placement`
+    :param checker: output checker of stdout, the process group will be killed at the first mismatch, \
+        see :class:`pji.control.process.OutputChecker` (none means not checked)
     :return: run result of this time
     """
 
@@ -34,15 +45,23 @@ def common_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
     with eclosing(stdin, stdin_need_close) as stdin, \
             eclosing(stdout, stdout_need_close) as stdout, \
             eclosing(stderr, stderr_need_close) as stderr:
+        stdin_fd = _try_get_fd(stdin) if direct_io else None
+        stdout_fd = _try_get_fd(stdout) if direct_io else None
+        stderr_fd = _try_get_fd(stderr) if direct_io else None
+
         with common_process(
                 args=args, shell=shell,
                 environ=environ, cwd=cwd,
                 resources=resources, identification=identification,
+                resource_backend=resource_backend, sample_interval=sample_interval, placement=placement,
+                stdin_fd=stdin_fd, stdout_fd=stdout_fd, stderr_fd=stderr_fd, checker=checker,
         ) as cp:
-            cp.communicate(_try_read_to_bytes(stdin), wait=False)
+            cp.communicate(_try_read_to_bytes(stdin) if stdin_fd is None else None, wait=False)
             cp.join()
 
-            _try_write(stdout, cp.stdout)
-            _try_write(stderr, cp.stderr)
+            if stdout_fd is None:
+                _try_write_capture(stdout, cp.stdout_capture)
+            if stderr_fd is None:
+                _try_write_capture(stderr, cp.stderr_capture)
 
         return cp.result
@@ -1,3 +1,6 @@
+import os
+from typing import Optional
+
 from ...utils import auto_decode_support, auto_encode_support
 
 _auto_encode = auto_encode_support(lambda x: x)
@@ -14,5 +17,38 @@ def _try_write(stream, data):
         return stream.write(_str_data)
 
 
+def _try_write_capture(stream, capture):
+    """
+    write the captured data into stream by chunks, so that spilled data will not be loaded into memory at once
+    :param stream: stream object
+    :param capture: capture buffer
+    """
+    _chunks = capture.chunks()
+    for _chunk in _chunks:
+        try:
+            stream.write(_chunk)
+        except TypeError:  # text stream, whole data is needed for decoding
+            _try_write(stream, capture.to_bytes())
+            break
+
+
 def _try_read_to_bytes(stream):
     return _auto_encode(stream.read())
+
+
+def _try_get_fd(stream) -> Optional[int]:
+    """
+    get the fd of stream when it is backed by a real file, buffered data will be synchronized to fd
+    :param stream: stream object
+    :return: fd (none means in-memory stream)
+    """
+    try:
+        _fd = stream.fileno()
+    except (AttributeError, OSError, ValueError):  # io.UnsupportedOperation for BytesIO and StringIO
+        return None
+
+    if stream.writable():
+        stream.flush()
+    elif stream.seekable():  # buffered reader may have read ahead
+        os.lseek(_fd, stream.tell(), os.SEEK_SET)
+    return _fd
@@ -0,0 +1,119 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterable, Mapping, Iterator, Tuple, Union, Dict
+
+from .aio import async_common_run
+from .mutual import mutual_run
+from .timing import timing_run
+from ..model import RunResult
+
+RUN_MODES = ('common', 'timing', 'mutual')
+
+_BLOCKING_RUNS = {
+    'timing': timing_run,
+    'mutual': mutual_run,
+}
+
+
+def _load_spec(spec: Mapping) -> Tuple[str, Dict]:
+    if not isinstance(spec, Mapping):
+        raise TypeError('Run spec should be a mapping, but {actual} found.'.format(actual=repr(spec)))
+
+    _kwargs = dict(spec)
+    _mode = str(_kwargs.pop('mode', None) or 'common').lower()
+    if _mode not in RUN_MODES:
+        raise ValueError('Run mode should be one of {modes}, but {actual} found.'.format(
+            modes=repr(RUN_MODES), actual=repr(_mode)))
+    if 'args' not in _kwargs:
+        raise ValueError('Args should be provided in run spec, but {actual} found.'.format(actual=repr(spec)))
+
+    if _mode != 'mutual' and isinstance(_kwargs.get('stdin', None), (bytes, bytearray)):
+        _kwargs['stdin'] = io.BytesIO(_kwargs['stdin'])
+    return _mode, _kwargs
+
+
+async def _run_one(spec: Mapping, executor: ThreadPoolExecutor) -> Union[RunResult, Exception]:
+    try:
+        _mode, _kwargs = _load_spec(spec)
+        if _mode == 'common':
+            return await async_common_run(**_kwargs)
+        else:
+            _loop = asyncio.get_running_loop()
+            return await _loop.run_in_executor(executor, partial(_BLOCKING_RUNS[_mode], **_kwargs))
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        return err
+
+
+def run_many(specs: Iterable[Mapping], concurrency: int = 1,
+             ordered: bool = False) -> Iterator[Tuple[int, Union[RunResult, Exception]]]:
+    """
+    Run a batch of commands, with at most ``concurrency`` of them in flight at the same time
+    :param specs: run specs, each of them is a mapping of the arguments of run function \
+        (such as ``args``, ``stdin``, ``resources``, ``identification`` and ``cwd``), \
+        and ``mode`` which should be ``common`` (default), ``timing`` or ``mutual``, \
+        bytes ``stdin`` will be passed as stream in common and timing mode
+    :param concurrency: max count of runs in flight
+    :param ordered: yield in the order of specs (default is False, which means in the order of completion)
+    :return: generator of (index of spec, run result), the exception is yielded instead of run result \
+        when the run is failed, and the other runs will not be affected
+
+    Attention: common runs are driven by one event loop in the calling thread, while the timing and mutual \
+        runs are blocking and each of them occupies a worker thread until completed. \
+        When the generator is closed before exhausted, the common runs in flight are killed, \
+        and the blocking ones are waited until completed.
+    """
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise ValueError('Concurrency should be a positive integer, but {actual} found.'.format(
+            actual=repr(concurrency)))
+
+    return _run_many(specs, concurrency, ordered)
+
+
+def _run_many(specs: Iterable[Mapping], concurrency: int,
+              ordered: bool) -> Iterator[Tuple[int, Union[RunResult, Exception]]]:
+    _loop = asyncio.new_event_loop()
+    # at most one worker is occupied by each run in flight (launching or blocking run)
+    _executor = ThreadPoolExecutor(max_workers=concurrency)
+    _loop.set_default_executor(_executor)
+
+    _specs = enumerate(specs)
+    _exhausted = False
+    _pending = {}
+    _finished = {}
+    _next_index = 0
+
+    try:
+        while True:
+            while not _exhausted and len(_pending) < concurrency:
+                try:
+                    _index, _spec = next(_specs)
+                except StopIteration:
+                    _exhausted = True
+                else:
+                    _pending[_loop.create_task(_run_one(_spec, _executor))] = _index
+            if not _pending:
+                break
+
+            _done, _ = _loop.run_until_complete(
+                asyncio.wait(set(_pending.keys()), return_when=asyncio.FIRST_COMPLETED))
+            for _index, _task in sorted((_pending.pop(_task), _task) for _task in _done):
+                _finished[_index] = _task.result()
+
+            if ordered:
+                while _next_index in _finished:
+                    yield _next_index, _finished.pop(_next_index)
+                    _next_index += 1
+            else:
+                for _index in sorted(_finished.keys()):
+                    yield _index, _finished.pop(_index)
+    finally:
+        for _task in _pending.keys():
+            _task.cancel()
+        if _pending:
+            _loop.run_until_complete(asyncio.gather(*_pending.keys(), return_exceptions=True))
+        _loop.close()
+        _executor.shutdown(wait=True)
@@ -5,11 +5,16 @@ import sys
 import time
 from multiprocessing import Process, Event
 from threading import Thread
-from typing import Callable
+from typing import Callable, Optional, Mapping, Tuple, Union
 
-from .encoding import _auto_encode, _try_write
-from ..model import TimingContent, RunResult
-from ..process import interactive_process
+from hbutils.model import get_repr_info
+
+from .encoding import _auto_encode
+from .writer import TimingWriter
+from ..model import TimingContent, RunResult, ResourceLimit, Identification
+from ..process import interactive_process, InteractiveProcess
+from ..process.base import LineSplitter, CountdownEvent
+from ..process.supervisor import get_supervisor
 from ...utils import eclosing
 
 
@@ -21,9 +26,108 @@ class MutualStderr(TimingContent):
     pass
 
 
+class MutualTranscript(TimingContent):
+    pass
+
+
+_TRANSCRIPT_FROM_PROCESS = b'> '
+_TRANSCRIPT_TO_PROCESS = b'< '
+
+
 _INTERACT_FUNC = Callable[[], None]
 
 
+class MutualInteractor:
+    """
+    External executable which interacts with the process in mutual run, it is launched in sandbox \
+        with its own resource limits, identification and work directory.
+    """
+
+    def __init__(self, args, shell: bool = False, environ: Optional[Mapping[str, str]] = None,
+                 cwd: Optional[str] = None, resources=None, identification=None):
+        """
+        :param args: arguments for execution
+        :param shell: use shell to execute args
+        :param environ: environment variables (none means the same as process)
+        :param cwd: work directory (none means the same as process)
+        :param resources: resource limit
+        :param identification: user and group for execution
+        """
+        self.__args = args
+        self.__shell = shell
+        self.__environ = dict(environ) if environ is not None else None
+        self.__cwd = cwd
+        self.__resources = ResourceLimit.loads(resources)
+        self.__identification = Identification.loads(identification)
+
+    @property
+    def args(self):
+        return self.__args
+
+    @property
+    def shell(self) -> bool:
+        return self.__shell
+
+    @property
+    def environ(self) -> Optional[Mapping[str, str]]:
+        return dict(self.__environ) if self.__environ is not None else None
+
+    @property
+    def cwd(self) -> Optional[str]:
+        return self.__cwd
+
+    @property
+    def resources(self) -> ResourceLimit:
+        return self.__resources
+
+    @property
+    def identification(self) -> Identification:
+        return self.__identification
+
+    def launch(self, stdin_fd: int, stdout_fd: int, stderr_fd: int,
+               environ: Optional[Mapping[str, str]] = None, cwd: Optional[str] = None) -> InteractiveProcess:
+        """
+        launch the interactor with the given pipes
+        :param stdin_fd: fd of stdin
+        :param stdout_fd: fd of stdout
+        :param stderr_fd: fd of stderr
+        :param environ: default environment variables
+        :param cwd: default work directory
+        :return: interactive process of interactor
+        """
+        return interactive_process(
+            args=self.__args, shell=self.__shell,
+            environ=self.__environ if self.__environ is not None else environ,
+            cwd=self.__cwd or cwd,
+            resources=self.__resources, identification=self.__identification,
+            stdin_fd=stdin_fd, stdout_fd=stdout_fd, stderr_fd=stderr_fd,
+        )
+
+    @classmethod
+    def loads(cls, data) -> 'MutualInteractor':
+        """
+        load interactor from data
+        :param data: raw data
+        :return: interactor object
+        """
+        if isinstance(data, cls):
+            return data
+        elif isinstance(data, dict):
+            return cls(**data)
+        else:
+            raise TypeError('Json or {type} expected but {actual} found.'.format(
+                type=cls.__name__, actual=repr(type(data).__name__)))
+
+    def __repr__(self):
+        return get_repr_info(
+            cls=self.__class__,
+            args=[
+                ('args', lambda: repr(self.__args)),
+                ('cwd', lambda: repr(self.__cwd), lambda: self.__cwd is not None),
+            ]
+        )
+
+
 def _load_func_from_str(source: str) -> _INTERACT_FUNC:
     _split = source.split(':')
     if len(_split) == 2:
@@ -38,33 +142,60 @@ def _load_func_from_str(source: str) -> _INTERACT_FUNC:
         raise ValueError('Invalid mutual function - {func}.'.format(func=repr(source)))
 
 
-def _load_func(func) -> _INTERACT_FUNC:
+def _load_func(func) -> Union[_INTERACT_FUNC, MutualInteractor]:
     if func is None:
         return lambda: None
+    elif isinstance(func, (MutualInteractor, dict)):
+        return MutualInteractor.loads(func)
     elif hasattr(func, '__call__'):
         return func
     elif isinstance(func, str):
         return _load_func_from_str(func)
     else:
-        raise TypeError('Callable or str source expected but {actual} found.'.format(actual=repr(type(func).__name__)))
+        raise TypeError('Callable, str source or interactor expected but {actual} found.'.format(
+            actual=repr(type(func).__name__)))
 
 
 def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
-               environ=None, cwd=None, resources=None, identification=None) -> RunResult:
+               environ=None, cwd=None, resources=None, identification=None,
+               resource_backend=None, sample_interval=None, placement=None,
+               direct: bool = False, transcript=None) -> RunResult:
     """
     Create an mutual process with stream
     :param args: arguments for execution
     :param shell: use shell to execute args
-    :param stdin: stdin interaction function (none means nothing)
+    :param stdin: stdin interaction function, or external interactor (:class:`MutualInteractor` or its json, \
+        which is always wired directly) (none means nothing)
     :param stdout: stdout stream (none means nothing)
     :param stderr: stderr stream (none means nothing)
     :param environ: environment variables
     :param cwd: new work dir
     :param resources: resource limit
     :param identification: user and group for execution
-    :return: run result of this time
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param sample_interval: interval of resource sampling, the process group will be killed as soon as \
+        sampled rss exceeds ``max_memory`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of the process, \
+        see :class:`pji.control.model.Placement`
+    :param direct: wire the stdout of process to the stdin of interaction and vice versa directly, \
+        instead of relaying each line by threads in this process (default is False)
+    :param transcript: transcript stream of the interaction (none means nothing), \
+        the lines from process are marked with ``>`` and the lines to process are marked with ``<``
+    :return: run result of this time, with the run result of external interactor as ``interaction``
     """
     stdin = _load_func(stdin)
+    if direct or isinstance(stdin, MutualInteractor):
+        return _direct_mutual_run(
+            stdin, stdout, stderr, transcript,
+            args=args, shell=shell,
+            environ=environ, cwd=cwd,
+            resources=resources, identification=identification,
+            resource_backend=resource_backend, sample_interval=sample_interval, placement=placement,
+        )
+
+    transcript_need_close = not transcript
+    transcript = transcript or io.BytesIO()
 
     stdout_need_close = not stdout
     stdout = stdout or io.BytesIO()
@@ -73,7 +204,8 @@ def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
     stderr = stderr or io.BytesIO()
 
     with eclosing(stdout, stdout_need_close) as stdout, \
-            eclosing(stderr, stderr_need_close) as stderr:
+            eclosing(stderr, stderr_need_close) as stderr, \
+            eclosing(transcript, transcript_need_close) as transcript:
         mutual_stdout_get, mutual_stdout_put = os.pipe()
         mutual_stdin_get, mutual_stdin_put = os.pipe()
         mutual_stderr_get, mutual_stderr_put = os.pipe()
@@ -105,6 +237,7 @@ def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
                 args=args, shell=shell,
                 environ=environ, cwd=cwd,
                 resources=resources, identification=identification,
+                resource_backend=resource_backend, sample_interval=sample_interval, placement=placement,
         ) as ip:
             _mutual_process.start()
             os.close(mutual_stdin_get)
@@ -112,16 +245,17 @@ def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
             os.close(mutual_stderr_put)
             _mutual_initialize_ok.wait()
 
-            _stdout_list = []
-            _stderr_list = []
-
             with os.fdopen(mutual_stdin_put, 'wb', 0) as f_mutual_stdin, \
                     os.fdopen(mutual_stdout_get, 'rb', 0) as f_mutual_stdout, \
-                    os.fdopen(mutual_stderr_get, 'rb', 0) as f_mutual_stderr:
+                    os.fdopen(mutual_stderr_get, 'rb', 0) as f_mutual_stderr, \
+                    TimingWriter(None if stdout_need_close else stdout) as _stdout_writer, \
+                    TimingWriter(None if stderr_need_close else stderr) as _stderr_writer, \
+                    TimingWriter(None if transcript_need_close else transcript) as _transcript_writer:
                 def _load_output_from_ip():
                     _mutual_close_stdin = False
                     for _time, _tag, _line in ip.output_yield:
                         if _tag == 'stdout':
+                            _transcript_writer.write(_time, _TRANSCRIPT_FROM_PROCESS + _line)
                             if not _mutual_close_stdin:
                                 _mutual_initialize_ok.wait()
                                 try:
@@ -130,13 +264,15 @@ def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
                                 except BrokenPipeError:
                                     _mutual_close_stdin = True
                         elif _tag == 'stderr':
-                            _stderr_list.append((time.time() - ip.start_time, _line))
+                            _stderr_writer.write(time.time() - ip.start_time, _line)
 
                     f_mutual_stdin.close()
 
                 def _load_stdout_from_mutual():
                     _mutual_initialize_ok.wait()
                     for _line in f_mutual_stdout:
+                        _transcript_writer.write(time.time() - ip.start_time,
+                                                 _TRANSCRIPT_TO_PROCESS + _line.rstrip(b'\r\n'))
                         try:
                             ip.print_stdin(_line.rstrip(b'\r\n'))
                         except BrokenPipeError:
@@ -146,7 +282,7 @@ def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
                 def _load_stderr_from_mutual():
                     _mutual_initialize_ok.wait()
                     for _line in f_mutual_stderr:
-                        _stdout_list.append((time.time() - ip.start_time, _line.rstrip(b'\r\n')))
+                        _stdout_writer.write(time.time() - ip.start_time, _line)
 
                 _threads = [Thread(target=_func) for _func in
                             [_load_output_from_ip, _load_stdout_from_mutual, _load_stderr_from_mutual]]
@@ -157,7 +293,168 @@ def mutual_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
                 for _item in _threads:
                     _item.join()
 
-            _try_write(stdout, MutualStdout(_stdout_list).dumps())
-            _try_write(stderr, MutualStderr(_stderr_list).dumps())
-
             return ip.result
+
+
+_TEE_BUFFER_SIZE = 1 << 20
+
+
+def _start_interaction(func: _INTERACT_FUNC, stdin_fd: int, stdout_fd: int, stderr_fd: int, close_fds) -> Process:
+    # noinspection DuplicatedCode
+    def _launch_mutual():
+        for _fd in close_fds:
+            os.close(_fd)  # especially the ends of process, or eof will never be received
+
+        # sys.stdin is replaced with devnull by multiprocessing, so its fd is used
+        os.dup2(stdin_fd, sys.stdin.fileno())
+        sys.stdout = sys.__stdout__
+        os.dup2(stdout_fd, sys.stdout.fileno())
+        sys.stderr = sys.__stderr__
+        os.dup2(stderr_fd, sys.stderr.fileno())
+        for _fd in (stdin_fd, stdout_fd, stderr_fd):
+            os.close(_fd)
+
+        func()
+
+    _process = Process(target=_launch_mutual)
+    _process.start()
+    return _process
+
+
+def _line_recorder(start_time: float, prefix: bytes, writer: TimingWriter) -> LineSplitter:
+    def _record(_time: float, _line: bytes):
+        writer.write(_time - start_time, prefix + _line)
+
+    return LineSplitter(_record)
+
+
+def _add_line_reader(fd: int, start_time: float, prefix: bytes, writer: TimingWriter, complete: CountdownEvent):
+    _splitter = _line_recorder(start_time, prefix, writer)
+
+    def _on_close():
+        _splitter.close()
+        complete.count_down()
+
+    get_supervisor().add_reader(fd, _splitter.feed, _on_close)
+
+
+def _add_tee(read_fd: int, write_fd: int, start_time: float, prefix: bytes,
+             writer: TimingWriter, complete: CountdownEvent):
+    # relay the data in io supervisor without re-encoding, all the callbacks are called in loop thread
+    # the reader is paused when too much data is not written yet
+    _supervisor = get_supervisor()
+    _splitter = _line_recorder(start_time, prefix, writer)
+    _pending, _paused = 0, False
+
+    def _resume():
+        nonlocal _paused
+        if _paused:
+            _paused = False
+            _reader.resume()
+
+    def _on_written(size: int):
+        def _callback():
+            nonlocal _pending
+            _pending -= size
+            if _pending <= _TEE_BUFFER_SIZE // 2:
+                _resume()
+
+        return _callback
+
+    def _on_data(data: bytes):
+        nonlocal _pending, _paused
+        _splitter.feed(data)
+        _pending += len(data)
+        _writer.write(data, _on_written(len(data)))
+        if _pending > _TEE_BUFFER_SIZE and not _paused:
+            _paused = True
+            _reader.pause()
+
+    def _on_close():
+        _splitter.close()
+        _writer.close()
+        complete.count_down()
+
+    _writer = _supervisor.add_stream_writer(write_fd, _resume)  # the rest is dropped when pipe is broken
+    _reader = _supervisor.add_reader(read_fd, _on_data, _on_close)
+
+
+def _join_interaction(interaction) -> Optional[RunResult]:
+    if isinstance(interaction, InteractiveProcess):
+        with interaction:
+            pass
+        return interaction.result
+    else:
+        interaction.join()
+        return None
+
+
+def _direct_mutual_run(interaction, stdout, stderr, transcript, **kwargs) -> RunResult:
+    _own_fds = set()  # the fds which should be closed by this function
+
+    def _pipe() -> Tuple[int, int]:
+        _read, _write = os.pipe()
+        _own_fds.update((_read, _write))
+        return _read, _write
+
+    def _close(*fds):
+        for _fd in fds:
+            if _fd in _own_fds:
+                _own_fds.remove(_fd)
+                os.close(_fd)
+
+    with TimingWriter(stdout) as stdout_writer, TimingWriter(stderr) as stderr_writer, \
+            TimingWriter(transcript) as transcript_writer:
+        try:
+            process_stdin, to_process = _pipe()
+            from_process, process_stdout = _pipe()
+            mutual_stderr_get, mutual_stderr_put = _pipe()
+            if transcript is None:  # the process and interaction are wired directly
+                mutual_stdin, mutual_stdout = from_process, to_process
+            else:  # data is relayed and recorded by io supervisor
+                mutual_stdin, tee_mutual_stdin = _pipe()
+                tee_mutual_stdout, mutual_stdout = _pipe()
+
+            ip = interactive_process(stdin_fd=process_stdin, stdout_fd=process_stdout, **kwargs)
+            _close(process_stdin, process_stdout)
+        except BaseException:
+            _close(*_own_fds)
+            raise
+
+        with ip:
+            try:
+                if isinstance(interaction, MutualInteractor):
+                    _mutual = interaction.launch(
+                        stdin_fd=mutual_stdin, stdout_fd=mutual_stdout, stderr_fd=mutual_stderr_put,
+                        environ=kwargs['environ'], cwd=kwargs['cwd'],
+                    )
+                else:
+                    _mutual_fds = {mutual_stdin, mutual_stdout, mutual_stderr_put}
+                    _mutual = _start_interaction(
+                        interaction, mutual_stdin, mutual_stdout, mutual_stderr_put,
+                        close_fds=[_fd for _fd in _own_fds if _fd not in _mutual_fds],
+                    )
+                _close(mutual_stdin, mutual_stdout, mutual_stderr_put)
+            except BaseException:
+                _close(*_own_fds)  # so that eof is received by process
+                raise
+
+            # the rest fds are closed by io supervisor
+            _complete = CountdownEvent(3 if transcript is not None else 1)
+            _add_line_reader(mutual_stderr_get, ip.start_time, b'', stdout_writer, _complete)
+            if transcript is not None:
+                _add_tee(from_process, tee_mutual_stdin, ip.start_time,
+                         _TRANSCRIPT_FROM_PROCESS, transcript_writer, _complete)
+                _add_tee(tee_mutual_stdout, to_process, ip.start_time,
+                         _TRANSCRIPT_TO_PROCESS, transcript_writer, _complete)
+            _own_fds.clear()
+
+            for _time, _tag, _line in ip.output_yield:
+                stderr_writer.write(_time, _line)
+
+            ip.join()
+            _mutual_result = _join_interaction(_mutual)
+            _complete.wait()
+
+        _result = ip.result
+        return RunResult(_result.limit, _result.result, _result.output_size, interaction=_mutual_result)
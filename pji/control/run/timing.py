@@ -1,9 +1,11 @@
 import io
 import random
-import time
 from itertools import chain
 
-from .encoding import _try_write, _try_read_to_bytes
+from hbutils.scale import time_to_duration
+
+from .encoding import _try_read_to_bytes
+from .writer import TimingWriter
 from ..model import RunResult
 from ..model import TimingContent as _AbstractTimingContent
 from ..process import interactive_process
@@ -45,7 +47,9 @@ class TimingStderr(_AbstractTimingContent):
 
 
 def timing_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
-               environ=None, cwd=None, resources=None, identification=None, shuffle=False) -> RunResult:
+               environ=None, cwd=None, resources=None, identification=None, shuffle=False,
+               resource_backend=None, sample_interval=None, placement=None, fast_forward=None,
+               checker=None) -> RunResult:
     """
     Create an timing process with stream
     :param args: arguments for execution
@@ -58,8 +62,27 @@ def timing_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
     :param resources: resource limit
     :param identification: user and group for execution
     :param shuffle: Shuffle the inputs with similar timestamp.
-    :return: run result of this time
+    :param resource_backend: resource backend, ``rlimit`` or ``cgroup`` \
+        (default from environment variable ``PJI_RESOURCE_BACKEND``)
+    :param sample_interval: interval of resource sampling, the process group will be killed as soon as \
+        sampled rss exceeds ``max_memory`` (unit: s, none means not sampled)
+    :param placement: cpu affinity, exclusive cores, nice and ionice of the process, \
+        see :class:`pji.control.model.Placement`
+    :param fast_forward: quiet time of fast-forward mode, the next stdin lines are delivered once there is \
+        no output for this time and the process is blocked on reading stdin, instead of waiting until their time, \
+        the skipped time is accounted virtually in the time of output lines (unit: s, such as ``'0.01s'``, \
+        none means the lines are delivered in real time)
+    :param checker: output checker of stdout, the process group will be killed at the first mismatch, \
+        see :class:`pji.control.process.OutputChecker` (none means not checked)
+    :return: run result of this time, with the delivery skew of stdin lines
     """
+    if fast_forward is not None:
+        _fast_forward = time_to_duration(fast_forward)
+        if _fast_forward is None or _fast_forward <= 0:
+            raise ValueError('Fast-forward quiet time should be a positive duration, but {actual} found.'.format(
+                actual=repr(fast_forward)))
+        fast_forward = _fast_forward
+
     stdin_need_close = not stdin
     stdin = stdin or io.BytesIO()
 
@@ -80,30 +103,26 @@ def timing_run(args, shell: bool = False, stdin=None, stdout=None, stderr=None,
                 args=args, shell=shell,
                 environ=environ, cwd=cwd,
                 resources=resources, identification=identification,
+                resource_backend=resource_backend, sample_interval=sample_interval, placement=placement,
+                checker=checker,
         ) as ip:
-            for _time, _line in _stdin.lines:
-                _target_time = ip.start_time + _time
-                while time.time() < _target_time and not ip.completed:
-                    time.sleep(max(min(0.2, _target_time - time.time()), 0.0))
-
-                try:
-                    ip.print_stdin(_line)
-                except BrokenPipeError:
-                    break
-
-            ip.close_stdin()
-
-            _stdout, _stderr = [], []
-            for _time, _tag, _line in ip.output_yield:
-                if _tag == 'stdout':
-                    _stdout.append((_time, _line))
-                elif _tag == 'stderr':
-                    _stderr.append((_time, _line))
-                else:
-                    raise ValueError('Unknown output type - {type}.'.format(type=repr(_time)))  # pragma: no cover
-
-            ip.join()
-            _try_write(stdout, TimingStdout.loads(_stdout).dumps())
-            _try_write(stderr, TimingStderr.loads(_stderr).dumps())
-
-            return ip.result
+            # stdin is delivered by io supervisor, while the output is drained here at the same time
+            _schedule = ip.schedule_stdin(_stdin.lines, fast_forward=fast_forward)
+            with TimingWriter(None if stdout_need_close else stdout) as _stdout, \
+                    TimingWriter(None if stderr_need_close else stderr) as _stderr:
+                for _time, _tag, _line in ip.output_yield:
+                    if fast_forward is not None:
+                        _time = _schedule.virtual_time(_time)
+                    if _tag == 'stdout':
+                        _stdout.write(_time, _line)
+                    elif _tag == 'stderr':
+                        _stderr.write(_time, _line)
+                    else:
+                        raise ValueError('Unknown output type - {type}.'.format(type=repr(_time)))  # pragma: no cover
+
+                ip.join()
+                _schedule.cancel()
+
+            _result = ip.result
+            return RunResult(_result.limit, _result.result, _result.output_size, _schedule.delivery,
+                             mismatch=_result.mismatch)
@@ -0,0 +1,149 @@
+import heapq
+import struct
+from collections import deque
+from threading import Lock
+from typing import List, Tuple, Iterator
+
+from .encoding import _auto_encode
+from ..model.timing import _dump_int_length, _dump_line
+from ..process import CaptureBuffer
+
+_RECORD_HEADER = struct.Struct('<dI')  # time and length of line
+_REORDER_WINDOW = 256
+_SPILL_THRESHOLD = 1 << 20
+_COPY_CHUNK = 1 << 16
+DEFAULT_TAIL_LINES = 64
+
+
+class TimingWriter:
+    """
+    Incremental writer of timing content (such as stdout, stderr and transcript), the lines are recorded
+    as soon as they arrive, and the spill buffer keeps the memory bounded. When closed, the content is written
+    into the target stream by chunks, which is exactly the same as ``TimingContent(lines).dumps()``.
+    """
+
+    def __init__(self, stream, tail: int = DEFAULT_TAIL_LINES, spill_threshold=_SPILL_THRESHOLD):
+        """
+        :param stream: target stream (none means the lines are dropped)
+        :param tail: count of the last lines kept in memory
+        :param spill_threshold: max size of in-memory records, the rest will be spilled to anonymous file
+        """
+        self.__stream = stream
+        self.__lock = Lock()
+        self.__buffer = CaptureBuffer(spill_threshold) if stream is not None else None
+        self.__pending = []  # lines within reorder window, for the lines recorded by several threads
+        self.__tail = deque(maxlen=tail)
+        self.__seq = 0
+        self.__count = 0
+        self.__end_time = None
+        self.__closed = False
+
+    def __record(self, time_: float, line: bytes):
+        if self.__buffer is not None:
+            self.__buffer.write(_RECORD_HEADER.pack(time_, len(line)) + line)
+        self.__tail.append((time_, line))
+        self.__end_time = time_ if self.__end_time is None else max(self.__end_time, time_)
+
+    def write(self, time_: float, line: bytes):
+        """
+        record a line (thread-safe), the lines are sorted by time in a small window, \
+            and the lines after closed are dropped
+        :param time_: relative time of line
+        :param line: line content
+        """
+        _line = _auto_encode(line).rstrip(b'\r\n')
+        with self.__lock:
+            if self.__closed:
+                return
+
+            heapq.heappush(self.__pending, (float(time_), self.__seq, _line))
+            self.__seq += 1
+            self.__count += 1
+            if len(self.__pending) > _REORDER_WINDOW:
+                _time, _, _line = heapq.heappop(self.__pending)
+                self.__record(_time, _line)
+
+    @property
+    def count(self) -> int:
+        """
+        :return: count of the recorded lines
+        """
+        with self.__lock:
+            return self.__count
+
+    @property
+    def tail(self) -> List[Tuple[float, bytes]]:
+        """
+        :return: the last lines (sorted by time)
+        """
+        with self.__lock:
+            _lines = list(self.__tail) + [(_time, _line) for _time, _, _line in sorted(self.__pending)]
+            return _lines[-self.__tail.maxlen:] if self.__tail.maxlen else []
+
+    def __records(self) -> Iterator[Tuple[float, bytes]]:
+        with self.__buffer.to_file() as f:
+            while True:
+                _header = f.read(_RECORD_HEADER.size)
+                if not _header:
+                    break
+                _time, _length = _RECORD_HEADER.unpack(_header)
+                yield _time, f.read(_length)
+
+    def __write_stream(self, content: str):
+        try:
+            self.__stream.write(_auto_encode(content))
+        except TypeError:
+            self.__stream.write(content)
+
+    def __dump(self):
+        _int_length = _dump_int_length(self.__end_time)
+        _chunk, _size = [], 0
+        for _time, _line in self.__records():
+            _item = _dump_line(_time, _line, _int_length)
+            _chunk.append(_item)
+            _size += len(_item)
+            if _size >= _COPY_CHUNK:
+                self.__write_stream(''.join(_chunk))
+                _chunk, _size = [], 0
+
+        if _chunk:
+            self.__write_stream(''.join(_chunk))
+
+    def __release(self):
+        self.__closed = True
+        self.__pending = []
+        if self.__buffer is not None:
+            self.__buffer.close()
+
+    def close(self):
+        """
+        write all the lines into target stream and release the buffer
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+
+            while self.__pending:
+                _time, _, _line = heapq.heappop(self.__pending)
+                self.__record(_time, _line)
+            try:
+                if self.__buffer is not None and self.__end_time is not None:
+                    self.__dump()
+            finally:
+                self.__release()
+
+    def discard(self):
+        """
+        release the buffer without writing anything into target stream
+        """
+        with self.__lock:
+            self.__release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
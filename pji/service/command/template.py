@@ -7,6 +7,7 @@ from .base import _ICommandBase, CommandMode
 from .command import Command
 from ..base import _check_workdir_position, _process_environ
 from ...control.model import ResourceLimit, Identification
+from ...control.run import MutualInteractor
 
 
 class CommandTemplate(_ICommandBase):
@@ -18,11 +19,13 @@ class CommandTemplate(_ICommandBase):
                  mode=None, stdin=None, stdout=None, stderr=None, **kwargs):
         """
         :param args: arguments
-        :param shell: use shell mode
+        :param shell: use shell mode, simple command lines without shell syntax will be executed directly \
+            (see :func:`pji.control.process.decorator.shell_free_args`)
         :param workdir: work directory
         :param resources: resource limits
         :param mode: command mode value
-        :param stdin: stdin file
+        :param stdin: stdin file, or external interactor in mutual mode (dict of ``args``, ``shell``, ``workdir``, \
+            ``resources`` and ``identification``, its workdir is relative to the command's)
         :param stdout: stdout file
         :param stderr: stderr file
         """
@@ -102,6 +105,20 @@ class CommandTemplate(_ICommandBase):
         """
         return hash(self.__tuple())
 
+    @classmethod
+    def __interactor(cls, data: dict, identification: Identification, workdir: str, environ) -> MutualInteractor:
+        _args = data['args']
+        _workdir = data.get('workdir', None) or cls.__DEFAULT_WORKDIR
+        return MutualInteractor(
+            args=env_template(_args, environ) if isinstance(_args, str) else
+            [env_template(_arg, environ) for _arg in _args],
+            shell=data.get('shell', True),
+            environ=environ,
+            cwd=os.path.normpath(os.path.join(workdir, _check_workdir_position(env_template(_workdir, environ)))),
+            resources=ResourceLimit.loads(data.get('resources', None) or {}),
+            identification=Identification.loads(data.get('identification', None) or identification),
+        )
+
     def __call__(self, identification=None, resources=None, workdir=None, environ=None, **kwargs) -> Command:
         """
         get command object from template
@@ -116,8 +133,12 @@ class CommandTemplate(_ICommandBase):
         _resources = ResourceLimit.merge(ResourceLimit.loads(resources or {}), self.__resources)
         _workdir = os.path.normpath(
             os.path.join(workdir or '.', _check_workdir_position(env_template(self.__workdir, environ))))
-        _stdin = os.path.normpath(os.path.join(_workdir, env_template(self.__stdin, environ))) \
-            if isinstance(self.__stdin, str) else self.__stdin
+        if isinstance(self.__stdin, str):
+            _stdin = os.path.normpath(os.path.join(_workdir, env_template(self.__stdin, environ)))
+        elif isinstance(self.__stdin, dict) and self.__mode == CommandMode.MUTUAL:
+            _stdin = self.__interactor(self.__stdin, _identification, _workdir, environ)
+        else:
+            _stdin = self.__stdin
         _stdout = os.path.normpath(os.path.join(_workdir, env_template(self.__stdout, environ))) \
             if isinstance(self.__stdout, str) else self.__stdout
         _stderr = os.path.normpath(os.path.join(_workdir, env_template(self.__stderr, environ))) \
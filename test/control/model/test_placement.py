@@ -0,0 +1,67 @@
+import pytest
+
+from pji.control.model import Placement
+
+
+@pytest.mark.unittest
+class TestControlModelPlacement:
+    def test_properties(self):
+        pl = Placement(cpus='0-2,5', nice=5, ionice='best-effort:6', exclusive=True, cores=2)
+
+        assert pl.cpus == {0, 1, 2, 5}
+        assert pl.nice == 5
+        assert pl.ionice == ('best-effort', 6)
+        assert pl.ioprio == (2, 6)
+        assert pl.exclusive
+        assert pl.cores == 2
+        assert not pl.empty
+
+        assert Placement().empty
+        assert Placement(cpus=[3, 1]).cpus == {1, 3}
+        assert Placement(cpus=2).cpus == {2}
+        assert Placement(ionice='idle').ioprio == (3, 0)
+        assert Placement(ionice=('realtime', None)).ioprio == (1, 4)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            Placement(cpus=[])
+        with pytest.raises(ValueError):
+            Placement(cpus=[-1])
+        with pytest.raises(ValueError):
+            Placement(nice=20)
+        with pytest.raises(ValueError):
+            Placement(ionice='fastest')
+        with pytest.raises(ValueError):
+            Placement(ionice='idle:8')
+        with pytest.raises(ValueError):
+            Placement(cores=0)
+
+    def test_json(self):
+        pl = Placement(cpus='0-1', nice=-3, ionice='idle', exclusive=True)
+        assert pl.json == {
+            'cpus': [0, 1],
+            'nice': -3,
+            'ionice': 'idle',
+            'exclusive': True,
+            'cores': 1,
+        }
+        assert Placement.load_from_json(pl.json) == pl
+        assert Placement.loads(dict(pl.json, other=233)) == pl
+
+    def test_loads(self):
+        pl = Placement(nice=3)
+        assert Placement.loads(pl) is pl
+        assert Placement.loads(None) == Placement()
+        assert Placement.loads({'nice': 3}) == pl
+        with pytest.raises(TypeError):
+            Placement.loads(233)
+
+    def test_with_cpus(self):
+        pl = Placement(nice=3, exclusive=True, cores=2)
+        assert pl.with_cpus([4, 5]) == Placement(cpus=[4, 5], nice=3, exclusive=True, cores=2)
+        assert hash(pl.with_cpus([4, 5])) == hash(Placement(cpus=[4, 5], nice=3, exclusive=True, cores=2))
+
+    def test_repr(self):
+        assert repr(Placement()) == '<Placement>'
+        assert repr(Placement(cpus='0-2', nice=3, ionice='best-effort:2', exclusive=True)) == \
+               '<Placement cpus: 0,1,2, nice: 3, ionice: best-effort:2, exclusive: 1>'
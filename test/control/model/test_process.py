@@ -5,7 +5,7 @@ import time
 import pytest
 from bitmath import MiB
 
-from pji.control.model import ProcessResult
+from pji.control.model import ProcessResult, DescendantUsage
 
 _DEMO_RUSAGE = resource.struct_rusage((2.0, 1.0, 131072, 0, 0, 0, 2216, 0, 0, 0, 0, 0, 0, 0, 246, 129))
 
@@ -63,7 +63,10 @@ class TestControlModelProcessNormal:
             'exitcode': 0,
             'max_memory': 134217728.0,
             'real_time': 1.5,
-            'signal': None
+            'signal': None,
+            'cgroup': None,
+            'samples': None,
+            'descendants': None,
         }
 
 
@@ -101,3 +104,25 @@ class TestControlModelProcessKilled:
 
         assert repr(pr) == '<ProcessResult exitcode: 0, signal: SIGKILL, real time: 1.000s, ' \
                            'cpu time: 2.000s, max memory: 128.0 MiB>'
+
+
+@pytest.mark.unittest
+class TestControlModelProcessDescendants:
+    def test_properties(self):
+        pr = ProcessResult(
+            status=0,
+            start_time=_TIME_0_0,
+            end_time=_TIME_1_5,
+            resource_usage=_DEMO_RUSAGE,
+            descendants=DescendantUsage(2, 1.5, 0.5, MiB(256).bytes),
+        )
+
+        assert pr.descendants.count == 2
+        assert pr.cpu_time == 3.5
+        assert pr.system_time == 1.5
+        assert pr.max_memory == MiB(256).bytes
+
+    def test_json(self):
+        du = DescendantUsage(1, 0.25, 0.0, MiB(1).bytes)
+        assert repr(du) == '<DescendantUsage count: 1, cpu time: 0.250s, max memory: 1.0 MiB>'
+        assert du.json == {'count': 1, 'cpu_time': 0.25, 'system_time': 0.0, 'max_memory': 1048576.0}
@@ -1,6 +1,6 @@
 import pytest
 
-from pji.control.model import ProcessResult, RunResult, ResourceLimit, RunResultStatus
+from pji.control.model import ProcessResult, RunResult, ResourceLimit, RunResultStatus, OutputMismatch
 from .test_process import _DEMO_RUSAGE, _TIME_1_5, _TIME_0_0
 
 _DEMO_RESULT_NORMAL = ProcessResult(
@@ -24,6 +24,13 @@ _DEMO_RESULT_KILLED = ProcessResult(
     resource_usage=_DEMO_RUSAGE
 )
 
+_DEMO_RESULT_FILE_SIZE_EXCEED = ProcessResult(
+    status=25,
+    start_time=_TIME_0_0,
+    end_time=_TIME_1_5,
+    resource_usage=_DEMO_RUSAGE
+)
+
 
 @pytest.mark.unittest
 class TestControlModelRun:
@@ -54,8 +61,15 @@ class TestControlModelRun:
                 'exitcode': 0,
                 'max_memory': 134217728.0,
                 'real_time': 1.5,
-                'signal': None
+                'signal': None,
+                'cgroup': None,
+                'samples': None,
+                'descendants': None,
             },
+            'output_size': None,
+            'delivery': None,
+            'interaction': None,
+            'mismatch': None,
             'completed': True,
             'ok': True,
             'status': 'SUCCESS',
@@ -113,6 +127,22 @@ class TestControlModelRun:
         assert rr.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
         assert repr(rr) == '<RunResult status: CPU_TIME_LIMIT_EXCEED, signal: SIGKILL>'
 
+    def test_cpu_time_limit_exceed_watchdog(self):
+        _result = ProcessResult(
+            status=9,
+            start_time=_TIME_0_0,
+            end_time=_TIME_1_5,
+            resource_usage=_DEMO_RUSAGE,
+            cpu_time_exceeded=True,
+        )
+        assert _result.cpu_time_exceeded
+        assert not _DEMO_RESULT_KILLED.cpu_time_exceeded
+
+        rr = RunResult(ResourceLimit(max_cpu_time=100.0), _result)
+        assert rr.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
+        assert RunResult(ResourceLimit(max_cpu_time=100.0), _DEMO_RESULT_KILLED).status == \
+               RunResultStatus.SYSTEM_ERROR
+
     def test_memory_limit_exceed_1(self):
         rr = RunResult(
             ResourceLimit(max_memory='64mb'),
@@ -164,3 +194,64 @@ class TestControlModelRun:
         assert not rr.ok
         assert rr.status == RunResultStatus.SYSTEM_ERROR
         assert repr(rr) == '<RunResult status: SYSTEM_ERROR, signal: SIGKILL>'
+
+    def test_output_limit_exceed_1(self):
+        rr = RunResult(
+            ResourceLimit(max_output_size='1kb'),
+            _DEMO_RESULT_KILLED,
+            dict(stdout=1000, stderr=100),
+        )
+
+        assert not rr.ok
+        assert rr.status == RunResultStatus.OUTPUT_LIMIT_EXCEED
+        assert rr.output_size == dict(stdout=1000, stderr=100)
+        assert rr.json['output_size'] == dict(stdout=1000, stderr=100)
+        assert repr(rr) == '<RunResult status: OUTPUT_LIMIT_EXCEED, signal: SIGKILL>'
+
+    def test_output_limit_exceed_2(self):
+        rr = RunResult(
+            ResourceLimit(max_output_size='1kb'),
+            _DEMO_RESULT_FILE_SIZE_EXCEED,
+            dict(stdout=None, stderr=0),
+        )
+
+        assert not rr.ok
+        assert rr.status == RunResultStatus.OUTPUT_LIMIT_EXCEED
+        assert rr.output_size == dict(stdout=None, stderr=0)
+
+    def test_output_limit_pass(self):
+        rr = RunResult(
+            ResourceLimit(max_output_size='1kb'),
+            _DEMO_RESULT_NORMAL,
+            dict(stdout=1000, stderr=None),
+        )
+
+        assert rr.ok
+        assert rr.status == RunResultStatus.SUCCESS
+
+    def test_wrong_output(self):
+        rr = RunResult(
+            ResourceLimit(max_output_size='1kb'),
+            _DEMO_RESULT_KILLED,
+            dict(stdout=100, stderr=0),
+            mismatch=OutputMismatch(4, b'4', b'3'),
+        )
+
+        assert not rr.ok
+        assert rr.completed
+        assert rr.status == RunResultStatus.WRONG_OUTPUT
+        assert rr.mismatch.offset == 4
+        assert rr.json['mismatch'] == {'offset': 4, 'expected': '4', 'actual': '3'}
+        assert repr(rr) == '<RunResult status: WRONG_OUTPUT, signal: SIGKILL>'
+
+    def test_wrong_output_after_limit(self):
+        rr = RunResult(
+            ResourceLimit(max_output_size='1kb'),
+            _DEMO_RESULT_KILLED,
+            dict(stdout=1000, stderr=100),
+            mismatch=OutputMismatch(0, None, b'1'),
+        )
+
+        assert rr.status == RunResultStatus.OUTPUT_LIMIT_EXCEED
+        assert rr.json['mismatch'] == {'offset': 0, 'expected': None, 'actual': '1'}
+        assert repr(rr.mismatch) == "<OutputMismatch offset: 0, expected: None, actual: b'1'>"
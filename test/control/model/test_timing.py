@@ -2,7 +2,7 @@ import io
 
 import pytest
 
-from pji.control.model import TimingContent as _AbsTimingContent
+from pji.control.model import TimingContent as _AbsTimingContent, TimingDelivery
 from pji.utils import JsonLoadError
 
 
@@ -338,3 +338,36 @@ class TestControlModelTiming:
             (3.0, b'this is last line'),
         ])) == '<TimingContent lines: 4, start_time: 0.000s, end_time: 3.000s>'
         assert repr(TimingContent()) == '<TimingContent lines: 0>'
+
+
+@pytest.mark.unittest
+class TestControlModelTimingDelivery:
+    def test_delivery(self):
+        delivery = TimingDelivery([0.001, 0.003, None])
+        assert delivery.skews == [0.001, 0.003, None]
+        assert delivery.count == 2
+        assert delivery.undelivered == 1
+        assert delivery.max_skew == pytest.approx(0.003)
+        assert delivery.mean_skew == pytest.approx(0.002)
+        assert repr(delivery) == '<TimingDelivery delivered: 2, undelivered: 1, max_skew: 0.003000s>'
+        assert delivery.json == {
+            'skews': [0.001, 0.003, None],
+            'count': 2,
+            'undelivered': 1,
+            'max_skew': pytest.approx(0.003),
+            'mean_skew': pytest.approx(0.002),
+            'skipped': 0.0,
+        }
+
+    def test_delivery_skipped(self):
+        delivery = TimingDelivery([0.001], skipped=12.5)
+        assert delivery.skipped == 12.5
+        assert delivery.json['skipped'] == 12.5
+        assert repr(delivery) == '<TimingDelivery delivered: 1, max_skew: 0.001000s, skipped: 12.500s>'
+
+    def test_delivery_empty(self):
+        delivery = TimingDelivery([])
+        assert delivery.count == 0
+        assert delivery.max_skew is None
+        assert delivery.mean_skew is None
+        assert repr(delivery) == '<TimingDelivery delivered: 0>'
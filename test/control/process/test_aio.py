@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pji.control import async_common_process, async_interactive_process
+from pji.control.model import RunResultStatus
+
+_ECHO_PLUS_ONE = 'python3 -u -c "import sys\nfor line in sys.stdin:\n    print(int(line) + 1)"'
+
+
+@pytest.mark.unittest
+class TestControlProcessAio:
+    def test_common_process(self):
+        async def _run():
+            async with await async_common_process(args='cat', shell=True) as cp:
+                _stdout, _stderr = await cp.communicate(b'233')
+                with pytest.raises(RuntimeError):
+                    await cp.communicate(b'233')
+            return cp, _stdout, _stderr
+
+        cp, stdout, stderr = asyncio.run(_run())
+        assert stdout == b'233'
+        assert stderr == b''
+        assert cp.stdin == b'233'
+        assert cp.ok
+        assert cp.result.result.max_memory > 0
+
+    def test_common_process_limit(self):
+        async def _run():
+            async with await async_common_process(args=['sleep', '5'], resources=dict(max_real_time=0.3)) as cp:
+                pass
+            return cp
+
+        cp = asyncio.run(_run())
+        assert cp.status == RunResultStatus.REAL_TIME_LIMIT_EXCEED
+        assert 0.3 <= cp.result.result.real_time < 0.6
+
+    def test_common_process_cancelled(self):
+        async def _run():
+            _processes = []
+
+            async def _task():
+                async with await async_common_process(args=['sleep', '5']) as cp:
+                    _processes.append(cp)
+                    await cp.communicate()
+
+            _task_future = asyncio.ensure_future(_task())
+            await asyncio.sleep(0.2)
+            _task_future.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await _task_future
+            return _processes[0]
+
+        _start_time = time.time()
+        cp = asyncio.run(_run())
+        assert time.time() - _start_time < 2.0
+        assert not cp.ok
+
+    def test_interactive_process(self):
+        async def _run():
+            _lines = []
+            async with await async_interactive_process(args=_ECHO_PLUS_ONE, shell=True) as ip:
+                for i in range(5):
+                    await ip.print_stdin(str(i).encode())
+                await ip.close_stdin()
+                async for _, _tag, _line in ip.output_yield:
+                    _lines.append((_tag, _line))
+            return ip, _lines
+
+        ip, lines = asyncio.run(_run())
+        assert lines == [('stdout', str(i + 1).encode()) for i in range(5)]
+        assert ip.ok
+
+    def test_interactive_broken_pipe(self):
+        async def _run():
+            async with await async_interactive_process(args=['true']) as ip:
+                await ip.join()
+                with pytest.raises(BrokenPipeError):
+                    for _ in range(100):
+                        await ip.print_stdin(b'x' * 4096)
+            return ip
+
+        assert asyncio.run(_run()).ok
+
+    def test_concurrent_without_threads(self):
+        async def _run():
+            _threads = threading.active_count()
+
+            async def _one():
+                async with await async_common_process(args=['sleep', '0.5']) as cp:
+                    await cp.communicate()
+                return cp
+
+            _tasks = [asyncio.ensure_future(_one()) for _ in range(30)]
+            await asyncio.sleep(0.3)
+            _running_threads = threading.active_count()
+            return await asyncio.gather(*_tasks), _running_threads - _threads
+
+        _start_time = time.time()
+        processes, threads = asyncio.run(_run())
+        assert time.time() - _start_time < 3.0
+        assert all(cp.ok for cp in processes)
+        assert threads < 10  # executor threads of spawning only, none for each process
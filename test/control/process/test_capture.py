@@ -0,0 +1,55 @@
+import mmap
+
+import pytest
+
+from pji.control import CaptureBuffer, common_process
+
+
+@pytest.mark.unittest
+class TestControlProcessCapture:
+    def test_in_memory(self):
+        with CaptureBuffer(spill_threshold='1kb') as capture:
+            capture.write(b'1234\n')
+            capture.write(b'5678\n')
+
+            assert not capture.spilled
+            assert capture.size == 10
+            assert len(capture) == 10
+            assert capture.to_bytes() == b'1234\n5678\n'
+            assert list(capture.chunks(4)) == [b'1234', b'\n567', b'8\n']
+            with capture.to_file() as f:
+                assert f.read() == b'1234\n5678\n'
+            assert bytes(capture.to_mmap()) == b'1234\n5678\n'
+
+    def test_spilled(self):
+        with CaptureBuffer(spill_threshold=8) as capture:
+            capture.write(b'1234\n')
+            assert not capture.spilled
+            capture.write(b'5678\n')
+            assert capture.spilled
+            capture.write(b'abcd\n')
+
+            assert capture.size == 15
+            assert capture.to_bytes() == b'1234\n5678\nabcd\n'
+            assert list(capture.chunks(10)) == [b'1234\n5678\n', b'abcd\n']
+            with capture.to_file() as f:
+                assert f.read() == b'1234\n5678\nabcd\n'
+            _mmap = capture.to_mmap()
+            assert isinstance(_mmap, mmap.mmap)
+            assert _mmap[:] == b'1234\n5678\nabcd\n'
+            _mmap.close()
+
+        with pytest.raises(ValueError):
+            capture.write(b'1234')
+
+    def test_common_process_spilled(self):
+        with common_process(
+                args=['python3', '-c', 'import sys; sys.stdout.write("x" * (1 << 20))'],
+                spill_threshold='64kb',
+        ) as cp:
+            _stdout, _stderr = cp.communicate()
+            assert _stdout == b'x' * (1 << 20)
+            assert _stderr == b''
+            assert cp.stdout_capture.spilled
+            assert cp.stdout_capture.size == 1 << 20
+            assert not cp.stderr_capture.spilled
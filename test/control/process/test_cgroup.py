@@ -0,0 +1,95 @@
+import os
+import time
+
+import pytest
+
+from pji.control import common_process, RunResultStatus
+from pji.control.process.cgroup import get_cgroup_root, get_resource_backend, create_cgroup
+from pji.control.model import ResourceLimit
+
+
+def _cgroup_root():
+    try:
+        _root = get_cgroup_root()
+    except EnvironmentError:
+        return None
+    return _root if os.access(_root, os.W_OK) else None
+
+
+def _controller_available(controller: str) -> bool:
+    _root = _cgroup_root()
+    if _root is None:
+        return False
+    _cgroup = create_cgroup(ResourceLimit())
+    try:
+        return os.path.exists(os.path.join(_cgroup.path, '{controller}.max'.format(controller=controller)))
+    finally:
+        os.rmdir(_cgroup.path)
+
+
+def _wait_removed(path: str, timeout: float = 5.0) -> bool:
+    _deadline = time.time() + timeout
+    while os.path.exists(path) and time.time() < _deadline:
+        time.sleep(0.05)
+    return not os.path.exists(path)
+
+
+_need_cgroup = pytest.mark.skipif(_cgroup_root() is None, reason='Writable cgroup v2 is required.')
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlProcessCgroup:
+    def test_resource_backend(self):
+        assert get_resource_backend() == 'rlimit'
+        assert get_resource_backend('cgroup') == 'cgroup'
+        with pytest.raises(ValueError):
+            get_resource_backend('no_such_backend')
+        with pytest.raises(ValueError):
+            common_process(args='echo 233', resource_backend='no_such_backend')
+
+    @_need_cgroup
+    @pytest.mark.parametrize('launcher', ['fork', 'forkserver'])
+    def test_cgroup_join_and_remove(self, launcher):
+        with common_process(
+                args=['sh', '-c', 'sleep 10 & cat /proc/self/cgroup'],
+                resource_backend='cgroup', launcher=launcher,
+        ) as cp:
+            _stdout, _ = cp.communicate()
+
+        _path = [_line for _line in _stdout.decode().splitlines() if _line.startswith('0::')][0][3:]
+        assert os.path.basename(_path).startswith('pji-')
+        assert _wait_removed(os.path.join(get_cgroup_root(), os.path.basename(_path)))
+
+        _result = cp.result
+        assert _result.ok
+        assert _result.result.cgroup_usage is not None
+        assert _result.result.cpu_time == _result.result.cgroup_usage.cpu_time
+        assert _result.json['result']['cgroup']['oom_kill'] == 0
+
+    @_need_cgroup
+    @pytest.mark.timeout(10.0)
+    def test_cgroup_cpu_time(self):
+        with common_process(
+                args=['python3', '-c', 'import os\nif os.fork():\n    os.wait()\nelse:\n    while True: pass'],
+                resource_backend='cgroup', resources=ResourceLimit(max_cpu_time='1.2s'),
+        ) as cp:
+            cp.communicate()
+
+        _result = cp.result
+        assert _result.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
+        assert _result.result.cpu_time_exceeded
+        assert _result.result.cgroup_usage.cpu_time + _result.result.cgroup_usage.system_time > 1.2
+
+    @pytest.mark.skipif(not _controller_available('memory'), reason='Memory controller of cgroup is required.')
+    @pytest.mark.timeout(10.0)
+    def test_cgroup_memory(self):
+        with common_process(
+                args=['python3', '-c', 'a = [2] * (1 << 26)'],
+                resource_backend='cgroup', resources=ResourceLimit(max_memory='64mb'),
+        ) as cp:
+            cp.communicate()
+
+        _result = cp.result
+        assert _result.status == RunResultStatus.MEMORY_LIMIT_EXCEED
+        assert _result.result.oom_killed
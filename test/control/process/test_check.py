@@ -0,0 +1,103 @@
+import io
+import os
+import tempfile
+
+import pytest
+
+from pji.control.process import OutputChecker
+
+
+def _check(checker: OutputChecker, *chunks: bytes) -> bool:
+    for _chunk in chunks:
+        checker.feed(_chunk)
+    return checker.close()
+
+
+@pytest.mark.unittest
+class TestControlProcessCheck:
+    def test_token(self):
+        assert _check(OutputChecker(b'1 2 3\n'), b'1\n2\n3')
+        assert _check(OutputChecker(b'1 2 3\n'), b'  1', b' 2 ', b'  3\n\n')
+        assert _check(OutputChecker(b'1 23\n'), b'1 2', b'3')
+        assert _check(OutputChecker(b''), b'\n  \n')
+
+    def test_token_mismatch(self):
+        _checker = OutputChecker(b'12 34 56')
+        assert _checker.feed(b'12 3')
+        assert _checker.mismatch is None
+        assert not _checker.feed(b'5 56')
+        assert _checker.mismatch.offset == 3
+        assert _checker.mismatch.expected == b'34'
+        assert _checker.mismatch.actual == b'35'
+
+        assert not _checker.feed(b'78')
+        assert not _checker.close()
+        assert _checker.mismatch.offset == 3
+
+    def test_token_length(self):
+        _checker = OutputChecker(b'1 2 3')
+        assert not _check(_checker, b'1 2')
+        assert _checker.mismatch.offset == 3
+        assert _checker.mismatch.expected == b'3'
+        assert _checker.mismatch.actual is None
+
+        _checker = OutputChecker(b'1 2')
+        assert not _check(_checker, b'1 2 ', b'3')
+        assert _checker.mismatch.offset == 4
+        assert _checker.mismatch.expected is None
+        assert _checker.mismatch.actual == b'3'
+
+    def test_line(self):
+        assert _check(OutputChecker(b'1 2\n3\n', mode='line'), b'1 2  \n', b'3')
+        assert _check(OutputChecker(b'1 2\n3\n\n\n', mode='line'), b'1 2\n3\n')
+        assert _check(OutputChecker(b'1 2\n3', mode='line'), b'1 2\n3\n\n')
+
+    def test_line_mismatch(self):
+        _checker = OutputChecker(b'1 2\n3\n', mode='line')
+        assert not _check(_checker, b'1 2\n', b'\n3\n')
+        assert _checker.mismatch.offset == 4
+        assert _checker.mismatch.expected == b'3'
+        assert _checker.mismatch.actual == b''
+
+        _checker = OutputChecker(b'1 2\n3\n', mode='line')
+        assert not _check(_checker, b'1  2\n3\n')
+        assert _checker.mismatch.offset == 0
+
+    def test_long_item(self):
+        _checker = OutputChecker(b'1' * 1000)
+        assert not _check(_checker, b'1' * 999 + b'2')
+        assert _checker.mismatch.expected == b'1' * 64
+        assert _checker.mismatch.actual == b'1' * 64
+
+    def test_large(self):
+        _expected = b''.join(b'%d\n' % i for i in range(200000))
+        _checker = OutputChecker(_expected)
+        for i in range(0, len(_expected), 4093):
+            assert _checker.feed(_expected[i:i + 4093])
+        assert _checker.close()
+
+    def test_stream(self):
+        with io.BytesIO(b'1 2') as stream:
+            assert _check(OutputChecker(stream), b'1 2')
+            assert not stream.closed
+
+    def test_loads(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            _path = os.path.join(workdir, 'answer.txt')
+            with open(_path, 'wb') as f:
+                f.write(b'1\n2\n')
+
+            _checker = OutputChecker.loads(_path)
+            assert _checker.mode == 'token'
+            assert _check(_checker, b'1 2')
+
+            _checker = OutputChecker.loads(dict(expected=_path, mode='line'))
+            assert _checker.mode == 'line'
+            assert not _check(_checker, b'1 2')
+
+            assert OutputChecker.loads(_checker) is _checker
+
+        with pytest.raises(TypeError):
+            OutputChecker.loads(233)
+        with pytest.raises(ValueError):
+            OutputChecker(b'', mode='char')
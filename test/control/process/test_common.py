@@ -1,8 +1,10 @@
+import os
+import tempfile
 import time
 
 import pytest
 
-from pji.control import ResourceLimit, common_process, CommonProcess
+from pji.control import ResourceLimit, common_process, CommonProcess, RunResultStatus
 
 
 # noinspection DuplicatedCode
@@ -177,3 +179,44 @@ class TestControlProcessCommon:
 
             with pytest.raises(RuntimeError):
                 cp.communicate(b'')
+
+    def test_common_process_direct_fd(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.path.join(workdir, 'input.txt'), 'wb') as f:
+                f.write(b'233\n')
+
+            with open(os.path.join(workdir, 'input.txt'), 'rb', 0) as fin, \
+                    open(os.path.join(workdir, 'output.txt'), 'wb', 0) as fout:
+                with common_process(args='cat', stdin_fd=fin.fileno(), stdout_fd=fout.fileno()) as cp:
+                    with pytest.raises(ValueError):
+                        cp.communicate(b'123')
+                    _stdout, _stderr = cp.communicate()
+                    assert _stdout is None
+                    assert _stderr == b''
+
+            assert cp.result.result.ok
+            with open(os.path.join(workdir, 'output.txt'), 'rb') as f:
+                assert f.read() == b'233\n'
+
+    def test_common_process_tee(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.path.join(workdir, 'output.txt'), 'wb', 0) as fout:
+                with common_process(args='cat', stdout_fd=fout.fileno(), tee=True) as cp:
+                    _stdout, _ = cp.communicate(b'233\n')
+                    assert _stdout == b'233\n'
+
+            with open(os.path.join(workdir, 'output.txt'), 'rb') as f:
+                assert f.read() == b'233\n'
+
+    @pytest.mark.timeout(5.0)
+    def test_common_process_ole(self):
+        with common_process(args='yes', resources=ResourceLimit(max_output_size='1mb')) as cp:
+            cp.communicate(wait=False)
+            cp.join()
+
+        _result = cp.result
+        assert _result.status == RunResultStatus.OUTPUT_LIMIT_EXCEED
+        assert _result.result.signal_code == 9
+        assert _result.output_size['stdout'] > 1 << 20
+        assert _result.output_size['stderr'] == 0
+        assert len(cp.stdout) == _result.output_size['stdout']
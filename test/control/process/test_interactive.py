@@ -1,3 +1,4 @@
+import os
 import time
 from threading import Thread
 
@@ -255,3 +256,100 @@ class TestControlProcessInteractive:
                     args="what_the_fuck -c 'echo 233 && sleep 2 && echo 2334'",
             ):
                 pytest.fail('Should not reach here')
+
+    @pytest.mark.timeout(10.0)
+    def test_interactive_process_backpressure(self):
+        with interactive_process(args='seq 1 200000') as ip:
+            time.sleep(0.5)  # output is kept in pipe when queue is full
+            _lines = list(ip.output_yield)
+
+        assert ip.ok
+        assert _lines[0][1:] == ('stdout', b'1')
+        assert [int(_line) for _, _, _line in _lines] == list(range(1, 200001))
+
+    @pytest.mark.timeout(10.0)
+    def test_interactive_process_raw_output(self):
+        _data = bytes(range(256)) * 4096
+        with interactive_process(
+                args=['python3', '-c', 'import sys; sys.stdout.buffer.write(bytes(range(256)) * 4096); '
+                                       'sys.stderr.buffer.write(b"err\\r\\n")'],
+                raw_output=True,
+        ) as ip:
+            assert ip.raw_output
+            _records = list(ip.output_yield)
+
+        assert ip.ok
+        assert b''.join(_chunk for _, _tag, _chunk in _records if _tag == 'stdout') == _data
+        assert b''.join(_chunk for _, _tag, _chunk in _records if _tag == 'stderr') == b'err\r\n'
+        assert all(_time is not None and _time >= 0 for _time, _, _ in _records)
+
+    @pytest.mark.timeout(10.0)
+    def test_interactive_process_output_batches(self):
+        with interactive_process(args='seq 1 10000', timestamp=False) as ip:
+            assert not ip.raw_output
+            _batches = list(ip.output_batches)
+
+        assert ip.ok
+        assert all(isinstance(_batch, list) and _batch for _batch in _batches)
+        _records = [_record for _batch in _batches for _record in _batch]
+        assert [int(_line) for _, _, _line in _records] == list(range(1, 10001))
+        assert all(_time is None for _time, _, _ in _records)
+
+    @pytest.mark.timeout(10.0)
+    def test_interactive_process_raw_output_batches(self):
+        with interactive_process(args='seq 1 100000', raw_output=True, timestamp=False) as ip:
+            _chunks = [_chunk for _batch in ip.output_batches for _, _, _chunk in _batch]
+
+        assert ip.ok
+        assert b''.join(_chunks) == b''.join(b'%d\n' % i for i in range(1, 100001))
+
+    @pytest.mark.timeout(10.0)
+    def test_interactive_process_write_lines(self):
+        _lines = [b'line %d' % i for i in range(5000)] + [b'']
+        with interactive_process(args='cat') as ip:
+            _size = ip.write_lines(_lines)
+            assert _size == sum(len(_line) + len(os.linesep) for _line in _lines)
+            assert ip.write_lines([b'last'], end=b'') == 4
+            ip.close_stdin()
+            _output = [_line for _, _, _line in ip.output_yield]
+
+        assert ip.ok
+        assert _output == _lines + [b'last']
+
+    @pytest.mark.timeout(5.0)
+    def test_interactive_process_write_lines_broken_pipe(self):
+        with interactive_process(args='true') as ip:
+            _ = list(ip.output_yield)
+            with pytest.raises(BrokenPipeError):
+                ip.write_lines([b'233' * 100000] * 10)
+
+        assert ip.ok
+
+    @pytest.mark.timeout(5.0)
+    def test_interactive_process_ole(self):
+        with interactive_process(args='yes', resources=ResourceLimit(max_output_size='1mb')) as ip:
+            _lines = list(ip.output_yield)
+
+        _result = ip.result
+        assert _result.status == RunResultStatus.OUTPUT_LIMIT_EXCEED
+        assert _result.output_size['stdout'] > 1 << 20
+        assert len(_lines) * 2 == _result.output_size['stdout']
+
+    @pytest.mark.timeout(5.0)
+    def test_interactive_process_checker(self):
+        with interactive_process(args='yes', checker=dict(expected=b'y\n' * 1000 + b'n\n', mode='line')) as ip:
+            _lines = list(ip.output_yield)
+
+        _result = ip.result
+        assert _result.status == RunResultStatus.WRONG_OUTPUT
+        assert _result.mismatch.offset == 2000
+        assert _result.mismatch.actual == b'y'
+        assert len(_lines) > 1000
+
+        _read, _write = os.pipe()
+        try:
+            with pytest.raises(ValueError):
+                interactive_process(args='yes', stdout_fd=_write, checker=dict(expected=b''))
+        finally:
+            os.close(_read)
+            os.close(_write)
@@ -0,0 +1,80 @@
+import os
+import signal
+
+import pytest
+
+from pji.control import common_process, interactive_process, ExecutorException
+from pji.control.process.launcher import get_forkserver
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlProcessLauncher:
+    def test_forkserver_common(self):
+        with common_process(
+                args="echo ${ENV_TEST}", shell=True,
+                environ={'ENV_TEST': '233'}, launcher='forkserver',
+        ) as cp:
+            cp.communicate()
+            assert cp.stdout.rstrip(b'\r\n') == b'233'
+            assert cp.stderr == b''
+
+        _result = cp.result.result
+        assert _result is not None
+        assert _result.ok
+        assert _result.max_memory > 0
+        assert os.getpid() != get_forkserver().pid
+
+    def test_forkserver_interactive(self):
+        with interactive_process(
+                args="python3 -c \"print(int(input()) + 1)\"", launcher='forkserver',
+        ) as ip:
+            ip.print_stdin(b'232')
+            ip.close_stdin()
+            _lines = list(ip.output_yield)
+            assert [(_tag, _line) for _, _tag, _line in _lines] == [('stdout', b'233')]
+
+        assert ip.result.ok
+
+    def test_forkserver_cwd_and_limit(self, tmpdir):
+        with common_process(
+                args='pwd', cwd=str(tmpdir), launcher='forkserver',
+        ) as cp:
+            cp.communicate()
+        assert cp.stdout.rstrip(b'\r\n') == str(tmpdir).encode()
+
+        with common_process(
+                args="python3 -c \"while True: pass\"", launcher='forkserver',
+                resources=dict(max_real_time='0.5s'),
+        ) as cp:
+            pass
+        assert cp.result.result.signal == signal.SIGKILL
+        assert 0.5 <= cp.result.result.real_time < 0.7
+
+    def test_forkserver_errors(self, tmpdir):
+        _invalid_exec = os.path.join(str(tmpdir), 'invalid_exec')
+        with open(_invalid_exec, 'wb') as f:
+            f.write(b'\x00\x01\x02')
+        os.chmod(_invalid_exec, 0o755)
+
+        with pytest.raises(ExecutorException) as ei:
+            common_process(args=_invalid_exec, launcher='forkserver')
+        assert isinstance(ei.value.exception, OSError)
+
+        with pytest.raises(ValueError):
+            common_process(args="echo 233", launcher='forkserver', preexec_fn=lambda: None)
+
+        with pytest.raises(ValueError):
+            common_process(args="echo 233", launcher='no_such_launcher')
+
+    def test_fork_exec_error(self, tmpdir):
+        _invalid_exec = os.path.join(str(tmpdir), 'invalid_exec')
+        with open(_invalid_exec, 'wb') as f:
+            f.write(b'\x00\x01\x02')
+        os.chmod(_invalid_exec, 0o755)
+
+        _pid = os.getpid()
+        with pytest.raises(ExecutorException) as ei:
+            common_process(args=_invalid_exec, launcher='fork')
+        assert os.getpid() == _pid
+        assert isinstance(ei.value.exception, OSError)
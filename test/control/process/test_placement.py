@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+from threading import Thread
+
+import pytest
+
+from pji.control import common_process
+from pji.control.process.placement import CoreAllocator
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlProcessPlacement:
+    def test_allocator(self):
+        with tempfile.TemporaryDirectory() as lock_dir:
+            _allocator = CoreAllocator(lock_dir, cpus=[0, 1, 2])
+            _another = CoreAllocator(lock_dir, cpus=[0, 1, 2])  # e.g. in another judge process
+
+            with _allocator.acquire(2) as _lease:
+                assert _lease.cpus == {0, 1}
+                assert _another.try_acquire(2) is None
+                with _another.acquire(1) as _lease_2:
+                    assert _lease_2.cpus == {2}
+                with pytest.raises(TimeoutError):
+                    _another.acquire(2, timeout=0.05)
+            assert _lease.released
+
+            with _another.acquire(1, candidates=[1, 2, 5]) as _lease:
+                assert _lease.cpus == {1}
+
+            with pytest.raises(ValueError):
+                _allocator.acquire(4)
+            with pytest.raises(ValueError):
+                _allocator.acquire(1, candidates=[5])
+
+    def test_allocator_wait(self):
+        with tempfile.TemporaryDirectory() as lock_dir:
+            _allocator = CoreAllocator(lock_dir, cpus=[0])
+            _lease = _allocator.acquire()
+
+            def _release_later():
+                time.sleep(0.1)
+                _lease.release()
+
+            _thread = Thread(target=_release_later)
+            _thread.start()
+            _start = time.time()
+            with _allocator.acquire(timeout=1.0) as _lease_2:
+                assert _lease_2.cpus == {0}
+                assert time.time() - _start >= 0.08
+            _thread.join()
+
+    def test_common_process_placement(self):
+        _cpu = min(os.sched_getaffinity(0))
+        with common_process(
+                args=['sh', '-c', 'grep Cpus_allowed_list /proc/self/status; cut -d" " -f19 /proc/self/stat'],
+                placement=dict(cpus=[_cpu], nice=5),
+        ) as cp:
+            _stdout, _ = cp.communicate()
+
+        assert cp.result.ok
+        assert _stdout.split() == [b'Cpus_allowed_list:', str(_cpu).encode(), b'5']
+
+    @pytest.mark.timeout(5.0)
+    def test_common_process_exclusive(self):
+        _cpu = min(os.sched_getaffinity(0))
+        _results = []
+
+        def _run():
+            with common_process(args=['sh', '-c', 'grep Cpus_allowed_list /proc/self/status; sleep 0.2'],
+                                placement=dict(exclusive=True, cpus=[_cpu])) as cp:
+                _stdout, _ = cp.communicate()
+            _results.append((cp.result.result.start_time, cp.result.result.end_time, _stdout))
+
+        _threads = [Thread(target=_run) for _ in range(2)]
+        _start = time.time()
+        for _thread in _threads:
+            _thread.start()
+        for _thread in _threads:
+            _thread.join()
+
+        assert time.time() - _start >= 0.4  # the core is held by one run at a time
+        (_, _end_1, _stdout_1), (_start_2, _, _stdout_2) = sorted(_results)
+        assert _end_1 <= _start_2
+        assert _stdout_1 == _stdout_2 == 'Cpus_allowed_list:\t{cpu}\n'.format(cpu=_cpu).encode()
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+import where
+
+from pji.control import common_process
+from pji.control.model import ResourceLimit, Identification
+from pji.control.process import plan as plan_module
+from pji.control.process.plan import get_spawn_plan, compile_spawn_plan, clear_spawn_plans
+
+_ENVIRON = {'PATH': os.environ.get('PATH', os.defpath)}
+
+
+@pytest.mark.unittest
+class TestControlProcessPlan:
+    def test_compile(self):
+        plan = compile_spawn_plan('python3 -c "print(1)"', shell=True, environ=_ENVIRON,
+                                  resources=dict(max_memory='64mb', max_cpu_time='1.5s'))
+        assert plan.args == [os.path.abspath(where.first('python3')), '-c', 'print(1)']
+        assert plan.executable == os.path.abspath(where.first('python3'))
+        assert plan.resources == ResourceLimit(max_memory='64mb', max_cpu_time='1.5s')
+        assert plan.rlimits == plan.resources.rlimits
+        assert plan.uid is None and plan.gid is None and plan.groups is None
+        assert plan.valid()
+
+        plan = compile_spawn_plan(['ls', '-al'], identification='nobody')
+        assert plan.args == ['ls', '-al']
+        assert plan.executable == where.first('ls')
+        assert plan.uid == Identification.loads('nobody').user.uid
+        assert plan.gid == Identification.loads('nobody').group.gid
+        assert plan.gid in plan.groups
+
+    def test_cache(self, monkeypatch):
+        clear_spawn_plans()
+        plan = get_spawn_plan('ls -al', shell=True, environ=_ENVIRON, resources=dict(max_memory='64mb'))
+        assert get_spawn_plan('ls -al', shell=True, environ=dict(_ENVIRON),
+                              resources=dict(max_memory='64mb')) is plan
+        assert get_spawn_plan('ls -al', shell=True, environ=_ENVIRON,
+                              resources=ResourceLimit(max_memory='64mb')) is not plan
+        assert get_spawn_plan('ls -a', shell=True, environ=_ENVIRON, resources=dict(max_memory='64mb')) is not plan
+
+        _stamp = plan_module._identity_stamp()
+        monkeypatch.setattr(plan_module, '_identity_stamp', lambda: tuple((_item or 0) + 1 for _item in _stamp))
+        assert not plan.valid()
+        assert get_spawn_plan('ls -al', shell=True, environ=_ENVIRON, resources=dict(max_memory='64mb')) is not plan
+
+    def test_cache_path_changed(self, monkeypatch):
+        clear_spawn_plans()
+        plan = get_spawn_plan(['ls'])
+        assert get_spawn_plan(['ls']) is plan
+
+        monkeypatch.setenv('PATH', os.environ.get('PATH', '') + os.pathsep + '/not_exist')
+        assert get_spawn_plan(['ls']) is not plan
+
+    def test_not_cached_when_not_found(self):
+        clear_spawn_plans()
+        plan = get_spawn_plan(['not_exist_command_233'])
+        assert plan.executable is None
+        assert get_spawn_plan(['not_exist_command_233']) is not plan
+
+        with pytest.raises(EnvironmentError):
+            common_process(args=['not_exist_command_233'])
+
+    def test_common_process(self):
+        for _ in range(3):
+            with common_process(args='python3 -c "print(233)"', shell=True, environ=_ENVIRON) as cp:
+                cp.communicate()
+                assert cp.stdout.rstrip(b'\r\n') == b'233'
+            assert cp.result.ok
@@ -0,0 +1,67 @@
+import os
+import signal
+import time
+
+import pytest
+
+from pji.control.process import reaper
+from pji.control.process.reaper import watch_child, PidfdChildWatch, ThreadChildWatch
+
+
+def _fork_sleep(seconds: float) -> int:
+    pid = os.fork()
+    if not pid:
+        os.setsid()
+        os.execvp('sleep', ['sleep', str(seconds)])
+    return pid
+
+
+@pytest.mark.unittest
+class TestControlProcessReaper:
+    @pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason='pidfd not supported.')
+    def test_pidfd_exit(self):
+        _start_time = time.time()
+        watch = watch_child(_fork_sleep(0.2), _start_time, None)
+        assert isinstance(watch, PidfdChildWatch)
+
+        watch.join()
+        assert watch.complete.is_set()
+        assert watch.result.ok
+        assert watch.result.start_time == _start_time
+        assert 0.2 <= watch.result.real_time < 0.5
+
+    @pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason='pidfd not supported.')
+    def test_pidfd_kill(self):
+        _start_time = time.time()
+        watches = [watch_child(_fork_sleep(5.0), _start_time, 0.3) for _ in range(20)]
+        for watch in watches:
+            watch.join()
+            assert watch.result.signal == signal.SIGKILL
+            assert 0.3 <= watch.result.real_time < 0.4
+
+    def test_thread_fallback(self, monkeypatch):
+        monkeypatch.setattr(reaper, '_pidfd_open', lambda pid: None)
+
+        _start_time = time.time()
+        watch = watch_child(_fork_sleep(5.0), _start_time, 0.3)
+        assert isinstance(watch, ThreadChildWatch)
+
+        watch.join()
+        assert watch.complete.is_set()
+        assert watch.result.signal == signal.SIGKILL
+        assert 0.3 <= watch.result.real_time < 0.6
+
+    @pytest.mark.parametrize('pidfd', [True, False])
+    def test_done_callback(self, monkeypatch, pidfd):
+        if not pidfd:
+            monkeypatch.setattr(reaper, '_pidfd_open', lambda pid: None)
+
+        _completed = []
+        watch = watch_child(_fork_sleep(0.1), time.time(), None)
+        watch.add_done_callback(lambda: _completed.append(watch.result is not None))
+        assert _completed == []
+
+        watch.join()
+        assert _completed == [True]  # called before join returns
+        watch.add_done_callback(lambda: _completed.append('later'))
+        assert _completed == [True, 'later']
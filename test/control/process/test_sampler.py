@@ -0,0 +1,90 @@
+import os
+import subprocess
+import time
+from threading import Thread
+
+import pytest
+
+from pji.control import common_process, interactive_process, RunResultStatus, ResourceSample
+from pji.control.process.sampler import ResourceSampler, waiting_for_input
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlProcessSampler:
+    def test_sample_self(self):
+        _sampler = ResourceSampler(os.getpid(), time.time(), 0.1)
+        _sample = _sampler.sample()
+        assert isinstance(_sample, ResourceSample)
+        assert _sample.processes >= 1
+        assert _sample.rss > 0
+        assert _sample.cpu_time > 0
+        assert _sample.json == [_sample.time, _sample.rss, _sample.pss, _sample.cpu_time, _sample.processes]
+
+        with pytest.raises(ValueError):
+            ResourceSampler(os.getpid(), time.time(), 0.0)
+        with pytest.raises(ValueError):
+            common_process(args='echo 233', sample_interval=-1)
+
+    @pytest.mark.timeout(5.0)
+    def test_sampler_timeline(self):
+        with common_process(
+                args=['python3', '-c', 'import time\na = []\nfor i in range(20):\n'
+                                       '    a.append(b"x" * (1 << 20)); time.sleep(0.02)'],
+                sample_interval=0.02,
+        ) as cp:
+            cp.communicate(wait=False)
+            cp.join()
+            _samples = cp.result.result.samples
+
+        assert cp.result.ok
+        assert len(_samples) >= 5
+        assert all(_a.time <= _b.time for _a, _b in zip(_samples, _samples[1:]))
+        assert _samples[-1].rss > _samples[0].rss
+        assert len(cp.result.json['result']['samples']) == len(_samples)
+
+    @pytest.mark.timeout(5.0)
+    def test_sampler_mle(self):
+        _start = time.time()
+        with common_process(
+                args=['python3', '-c', 'import time\na = []\nwhile True:\n'
+                                       '    a.append(b"x" * (1 << 20)); time.sleep(0.001)'],
+                sample_interval=0.01, resources=dict(max_memory='96mb'),
+        ) as cp:
+            cp.communicate(wait=False)
+
+        assert time.time() - _start < 2.0
+        assert cp.result.status == RunResultStatus.MEMORY_LIMIT_EXCEED
+        assert cp.result.result.signal_code == 9
+        assert cp.result.result.max_memory > 96 * 1024 * 1024
+
+    @pytest.mark.timeout(5.0)
+    def test_snapshot_during_join(self):
+        with common_process(args=['sleep', '1'], sample_interval=0.02) as cp:
+            cp.communicate(wait=False)
+            _joiner = Thread(target=cp.join)
+            _joiner.start()
+            time.sleep(0.3)
+
+            _snapshot = cp.snapshot()  # not blocked by join
+            assert isinstance(_snapshot, ResourceSample)
+            assert _snapshot.processes == 1
+            assert 0.0 < _snapshot.time < 1.0
+            _joiner.join()
+        assert cp.result.ok
+
+        with interactive_process(args='echo 233') as ip:
+            pass
+        assert ip.snapshot() is None
+
+    @pytest.mark.timeout(5.0)
+    def test_waiting_for_input(self):
+        for args, waiting in [(['sh', '-c', 'cat | cat'], True), (['sleep', '1'], False)]:
+            _process = subprocess.Popen(args, stdin=subprocess.PIPE, start_new_session=True)
+            try:
+                time.sleep(0.3)
+                assert waiting_for_input(_process.pid) == waiting
+            finally:
+                _process.stdin.close()
+                _process.kill()
+                _process.wait()
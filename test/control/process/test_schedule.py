@@ -0,0 +1,105 @@
+import os
+import time
+
+import pytest
+
+from pji.control.process.schedule import StdinSchedule
+from pji.control.process.supervisor import get_supervisor
+
+
+@pytest.mark.unittest
+class TestControlProcessSchedule:
+    def test_schedule(self):
+        _read, _write = os.pipe()
+        _received = []
+        _supervisor = get_supervisor()
+        _supervisor.add_reader(_read, lambda data: _received.append((time.time(), data)))
+
+        _start_time = time.time()
+        _schedule = StdinSchedule(_write, _start_time, [
+            (0.0, b'line 1'),
+            (0.1, b'line 2'),
+            (0.1, b'line 3'),
+            (0.3, b'line 4'),
+        ], end=b'\n')
+        assert not _schedule.complete
+        assert _schedule.wait(timeout=5.0)
+        time.sleep(0.05)
+
+        assert b''.join(_data for _, _data in _received) == b'line 1\nline 2\nline 3\nline 4\n'
+        assert _received[-1][0] - _start_time >= 0.3
+        _delivery = _schedule.delivery
+        assert _delivery.count == 4
+        assert _delivery.undelivered == 0
+        assert 0.0 <= _delivery.max_skew < 0.05
+
+    def test_schedule_cancel(self):
+        _read, _write = os.pipe()
+        _received = bytearray()
+        get_supervisor().add_reader(_read, _received.extend)
+
+        _schedule = StdinSchedule(_write, time.time(), [(0.0, b'line 1'), (10.0, b'line 2')], end=b'\n')
+        time.sleep(0.1)
+        _schedule.cancel()
+        assert _schedule.wait(timeout=5.0)
+        time.sleep(0.05)
+
+        assert bytes(_received) == b'line 1\n'
+        assert _schedule.delivery.count == 1
+        assert _schedule.delivery.undelivered == 1
+
+    def test_schedule_empty(self):
+        _read, _write = os.pipe()
+        _schedule = StdinSchedule(_write, time.time(), [])
+        assert _schedule.wait(timeout=5.0)
+        assert _schedule.delivery.count == 0
+        assert os.read(_read, 10) == b''
+        os.close(_read)
+
+    def test_schedule_fast_forward(self):
+        _read, _write = os.pipe()
+        _received = bytearray()
+        get_supervisor().add_reader(_read, _received.extend)
+
+        _quiet_checks = []
+
+        def _quiet(duration: float) -> bool:
+            _quiet_checks.append(duration)
+            return True
+
+        _start = time.time()
+        _schedule = StdinSchedule(_write, _start, [(0.0, b'line 1'), (5.0, b'line 2'), (60.0, b'line 3')],
+                                  end=b'\n', fast_forward=0.02, quiet_func=_quiet)
+        assert _schedule.wait(timeout=5.0)
+        assert time.time() - _start < 2.0
+        time.sleep(0.05)
+
+        assert bytes(_received) == b'line 1\nline 2\nline 3\n'
+        assert _quiet_checks and all(_duration == 0.02 for _duration in _quiet_checks)
+        _delivery = _schedule.delivery
+        assert _delivery.count == 3
+        assert 0.0 <= _delivery.max_skew < 0.05
+        assert 59.0 < _delivery.skipped < 60.0
+        assert _schedule.skipped == _delivery.skipped
+        assert _schedule.virtual_time(0.0) == 0.0
+        assert _schedule.virtual_time(10.0) == pytest.approx(10.0 + _delivery.skipped)
+
+    def test_schedule_fast_forward_not_quiet(self):
+        _read, _write = os.pipe()
+        _received = bytearray()
+        get_supervisor().add_reader(_read, _received.extend)
+
+        _start = time.time()
+        _schedule = StdinSchedule(_write, _start, [(0.0, b'line 1'), (0.3, b'line 2')],
+                                  end=b'\n', fast_forward=0.01, quiet_func=lambda duration: False)
+        assert _schedule.wait(timeout=5.0)
+        assert time.time() - _start >= 0.3
+        assert _schedule.skipped == 0.0
+        assert _schedule.virtual_time(0.5) == 0.5
+
+    def test_schedule_fast_forward_invalid(self):
+        _read, _write = os.pipe()
+        with pytest.raises(ValueError):
+            StdinSchedule(_write, time.time(), [(0.0, b'line 1')], fast_forward=0.01)
+        os.close(_read)
+        os.close(_write)
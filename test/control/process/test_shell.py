@@ -0,0 +1,61 @@
+import os
+
+import pytest
+import where
+
+from pji.control import common_process
+from pji.control.process import shell
+from pji.control.process.shell import shell_free_args
+
+_ENVIRON = {'PATH': os.environ.get('PATH', os.defpath), 'SCRIPT': 'a.py', 'SPACED': 'a b'}
+_PYTHON = os.path.abspath(where.first('python3'))
+
+
+@pytest.mark.unittest
+class TestControlProcessShell:
+    def test_shell_free_args(self):
+        assert shell_free_args('python3 a.py 1', _ENVIRON) == [_PYTHON, 'a.py', '1']
+        assert shell_free_args('python3 -c "print(1)"', _ENVIRON) == [_PYTHON, '-c', 'print(1)']
+        assert shell_free_args('python3 $SCRIPT "${SCRIPT}"', _ENVIRON) == [_PYTHON, 'a.py', 'a.py']
+        assert shell_free_args('python3 "|" \'$\'', _ENVIRON) == [_PYTHON, '|', '$']
+
+    def test_shell_free_args_executable(self, tmpdir):
+        with tmpdir.as_cwd():
+            with open('main', 'w') as f:
+                f.write('#!/bin/sh\necho 233\n')
+            os.chmod('main', 0o755)
+            with open('plain', 'w') as f:
+                f.write('echo 233\n')
+            os.chmod('plain', 0o755)
+
+        _main = os.path.join(str(tmpdir), 'main')
+        assert shell_free_args('./main 1', _ENVIRON, cwd=str(tmpdir)) == [_main, '1']
+        assert shell_free_args('./plain', _ENVIRON, cwd=str(tmpdir)) is None
+        assert shell_free_args('./not_exist', _ENVIRON, cwd=str(tmpdir)) is None
+        assert shell_free_args('not_exist_command_233', _ENVIRON) is None
+
+    @pytest.mark.parametrize('command', [
+        'python3 a.py | cat', 'python3 a.py > out', 'python3 a.py; true', 'python3 a.py && true',
+        'python3 *.py', 'python3 $(echo a.py)', 'python3 `echo a.py`', 'python3 a.py &',
+        'python3 $SPACED', 'python3 $NOT_EXIST', 'python3 ${SCRIPT:-b.py}', "python3 '$SCRIPT'",
+        'python3 "\\$"', 'python3 "unclosed', 'A=1 python3 a.py', 'echo 233', 'cd /tmp', 'exit 1', '',
+    ])
+    def test_shell_needed(self, command):
+        assert shell_free_args(command, _ENVIRON) is None
+
+    def test_common_process(self):
+        with common_process(args='python3 -c "import sys;print(sys.argv[1])" "${VALUE}"', shell=True,
+                            environ={'PATH': _ENVIRON['PATH'], 'VALUE': '233'}) as cp:
+            cp.communicate()
+            assert cp.stdout.rstrip(b'\r\n') == b'233'
+
+        assert cp.result.ok
+
+    def test_fast_path_disabled(self, monkeypatch):
+        monkeypatch.setenv(shell.ENV_PJI_SHELL_FAST_PATH, '0')
+        monkeypatch.setattr(shell, 'shell_free_args', lambda *args, **kwargs: pytest.fail('Should not reach here.'))
+        with common_process(args='python3 -c "print(233)"', shell=True, environ={'PATH': _ENVIRON['PATH']}) as cp:
+            cp.communicate()
+            assert cp.stdout.rstrip(b'\r\n') == b'233'
+
+        assert cp.result.ok
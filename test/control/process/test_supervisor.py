@@ -0,0 +1,139 @@
+import os
+import time
+from threading import Event, Thread
+
+import pytest
+
+from pji.control.process.base import LineSplitter, OutputQueue
+from pji.control.process.supervisor import get_supervisor
+
+
+@pytest.mark.unittest
+class TestControlProcessSupervisor:
+    def test_reader_and_writer(self):
+        _supervisor = get_supervisor()
+        _read, _write = os.pipe()
+        _data = bytes(range(256)) * 4096  # larger than pipe buffer
+        _received = bytearray()
+        _write_done, _read_done = Event(), Event()
+
+        _supervisor.add_reader(_read, _received.extend, _read_done.set)
+        _supervisor.add_writer(_write, _data, _write_done.set)
+
+        assert _write_done.wait(timeout=5.0)
+        assert _read_done.wait(timeout=5.0)
+        assert bytes(_received) == _data
+
+    def test_writer_broken_pipe(self):
+        _supervisor = get_supervisor()
+        _read, _write = os.pipe()
+        os.close(_read)
+
+        _write_done = Event()
+        _supervisor.add_writer(_write, b'233' * 100000, _write_done.set)
+        assert _write_done.wait(timeout=5.0)
+
+    def test_stream_writer(self):
+        _supervisor = get_supervisor()
+        _read, _write = os.pipe()
+        _received = bytearray()
+        _read_done, _write_done = Event(), Event()
+        _written = []
+
+        _supervisor.add_reader(_read, _received.extend, _read_done.set)
+        _handle = _supervisor.add_stream_writer(_write, _write_done.set)
+        _handle.write(b'233', lambda: _written.append(1))
+        _handle.write_many([(bytes(range(256)) * 4096, lambda: _written.append(2)), (b'', None), (b'end', None)])
+        _handle.close()
+        _handle.write(b'dropped')
+
+        assert _write_done.wait(timeout=5.0)
+        assert _read_done.wait(timeout=5.0)
+        assert bytes(_received) == b'233' + bytes(range(256)) * 4096 + b'end'
+        assert _written == [1, 2]
+
+    def test_stream_writer_broken_pipe(self):
+        _supervisor = get_supervisor()
+        _read, _write = os.pipe()
+        os.close(_read)
+
+        _write_done = Event()
+        _handle = _supervisor.add_stream_writer(_write, _write_done.set)
+        _handle.write(b'233' * 100000, lambda: pytest.fail('Should not reach here'))
+        assert _write_done.wait(timeout=5.0)
+
+    def test_reader_pause_and_resume(self):
+        _supervisor = get_supervisor()
+        _read, _write = os.pipe()
+        _received = bytearray()
+        _read_done = Event()
+
+        _handle = _supervisor.add_reader(_read, _received.extend, _read_done.set)
+        _handle.pause()
+        os.write(_write, b'233')
+        time.sleep(0.1)
+        assert bytes(_received) == b''
+
+        _handle.resume()
+        os.close(_write)
+        assert _read_done.wait(timeout=5.0)
+        assert bytes(_received) == b'233'
+        _handle.pause()  # nothing happens after closed
+
+    def test_output_queue(self):
+        _actions = []
+        _queue = OutputQueue(4, on_pause=lambda: _actions.append('pause'), on_resume=lambda: _actions.append('resume'))
+        for i in range(5):
+            _queue.put(i)
+        assert _queue.paused
+        assert len(_queue) == 5
+        assert _actions == ['pause']
+
+        assert [_queue.get() for _ in range(3)] == [0, 1, 2]
+        assert not _queue.paused
+        assert _actions == ['pause', 'resume']
+
+        _items = []
+
+        def _consume():
+            while True:
+                _item = _queue.get()
+                if _item is None:
+                    break
+                _items.append(_item)
+
+        _thread = Thread(target=_consume)
+        _thread.start()
+        time.sleep(0.05)
+        _queue.put(5)
+        _queue.close()
+        _thread.join(timeout=5.0)
+        assert not _thread.is_alive()
+        assert _items == [3, 4, 5]
+
+    def test_timers(self):
+        _supervisor = get_supervisor()
+        _called = []
+        _done = Event()
+
+        _cancelled = _supervisor.call_later(0.05, lambda: _called.append('cancelled'))
+        _supervisor.call_later(0.1, lambda: (_called.append('second'), _done.set()))
+        _supervisor.call_later(0.0, lambda: _called.append('first'))
+        _cancelled.cancel()
+
+        _start = time.monotonic()
+        assert _done.wait(timeout=5.0)
+        assert time.monotonic() - _start >= 0.09
+        assert _called == ['first', 'second']
+        assert _cancelled.cancelled
+
+    def test_line_splitter(self):
+        _lines = []
+        splitter = LineSplitter(lambda _time, _line: _lines.append(_line))
+        splitter.feed(b'line 1\nline')
+        splitter.feed(b' 2\n')
+        splitter.feed(b'line 3\r\nline 4')
+        assert _lines == [b'line 1\n', b'line 2\n', b'line 3\r\n']
+
+        splitter.close()
+        assert _lines == [b'line 1\n', b'line 2\n', b'line 3\r\n', b'line 4']
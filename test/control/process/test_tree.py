@@ -0,0 +1,45 @@
+import os
+import time
+
+import pytest
+
+from pji.control import common_process
+from pji.control.process.tree import session_members, set_child_subreaper
+
+_LEAK_SCRIPT = 'python3 -c "while True: pass" & echo $!; sleep 0.3'
+
+
+@pytest.mark.unittest
+class TestControlProcessTree:
+    def test_session_members(self):
+        _sid = os.getsid(0)
+        _members = session_members(_sid)
+        assert os.getpid() in _members
+        assert _members[os.getpid()] == os.getppid()
+
+    @pytest.mark.parametrize('launcher', ['fork', 'forkserver'])
+    def test_leaked_descendant(self, launcher):
+        assert set_child_subreaper()
+
+        _start_time = time.time()
+        with common_process(args=['sh', '-c', _LEAK_SCRIPT], launcher=launcher,
+                            resources=dict(max_real_time=3.0)) as cp:
+            cp.communicate()
+            _leaked_pid = int(cp.stdout)
+
+        _result = cp.result.result
+        assert _result.ok
+        assert time.time() - _start_time < 2.0
+        assert _result.descendants.count == 1
+        assert _result.descendants.cpu_time > 0.1
+        assert _result.cpu_time >= _result.descendants.cpu_time
+        assert _result.json['descendants']['count'] == 1
+        assert not os.path.exists('/proc/{pid}'.format(pid=_leaked_pid))
+
+    def test_no_descendant(self):
+        with common_process(args=['true'], launcher='fork') as cp:
+            cp.communicate()
+
+        _result = cp.result.result
+        assert _result.ok
+        assert _result.descendants.count == 0
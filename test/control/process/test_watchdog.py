@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+
+from pji.control import common_process, RunResultStatus
+from pji.control.process.watchdog import CpuTimeWatchdog
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlProcessWatchdog:
+    def test_cpu_time(self):
+        _watchdog = CpuTimeWatchdog(os.getpid(), 1.0)
+        assert _watchdog.cpu_time_limit == 1.0
+        assert _watchdog.epsilon == 0.01
+        assert not _watchdog.exceeded
+
+        _before = _watchdog.cpu_time()
+        _start = time.process_time()
+        while time.process_time() - _start < 0.05:
+            pass
+        assert _watchdog.cpu_time() - _before == pytest.approx(0.05, abs=0.02)
+
+        with pytest.raises(ValueError):
+            CpuTimeWatchdog(os.getpid(), 1.0, epsilon=0.0)
+
+    @pytest.mark.timeout(5.0)
+    def test_sub_second_limit(self):
+        _start = time.time()
+        with common_process(args=['python3', '-c', 'while True: pass'], resources=dict(max_cpu_time=0.3)) as cp:
+            cp.communicate(wait=False)
+            cp.join()
+
+        assert time.time() - _start < 0.8
+        assert cp.result.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
+        assert cp.result.result.cpu_time_exceeded
+        assert cp.result.result.signal_code == 9
+        assert cp.result.result.cpu_time + cp.result.result.system_time == pytest.approx(0.3, abs=0.1)
+
+    @pytest.mark.timeout(5.0)
+    def test_process_tree(self):
+        with common_process(args=['sh', '-c', 'python3 -c "while True: pass" & python3 -c "while True: pass"; wait'],
+                            resources=dict(max_cpu_time=0.3, max_real_time=2.0)) as cp:
+            cp.communicate(wait=False)
+            cp.join()
+
+        assert cp.result.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
+        assert cp.result.result.cpu_time_exceeded
+        assert cp.result.result.real_time < 1.0
+
+    @pytest.mark.timeout(5.0)
+    def test_not_exceeded(self):
+        with common_process(args=['sleep', '0.5'], resources=dict(max_cpu_time=0.1)) as cp:
+            cp.communicate(wait=False)
+            cp.join()
+
+        assert cp.result.ok
+        assert not cp.result.result.cpu_time_exceeded
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import tempfile
+from contextlib import closing
+from io import BytesIO
+
+import pytest
+
+from pji.control.model import RunResultStatus
+from pji.control.run import async_common_run, common_run
+
+
+@pytest.mark.unittest
+class TestControlRunAio:
+    def test_async_common_run(self):
+        with closing(BytesIO(b'1234')) as stdin, closing(BytesIO()) as stdout, closing(BytesIO()) as stderr:
+            result = asyncio.run(async_common_run(args='cat', shell=True, stdin=stdin, stdout=stdout, stderr=stderr))
+
+            assert stdout.getvalue().rstrip(b'\r\n') == b'1234'
+            assert stderr.getvalue() == b''
+            assert result.ok
+            assert result.status == RunResultStatus.SUCCESS
+
+    def test_async_common_run_file(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            _input, _output = os.path.join(workdir, 'input'), os.path.join(workdir, 'output')
+            with open(_input, 'wb') as f:
+                f.write(b'2333\n' * 1000)
+
+            with open(_input, 'rb') as stdin, open(_output, 'wb') as stdout:
+                result = asyncio.run(async_common_run(args=['cat'], stdin=stdin, stdout=stdout))
+            assert result.ok
+            with open(_output, 'rb') as f:
+                assert f.read() == b'2333\n' * 1000
+
+    def test_async_common_run_same_as_sync(self):
+        _kwargs = dict(args='python3 -c "while True: pass"', shell=True, resources=dict(max_cpu_time=0.2))
+        _sync_result = common_run(**_kwargs)
+        _async_result = asyncio.run(async_common_run(**_kwargs))
+        assert _sync_result.status == _async_result.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
+
+    def test_async_common_run_gather(self):
+        async def _run():
+            return await asyncio.gather(*[
+                async_common_run(args=['python3', '-c', 'print({i})'.format(i=i)], stdout=BytesIO())
+                for i in range(20)
+            ])
+
+        results = asyncio.run(_run())
+        assert all(result.ok for result in results)
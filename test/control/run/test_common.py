@@ -1,3 +1,6 @@
+import os
+import tempfile
+import time
 from contextlib import closing
 from io import BytesIO, StringIO
 
@@ -95,7 +98,7 @@ class TestControlRunCommon:
         assert not result.ok
         assert result.completed
         assert result.status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
-        assert result.result.cpu_time > 2.2
+        assert result.result.cpu_time + result.result.system_time > 2.2  # killed by cpu time watchdog
         assert result.result.signal_code == 9
 
     @pytest.mark.timeout(5.0)
@@ -118,3 +121,66 @@ class TestControlRunCommon:
         assert not result.ok
         assert result.completed
         assert result.status == RunResultStatus.MEMORY_LIMIT_EXCEED
+
+    @pytest.mark.parametrize('direct_io', [True, False])
+    def test_common_run_file(self, direct_io):
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.path.join(workdir, 'input.txt'), 'wb') as f:
+                f.write(b'1234\n' * 10000)
+
+            with open(os.path.join(workdir, 'input.txt'), 'rb') as stdin, \
+                    open(os.path.join(workdir, 'output.txt'), 'wb') as stdout, \
+                    open(os.path.join(workdir, 'error.txt'), 'w') as stderr:
+                stdout.write(b'head\n')
+                result = common_run(
+                    args='cat; echo 233 1>&2', shell=True,
+                    stdin=stdin, stdout=stdout, stderr=stderr, direct_io=direct_io,
+                )
+                stdout.write(b'tail\n')
+
+            assert result.ok
+            with open(os.path.join(workdir, 'output.txt'), 'rb') as f:
+                assert f.read() == b'head\n' + b'1234\n' * 10000 + b'tail\n'
+            with open(os.path.join(workdir, 'error.txt'), 'r') as f:
+                assert f.read().rstrip() == '233'
+
+    @pytest.mark.timeout(15.0)
+    def test_common_run_checker(self):
+        with closing(BytesIO()) as stdout:
+            result = common_run(
+                args='seq 5', shell=True, stdout=stdout,
+                checker=dict(expected=b'1\n2\n3\n4\n5\n', mode='line'),
+            )
+            assert result.ok
+            assert result.mismatch is None
+            assert stdout.getvalue() == b'1\n2\n3\n4\n5\n'
+
+        start_time = time.time()
+        result = common_run(
+            args='echo 1; echo 3; sleep 10', shell=True,
+            resources=dict(max_real_time='12s'), checker=dict(expected=b'1 2 3'),
+        )
+        assert time.time() - start_time < 5.0
+        assert not result.ok
+        assert result.status == RunResultStatus.WRONG_OUTPUT
+        assert result.mismatch.offset == 2
+        assert result.mismatch.expected == b'2'
+        assert result.mismatch.actual == b'3'
+
+    @pytest.mark.parametrize('direct_io', [True, False])
+    def test_common_run_checker_file(self, direct_io):
+        with tempfile.TemporaryDirectory() as workdir:
+            with open(os.path.join(workdir, 'answer.txt'), 'wb') as f:
+                f.write(b'1234\n' * 10000)
+
+            with open(os.path.join(workdir, 'output.txt'), 'wb') as stdout:
+                result = common_run(
+                    args='yes 1234 | head -n 10001', shell=True, stdout=stdout, direct_io=direct_io,
+                    checker=os.path.join(workdir, 'answer.txt'),
+                )
+
+            assert result.status == RunResultStatus.WRONG_OUTPUT
+            assert result.mismatch.offset == 50000
+            assert result.mismatch.expected is None
+            with open(os.path.join(workdir, 'output.txt'), 'rb') as f:
+                assert f.read() == b'1234\n' * 10001
@@ -0,0 +1,83 @@
+import io
+import time
+from contextlib import closing
+
+import pytest
+
+from pji.control.model import RunResult, RunResultStatus
+from pji.control.run import run_many, TimingStdout
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlRunMany:
+    def test_run_many(self):
+        _outputs = [io.BytesIO() for _ in range(20)]
+        _results = dict(run_many([
+            dict(args=['cat'], stdin='{i}\n'.format(i=i).encode(), stdout=_outputs[i])
+            for i in range(20)
+        ], concurrency=8))
+
+        assert sorted(_results.keys()) == list(range(20))
+        for i in range(20):
+            assert isinstance(_results[i], RunResult)
+            assert _results[i].ok
+            assert _outputs[i].getvalue() == '{i}\n'.format(i=i).encode()
+
+    def test_run_many_ordered(self):
+        _specs = [
+            dict(args='sleep 0.3', shell=True),
+            dict(args='sleep 0.1', shell=True),
+            dict(args='true', shell=True),
+        ]
+        assert [i for i, _ in run_many(_specs, concurrency=3, ordered=True)] == [0, 1, 2]
+        assert [i for i, _ in run_many(_specs, concurrency=3)] == [2, 1, 0]
+
+    def test_run_many_concurrency(self):
+        _start = time.time()
+        _results = list(run_many([dict(args='sleep 0.5', shell=True)] * 4, concurrency=2))
+        _duration = time.time() - _start
+
+        assert len(_results) == 4
+        assert all(_result.ok for _, _result in _results)
+        assert 1.0 <= _duration < 1.8
+
+    def test_run_many_isolated(self):
+        _results = dict(run_many([
+            dict(args=['true']),
+            dict(args=['this_command_not_exist']),
+            dict(mode='invalid_mode', args=['true']),
+            dict(args='python3 -c "while True: pass"', shell=True, resources=dict(max_cpu_time=0.2)),
+            dict(args=['true']),
+        ], concurrency=2))
+
+        assert _results[0].ok
+        assert isinstance(_results[1], Exception)
+        assert isinstance(_results[2], ValueError)
+        assert _results[3].status == RunResultStatus.CPU_TIME_LIMIT_EXCEED
+        assert _results[4].ok
+
+    def test_run_many_timing(self):
+        with closing(io.BytesIO()) as stdout:
+            _results = dict(run_many([
+                dict(mode='timing', args='sh', stdin=b'[0.0]echo 233\n[0.2]echo 2334\n', stdout=stdout),
+                dict(args=['true']),
+            ], concurrency=2))
+
+            assert _results[0].ok
+            assert _results[1].ok
+            _stdout = TimingStdout.loads(stdout.getvalue())
+            assert [_line.rstrip(b'\r\n') for _, _line in _stdout.lines] == [b'233', b'2334']
+
+    def test_run_many_close(self):
+        _start = time.time()
+        _iter = run_many([dict(args='true')] + [dict(args='sleep 10', shell=True)] * 3, concurrency=4)
+        _index, _result = next(_iter)
+        assert _index == 0 and _result.ok
+        _iter.close()
+        assert time.time() - _start < 5.0
+
+    def test_run_many_invalid(self):
+        with pytest.raises(ValueError):
+            run_many([], concurrency=0)
+        assert list(run_many([], concurrency=4)) == []
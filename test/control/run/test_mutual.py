@@ -1,11 +1,13 @@
 import io
+import os
 import sys
+import tempfile
 from contextlib import closing
 
 import pytest
 
 from pji.control.model import RunResultStatus
-from pji.control.run import mutual_run, MutualStdout, MutualStderr
+from pji.control.run import mutual_run, MutualStdout, MutualStderr, MutualTranscript, MutualInteractor
 
 demo_value = 1
 
@@ -18,6 +20,24 @@ def demo_mutual_func():
     print("line:", input(), file=sys.stderr)
 
 
+def ping_pong_mutual_func():
+    for i in range(1000):
+        print(i, flush=True)
+        assert input() == str(i)
+    print("exit")
+    assert input() == "exit"  # consume the echo, or cat may write into a closed pipe
+
+
+_INTERACTOR_SCRIPT = """
+import os, sys
+print('echo 233', flush=True)
+print('line:', input(), file=sys.stderr)
+print('whoami', flush=True)
+print('line:', input(), file=sys.stderr)
+print('cwd:', os.getcwd(), file=sys.stderr)
+"""
+
+
 # noinspection DuplicatedCode
 @pytest.mark.unittest
 class TestControlRunMutual:
@@ -162,3 +182,102 @@ class TestControlRunMutual:
             assert result.ok
             assert result.completed
             assert result.status == RunResultStatus.SUCCESS
+
+    @pytest.mark.timeout(15.0)
+    def test_direct(self):
+        with closing(io.BytesIO()) as stdout, closing(io.BytesIO()) as stderr:
+            result = mutual_run(
+                args='sh', identification='nobody',
+                stdin=demo_mutual_func, stdout=stdout, stderr=stderr, direct=True,
+            )
+
+            _stdout = MutualStdout.loads(stdout.getvalue())
+            assert [_line for _, _line in _stdout.lines] == [b'line: 233', b'line: nobody']
+            _stderr = MutualStderr.loads(stderr.getvalue())
+            assert [_line for _, _line in _stderr.lines] == [b'stderr']
+            assert result.ok
+
+    @pytest.mark.timeout(15.0)
+    def test_direct_transcript(self):
+        with closing(io.BytesIO()) as stdout, closing(io.BytesIO()) as transcript:
+            result = mutual_run(
+                args='sh', identification='nobody',
+                stdin=demo_mutual_func, stdout=stdout, direct=True, transcript=transcript,
+            )
+
+            _stdout = MutualStdout.loads(stdout.getvalue())
+            assert [_line for _, _line in _stdout.lines] == [b'line: 233', b'line: nobody']
+            _transcript = MutualTranscript.loads(transcript.getvalue())
+            assert sorted(_line for _, _line in _transcript.lines) == sorted([
+                b'< echo 233', b'> 233', b'< echo stderr 1>&2', b'< whoami', b'> nobody',
+            ])
+            assert result.ok
+
+    @pytest.mark.timeout(15.0)
+    def test_relay_transcript(self):
+        with closing(io.BytesIO()) as transcript:
+            result = mutual_run(args='sh', identification='nobody', stdin=demo_mutual_func, transcript=transcript)
+
+            _transcript = MutualTranscript.loads(transcript.getvalue())
+            assert sorted(_line for _, _line in _transcript.lines) == sorted([
+                b'< echo 233', b'> 233', b'< echo stderr 1>&2', b'< whoami', b'> nobody',
+            ])
+            assert result.ok
+
+    @pytest.mark.timeout(15.0)
+    def test_direct_ping_pong(self):
+        for _transcript in [None, io.BytesIO()]:
+            result = mutual_run(args='cat', stdin=ping_pong_mutual_func, direct=True, transcript=_transcript)
+            assert result.ok
+            if _transcript is not None:
+                assert len(MutualTranscript.loads(_transcript.getvalue()).lines) == 2002
+
+    @pytest.mark.timeout(15.0)
+    def test_direct_early_exit(self):
+        with closing(io.BytesIO()) as stderr:
+            result = mutual_run(args='echo 233 1>&2', shell=True, stdin=demo_mutual_func,
+                                stderr=stderr, direct=True)
+            assert [_line for _, _line in MutualStderr.loads(stderr.getvalue()).lines] == [b'233']
+            assert result.ok
+
+        result = mutual_run(args='cat', stdin=None, direct=True, transcript=io.BytesIO())
+        assert result.ok
+
+    @pytest.mark.timeout(15.0)
+    def test_interactor(self):
+        with tempfile.TemporaryDirectory() as workdir, \
+                closing(io.BytesIO()) as stdout, closing(io.BytesIO()) as transcript:
+            result = mutual_run(
+                args='sh', identification='nobody', stdout=stdout, transcript=transcript,
+                stdin=dict(args=[sys.executable, '-c', _INTERACTOR_SCRIPT], cwd=workdir,
+                           resources=dict(max_real_time='5s')),
+            )
+
+            _stdout = MutualStdout.loads(stdout.getvalue())
+            assert [_line for _, _line in _stdout.lines] == [
+                b'line: 233', b'line: nobody', 'cwd: {cwd}'.format(cwd=os.path.realpath(workdir)).encode(),
+            ]
+            _transcript = MutualTranscript.loads(transcript.getvalue())
+            assert sorted(_line for _, _line in _transcript.lines) == sorted([
+                b'< echo 233', b'> 233', b'< whoami', b'> nobody',
+            ])
+            assert result.ok
+            assert result.interaction is not None
+            assert result.interaction.ok
+            assert result.interaction.limit.max_real_time == 5.0
+            assert result.json['interaction'] == result.interaction.json
+
+    @pytest.mark.timeout(15.0)
+    def test_interactor_killed(self):
+        result = mutual_run(
+            args='cat',
+            stdin=MutualInteractor(args='echo 233; sleep 10', shell=True, resources=dict(max_real_time='0.5s')),
+        )
+        assert result.ok
+        assert result.interaction.status == RunResultStatus.REAL_TIME_LIMIT_EXCEED
+
+    def test_interactor_repr(self):
+        assert repr(MutualInteractor(args='cat', cwd='/tmp')) == "<MutualInteractor args: 'cat', cwd: '/tmp'>"
+        assert MutualInteractor.loads(dict(args='cat')).args == 'cat'
+        with pytest.raises(TypeError):
+            MutualInteractor.loads(233)
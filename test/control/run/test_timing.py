@@ -104,6 +104,21 @@ class TestControlRunTiming:
             assert result.completed
             assert result.status == RunResultStatus.SUCCESS
 
+    def test_same_time_lines(self):
+        _stdin = b''.join(b'[0.0]echo %d\n' % i for i in range(1000)) + b'[0.2]echo end\n'
+        with closing(io.BytesIO(_stdin)) as stdin, closing(io.BytesIO()) as stdout:
+            result = timing_run(args='sh', stdin=stdin, stdout=stdout)
+
+            _stdout = TimingStdout.loads(stdout.getvalue())
+            assert [_line.rstrip(b'\r\n') for _, _line in _stdout.lines] == \
+                   [b'%d' % i for i in range(1000)] + [b'end']
+            assert _stdout.lines[-1][0] >= 0.2
+            assert result.ok
+
+            assert result.delivery.count == 1001
+            assert result.delivery.undelivered == 0
+            assert result.delivery.max_skew < 0.1
+
     def test_simple_with_shuffle(self):
         _stdin = """
 [0.0]echo 233
@@ -192,3 +207,64 @@ class TestControlRunTiming:
             assert not result.ok
             assert result.completed
             assert result.status == RunResultStatus.REAL_TIME_LIMIT_EXCEED
+
+    @pytest.mark.timeout(15.0)
+    def test_fast_forward(self):
+        _stdin = b"""
+        [0.0]1
+        [5.0]2
+        [5.0]3
+        [30.0]4
+        """
+        _code = 'import sys\nfor line in sys.stdin:\n    print(int(line) * 2, flush=True)\n'
+        with closing(io.BytesIO(_stdin)) as stdin, closing(io.BytesIO()) as stdout:
+            result = timing_run(
+                args=['python3', '-c', _code], resources=dict(max_real_time='10s'),
+                stdin=stdin, stdout=stdout, fast_forward='0.01s',
+            )
+            assert result.ok
+            assert result.result.real_time < 5.0
+            assert result.delivery.count == 4
+            assert 29.0 < result.delivery.skipped < 30.0
+
+            _stdout = TimingStdout.loads(stdout.getvalue())
+            assert [_line for _, _line in _stdout.lines] == [b'2', b'4', b'6', b'8']
+            _times = [_time for _time, _ in _stdout.lines]
+            assert 5.0 <= _times[1] < 5.5
+            assert 30.0 <= _times[3] < 30.5
+
+    def test_fast_forward_invalid(self):
+        with pytest.raises(ValueError):
+            timing_run(args='cat', fast_forward='233')
+        with pytest.raises(ValueError):
+            timing_run(args='cat', fast_forward=0)
+
+    @pytest.mark.timeout(15.0)
+    def test_checker(self):
+        _stdin = b"""
+        [0.0]1
+        [0.1]2
+        [10.0]3
+        """
+        _code = 'import sys\nfor line in sys.stdin:\n    print(int(line) * 2, flush=True)\n'
+        with closing(io.BytesIO(_stdin)) as stdin, closing(io.BytesIO()) as stdout:
+            result = timing_run(
+                args=['python3', '-c', _code], resources=dict(max_real_time='12s'),
+                stdin=stdin, stdout=stdout, checker=dict(expected=b'2\n3\n6\n', mode='line'),
+            )
+            assert result.status == RunResultStatus.WRONG_OUTPUT
+            assert result.result.real_time < 5.0
+            assert result.mismatch.offset == 2
+            assert result.mismatch.expected == b'3'
+            assert result.mismatch.actual == b'4'
+            assert result.json['mismatch'] == {'offset': 2, 'expected': '3', 'actual': '4'}
+
+            _stdout = TimingStdout.loads(stdout.getvalue())
+            assert [_line for _, _line in _stdout.lines] == [b'2', b'4']
+
+        with closing(io.BytesIO(b'[0.0]1\n[0.1]2\n')) as stdin:
+            result = timing_run(
+                args=['python3', '-c', _code], stdin=stdin, checker=dict(expected=b'2 4'),
+            )
+            assert result.ok
+            assert result.mismatch is None
@@ -0,0 +1,78 @@
+import io
+import random
+
+import pytest
+
+from pji.control.model import TimingContent
+from pji.control.run.writer import TimingWriter
+
+
+def _random_lines(count: int, end_time: float):
+    _random = random.Random(count)
+    _times = sorted(_random.uniform(0, end_time) for _ in range(count))
+    return [(_time, 'line {index} 中文'.format(index=i).encode()) for i, _time in enumerate(_times)]
+
+
+# noinspection DuplicatedCode
+@pytest.mark.unittest
+class TestControlRunWriter:
+    @pytest.mark.parametrize('end_time', [0.5, 3.0, 25.0, 1234.5])
+    def test_same_as_dumps(self, end_time):
+        _lines = _random_lines(1000, end_time) + [(end_time, b'last\r\n'), (end_time, b'')]
+        with io.BytesIO() as stream:
+            with TimingWriter(stream, spill_threshold=1024) as writer:
+                for _time, _line in _lines:
+                    writer.write(_time, _line)
+                assert writer.count == 1002
+
+            assert stream.getvalue().decode() == TimingContent(_lines).dumps()
+
+    def test_text_stream(self):
+        _lines = _random_lines(100, 12.0)
+        with io.StringIO() as stream:
+            with TimingWriter(stream) as writer:
+                for _time, _line in _lines:
+                    writer.write(_time, _line)
+
+            assert stream.getvalue() == TimingContent(_lines).dumps()
+
+    def test_reorder(self):
+        _lines = _random_lines(1000, 5.0)
+        _shuffled = list(_lines)
+        for i in range(0, len(_shuffled), 100):  # disordered in small windows, like the lines from several threads
+            _part = _shuffled[i:i + 100]
+            random.Random(i).shuffle(_part)
+            _shuffled[i:i + 100] = _part
+
+        with io.BytesIO() as stream:
+            with TimingWriter(stream) as writer:
+                for _time, _line in _shuffled:
+                    writer.write(_time, _line)
+
+            assert stream.getvalue().decode() == TimingContent(_lines).dumps()
+
+    def test_tail(self):
+        with TimingWriter(None, tail=3) as writer:
+            assert writer.tail == []
+            for i in range(500):
+                writer.write(i * 0.01, str(i))
+            assert writer.tail == [(4.97, b'497'), (4.98, b'498'), (4.99, b'499')]
+            assert writer.count == 500
+
+    def test_empty(self):
+        with io.BytesIO() as stream:
+            with TimingWriter(stream):
+                pass
+            assert stream.getvalue() == b''
+
+    def test_discard(self):
+        with io.BytesIO() as stream:
+            with pytest.raises(KeyError):
+                with TimingWriter(stream) as writer:
+                    writer.write(0.1, b'233')
+                    raise KeyError('error')
+
+            assert stream.getvalue() == b''
+            writer.write(0.2, b'dropped after closed')
+            writer.close()
+            assert stream.getvalue() == b''
@@ -1,5 +1,6 @@
 import codecs
 import io
+import os
 import tempfile
 
 import pytest
@@ -167,6 +168,29 @@ class TestServiceCommandCommand:
                 assert len(_stderr.lines) == 1
                 assert _stderr.str_lines[0][1].rstrip() == '2334'
 
+    def test_mutual_with_interactor(self):
+        with tempfile.TemporaryDirectory() as workdir, \
+                tempfile.NamedTemporaryFile() as fout:
+            with open(os.path.join(workdir, 'interactor.sh'), 'w') as f:
+                print('echo "echo $WORD"; read line; echo "got $line" 1>&2; pwd 1>&2', file=f)
+            ct = CommandTemplate(
+                args='sh',
+                mode=CommandMode.MUTUAL,
+                stdin=dict(args='sh interactor.sh', workdir='${DIR}', resources=dict(max_real_time='5s')),
+                stdout=fout.name,
+            )
+            c = ct(workdir=workdir, environ=dict(DIR='.', WORD='233'))
+            assert c.stdin.cwd == os.path.normpath(workdir)
+            assert c.stdin.resources.max_real_time == 5.0
+
+            result = c()
+            assert result.ok
+            assert result.interaction.ok
+
+            with codecs.open(fout.name, 'r') as ff:
+                _stdout = MutualStdout.load(ff)
+                assert [_line for _, _line in _stdout.str_lines] == ['got 233', os.path.realpath(workdir)]
+
     def test_repr(self):
         ct = CommandTemplate(**dict(
             args='echo 233 ' * 100,